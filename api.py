@@ -1,69 +1,470 @@
-from flask import Flask, request, jsonify
+import functools
+import gzip
+import io
+import json
+import os
+import random
+import reprlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack
+
+from flask import Flask, Response, abort, g, request, jsonify, make_response
 from flask_cors import CORS
 import logging
+from bootstrap import ensure_db, startup_report
 from db import (
-    init_db,
-    get_initiatives,
-    update_position,
+    EXPORT_FORMATS,
+    VersionConflict,
+    import_initiatives,
+    iter_export,
+    get_initiatives_as_of,
+    get_initiatives_json,
+    get_quadrant_summary,
+    get_initiatives_since,
+    iter_initiatives_json,
+    query_initiatives,
+    search_initiatives,
+    queue_positions,
     upsert_initiative,
     delete_initiative,
-    get_last_updated,
+    get_board_state,
+    get_audit_log,
+    get_changes,
+    create_board,
+    list_boards,
+    current_path,
+    use_board,
+    use_path,
 )
-
-init_db()
+from events import notifier_for
+from http_common import (
+    COLUMNS_MEDIA_TYPE,
+    FILTER_PARAMS,
+    GZIP_ETAG_SUFFIX,
+    GZIP_LEVEL,
+    GZIP_MIN_BYTES,
+    PAGE_PARAMS,
+    STREAM_HEARTBEAT,
+    entity_tag,
+    initiatives_format,
+    last_modified,
+    matching_tag,
+    page_cursor,
+    parse_initiative,
+    parse_positions,
+    record_request,
+    sse,
+)
+from metrics import render, track_rows
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ensure_db()
+logger.info("Startup phases: %s", startup_report())
+
+# Fraction of write payloads logged at INFO (all of them at DEBUG).
+PAYLOAD_LOG_SAMPLE = float(os.getenv("LUMEN_PAYLOAD_LOG_SAMPLE", "0.01"))
+
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["ETag", "Last-Modified"])
+
+
+def _log_payload(label: str, data: object) -> None:
+    """Log a sample of request payloads rather than every one."""
+    if logger.isEnabledFor(logging.DEBUG) or random.random() < PAYLOAD_LOG_SAMPLE:
+        logger.info("%s: %s", label, reprlib.repr(data))
+
+
+def _json_object() -> dict:
+    """Return the request body as a JSON object, or answer 400."""
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict):
+        abort(make_response(jsonify({"error": "Request body must be a JSON object"}), 400))
+    return data
+
+
+@app.before_request
+def _start_metrics() -> None:
+    g.started = time.perf_counter()
+    g.rows = track_rows()
+
+
+@app.after_request
+def _finish_metrics(response: Response) -> Response:
+    """Record latency, rows and bytes once the response body is complete."""
+    labels = (request.endpoint or "unmatched", request.method, response.status_code)
+    started, rows = g.get("started", time.perf_counter()), g.get("rows", [0])
+    if not response.is_streamed:
+        record_request(*labels, time.perf_counter() - started, rows[0], response.content_length or 0)
+        return response
+    if response.mimetype == "text/event-stream":
+        return response
+    body = response.response
+
+    def counted():
+        size = 0
+        try:
+            for chunk in body:
+                size += len(chunk) if isinstance(chunk, bytes) else len(chunk.encode())
+                yield chunk
+        finally:
+            record_request(*labels, time.perf_counter() - started, rows[0], size)
+
+    response.response = counted()
+    return response
+
+
+# Compressed full-board bodies, one per board and encoding, reused while
+# the board's cached JSON and state are unchanged.
+_GZIP_CACHE_SIZE = 8
+_gzip_cache: "OrderedDict[tuple, tuple[str, str, bytes]]" = OrderedDict()
+_gzip_lock = threading.Lock()
+
+
+def _gzip(data: bytes) -> bytes:
+    """Compress ``data``, reusing the result for unchanged board bodies."""
+    cache = g.get("gzip_source")
+    if cache is None:
+        return gzip.compress(data, GZIP_LEVEL)
+    key, source, envelope = cache
+    with _gzip_lock:
+        entry = _gzip_cache.get(key)
+    # The board's JSON string is cached per snapshot, so identity means
+    # the rows are unchanged.
+    if entry is not None and entry[0] is source and entry[1] == envelope:
+        return entry[2]
+    compressed = gzip.compress(data, GZIP_LEVEL)
+    with _gzip_lock:
+        _gzip_cache[key] = (source, envelope, compressed)
+        _gzip_cache.move_to_end(key)
+        while len(_gzip_cache) > _GZIP_CACHE_SIZE:
+            _gzip_cache.popitem(last=False)
+    return compressed
+
+
+@app.after_request
+def _compress(response: Response) -> Response:
+    """gzip large complete bodies when the client accepts it."""
+    if response.status_code != 200 or response.is_streamed or "Content-Encoding" in response.headers:
+        return response
+    response.vary.add("Accept-Encoding")
+    if not request.accept_encodings["gzip"] or (response.content_length or 0) < GZIP_MIN_BYTES:
+        return response
+    response.set_data(_gzip(response.get_data()))
+    response.headers["Content-Encoding"] = "gzip"
+    tag, weak = response.get_etag()
+    if tag is not None:
+        response.set_etag(tag + GZIP_ETAG_SUFFIX, weak)
+    return response
+
+
+def _with_validators(response: Response, state: dict, layout: str = "records") -> Response:
+    """Attach an ETag derived from the board version and Last-Modified.
+
+    :func:`_compress` extends the tag when it gzips the body.
+    """
+    response.set_etag(entity_tag(state, layout))
+    response.vary.add("Accept-Encoding")
+    modified = last_modified(state)
+    if modified is not None:
+        response.last_modified = modified
+    return response
+
+
+def _not_modified(state: dict, layout: str = "records") -> Response | None:
+    """Return a 304 response if the client's cached copy is still current.
+
+    ``If-None-Match`` takes precedence over ``If-Modified-Since`` as in
+    RFC 9110; the latter is only second-resolution while the version
+    changes with every write.
+    """
+    if request.if_none_match:
+        tag = matching_tag(request.if_none_match, state, layout)
+        fresh = tag is not None
+    else:
+        tag = entity_tag(state, layout)
+        modified = last_modified(state)
+        since = request.if_modified_since
+        fresh = since is not None and modified is not None and modified <= since
+    if not fresh:
+        return None
+    response = _with_validators(app.response_class(status=304), state, layout)
+    response.set_etag(tag)
+    return response
+
+
+def _page_response(state: dict, fields: tuple[str, ...], layout: str) -> Response:
+    """Answer a filtered/paginated ``/api/initiatives`` request."""
+    args = request.args
+    try:
+        rows, names, next_cursor = query_initiatives(
+            {name: args[name] for name in FILTER_PARAMS if name in args},
+            fields=fields,
+            after=page_cursor(args),
+            limit=int(args.get("limit", 100)),
+        )
+    except ValueError as exc:
+        abort(make_response(jsonify({"error": str(exc)}), 400))
+    body = "".join(iter_initiatives_json(rows, names, layout, names))
+    envelope = {"next_cursor": next_cursor, **state}
+    return app.response_class(f'{{"initiatives":{body},{json.dumps(envelope)[1:]}', mimetype="application/json")
 
 
 @app.get("/api/initiatives")
 def api_get_initiatives():
-    logger.info("Fetching initiatives")
-    df = get_initiatives()
-    return jsonify({"initiatives": df.to_dict(orient="records"), "last_updated": get_last_updated()})
+    as_of = request.args.get("as_of")
+    if as_of is not None:
+        logger.debug("Reconstructing initiatives as of %s", as_of)
+        try:
+            rows = get_initiatives_as_of(as_of)
+        except ValueError as exc:
+            abort(make_response(jsonify({"error": str(exc)}), 400))
+        return jsonify({"initiatives": rows, "as_of": as_of, "read_only": True})
+    since = request.args.get("since")
+    try:
+        fields, layout = initiatives_format(request.args, request.headers.get("Accept"))
+    except ValueError as exc:
+        abort(make_response(jsonify({"error": str(exc)}), 400))
+    # Read the board state before the rows: a change committed in between is
+    # then returned again on the next delta call rather than missed. Reads
+    # leave buffered moves to the write-behind flush and overlay them instead.
+    state = get_board_state(flush=False)
+    not_modified = _not_modified(state, layout)
+    if not_modified is not None:
+        not_modified.vary.add("Accept")
+        return not_modified
+    if since is None and any(name in request.args for name in PAGE_PARAMS):
+        logger.debug("Querying initiatives: %s", request.args.to_dict())
+        response = _page_response(state, fields, layout)
+    elif since is None:
+        logger.debug("Fetching initiatives")
+        # Splice the cached, pre-serialized records into the envelope.
+        records, envelope = get_initiatives_json(fields, layout), json.dumps(state)[1:]
+        g.gzip_source = ((current_path(), fields, layout), records, envelope)
+        response = app.response_class(f'{{"initiatives":{records},{envelope}', mimetype="application/json")
+    else:
+        logger.debug("Fetching initiatives changed since %s", since)
+        try:
+            rows, deleted = get_initiatives_since(int(since) if since.isdigit() else since)
+        except ValueError as exc:
+            abort(make_response(jsonify({"error": str(exc)}), 400))
+        # The rows are already in memory; a complete body can be gzipped.
+        body = "".join(iter_initiatives_json(rows, fields, layout))
+        envelope = json.dumps({"deleted": deleted, **state})[1:]
+        response = app.response_class(f'{{"initiatives":{body},{envelope}', mimetype="application/json")
+    if layout == "columns":
+        response.mimetype = COLUMNS_MEDIA_TYPE
+    response.vary.add("Accept")
+    return _with_validators(response, state, layout)
+
+
+@app.get("/api/summary")
+def api_summary():
+    state = get_board_state(flush=False)
+    return _not_modified(state) or _with_validators(jsonify({"summary": get_quadrant_summary(), **state}), state)
+
+
+@app.get("/api/audit")
+def api_audit():
+    args = request.args
+    try:
+        entries, next_cursor = get_audit_log(
+            initiative_id=args.get("initiative_id", type=int),
+            user=args.get("user"),
+            before=args.get("before", type=int),
+            limit=int(args.get("limit", 50)),
+        )
+    except ValueError as exc:
+        abort(make_response(jsonify({"error": str(exc)}), 400))
+    return jsonify({"entries": entries, "next_cursor": next_cursor})
+
+
+@app.get("/api/search")
+def api_search():
+    text = request.args.get("q", "")
+    try:
+        results = search_initiatives(text, limit=int(request.args.get("limit", 20)))
+    except ValueError as exc:
+        abort(make_response(jsonify({"error": str(exc)}), 400))
+    return jsonify({"query": text, "results": results})
+
+
+@app.get("/api/export")
+def api_export():
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        abort(make_response(jsonify({"error": f"Unsupported format: {fmt}"}), 400))
+    include_deleted = request.args.get("include_deleted", "0").lower() in ("1", "true")
+    logger.debug("Exporting initiatives as %s", fmt)
+    return Response(
+        iter_export(fmt, include_deleted),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename=initiatives.{fmt}"},
+    )
+
+
+@app.post("/api/import")
+def api_import():
+    """Import CSV or NDJSON from the raw request body without buffering it."""
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        abort(make_response(jsonify({"error": f"Unsupported format: {fmt}"}), 400))
+    source = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+    try:
+        result = import_initiatives(
+            source,
+            fmt,
+            user=request.args.get("user", "import"),
+            progress=lambda totals: logger.info("Import progress: %s", totals),
+        )
+    except UnicodeDecodeError as exc:
+        abort(make_response(jsonify({"error": f"Body is not valid UTF-8: {exc.reason}"}), 400))
+    return jsonify({**result, **get_board_state()})
 
 
 @app.post("/api/positions")
 def api_save_positions():
-    data = request.get_json(force=True)
-    logger.info("Saving positions: %s", data)
+    data = _json_object()
+    _log_payload("Saving positions", data)
     user = data.get("user", "user")
-    for pos in data.get("positions", []):
-        update_position(pos["id"], pos["x"], pos["y"], user)
-    return jsonify({"status": "ok", "last_updated": get_last_updated()})
+    try:
+        positions = parse_positions(data)
+    except ValueError as exc:
+        abort(make_response(jsonify({"error": str(exc)}), 400))
+    conflicts: list[dict] = []
+    # Not flushing here keeps repeated posts during a drag coalesced.
+    updated = queue_positions(positions, user, conflicts)
+    body = {"status": "conflict" if conflicts else "ok", "updated": updated, **get_board_state(flush=False)}
+    if conflicts:
+        # Moves without a conflict were still applied.
+        return jsonify({**body, "conflicts": conflicts}), 409
+    return jsonify(body)
 
 
 @app.post("/api/initiative")
 def api_upsert_initiative():
-    data = request.get_json(force=True)
-    logger.info("Upsert initiative payload: %s", data)
-    new_id = upsert_initiative(
-        data.get("id"),
-        data.get("title"),
-        data.get("details", ""),
-        data.get("color", "pink"),
-        data.get("category", ""),
-        data.get("x", 50),
-        data.get("y", 50),
-        data.get("user", "user"),
-    )
-    logger.info("Upserted initiative id %s", new_id)
-    return jsonify({"id": new_id, "last_updated": get_last_updated()})
+    data = _json_object()
+    _log_payload("Upsert initiative payload", data)
+    try:
+        fields = parse_initiative(data)
+    except ValueError as exc:
+        abort(make_response(jsonify({"error": str(exc)}), 400))
+    try:
+        new_id = upsert_initiative(
+            fields["id"],
+            data.get("title"),
+            data.get("details", ""),
+            data.get("color", "pink"),
+            data.get("category", ""),
+            fields["x"],
+            fields["y"],
+            data.get("user", "user"),
+            fields["change_version"],
+        )
+    except VersionConflict as exc:
+        return jsonify({"error": str(exc), "current": exc.current, **get_board_state()}), 409
+    logger.debug("Upserted initiative id %s", new_id)
+    return jsonify({"id": new_id, **get_board_state()})
 
 
 @app.delete("/api/initiative/<int:initiative_id>")
 def api_delete_initiative(initiative_id: int):
-    logger.info("Deleting initiative %s", initiative_id)
-    delete_initiative(initiative_id)
-    return jsonify({"status": "ok", "last_updated": get_last_updated()})
+    logger.debug("Deleting initiative %s", initiative_id)
+    delete_initiative(initiative_id, request.args.get("user", "user"))
+    return jsonify({"status": "ok", **get_board_state()})
 
 
 @app.get("/api/last_updated")
 def api_last_updated():
-    return jsonify({"last_updated": get_last_updated()})
+    state = get_board_state(flush=False)
+    return _not_modified(state) or _with_validators(jsonify(state), state)
+
+
+@app.get("/api/stream")
+def api_stream():
+    """Server-Sent Events stream of board changes.
+
+    Each ``change`` event carries the new ``version`` plus the ``changed``
+    and ``deleted`` ids. A reconnecting client sending ``Last-Event-ID``
+    first receives everything it missed since that version.
+    """
+    notifier = notifier_for()
+    path = current_path()
+    last_event_id = request.headers.get("Last-Event-ID", "")
+
+    # Subscribing in the generator ties the subscription to the finally
+    # below; a client gone before the first chunk never starts it.
+    def generate():
+        subscription = notifier.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            if last_event_id.isdigit():
+                with use_path(path):
+                    catch_up = get_changes(int(last_event_id))
+                if catch_up["changed"] or catch_up["deleted"]:
+                    yield sse(catch_up)
+            while True:
+                event = subscription.get(timeout=STREAM_HEARTBEAT)
+                yield ": keep-alive\n\n" if event is None else sse(event)
+        finally:
+            notifier.unsubscribe(subscription)
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/boards")
+def api_list_boards():
+    return jsonify({"boards": list_boards()})
+
+
+@app.post("/api/boards")
+def api_create_board():
+    board = _json_object().get("board", "")
+    try:
+        create_board(board)
+    except ValueError as exc:
+        abort(make_response(jsonify({"error": str(exc)}), 400))
+    return jsonify({"board": board}), 201
+
+
+def _on_board(view):
+    """Wrap ``view`` to run against the board named in the URL."""
+
+    @functools.wraps(view)
+    def scoped(board: str, **kwargs):
+        with ExitStack() as stack:
+            try:
+                stack.enter_context(use_board(board))
+            except (LookupError, ValueError) as exc:
+                abort(make_response(jsonify({"error": str(exc)}), 404))
+            return view(**kwargs)
+
+    return scoped
+
+
+# Every /api/<route> is also served per board as /api/boards/<board>/<route>,
+# backed by that board's own database file.
+for _rule in list(app.url_map.iter_rules()):
+    if _rule.rule.startswith("/api/") and not _rule.rule.startswith("/api/boards"):
+        app.add_url_rule(
+            "/api/boards/<board>" + _rule.rule[len("/api"):],
+            f"board_{_rule.endpoint}",
+            _on_board(app.view_functions[_rule.endpoint]),
+            methods=_rule.methods - {"HEAD", "OPTIONS"},
+        )
+
+
+@app.get("/api/metrics")
+def api_metrics():
+    """Latency histograms and counters in Prometheus text format."""
+    return Response(render(), mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
@@ -1,27 +1,11 @@
 import streamlit as st
-import subprocess
 
-from db import get_initiative, init_db, upsert_initiative
+from bootstrap import ensure_db, get_version
+from db import VersionConflict, create_board, get_initiative, list_boards, upsert_initiative, use_board
 from ui import load_css, create_draggable_matrix
 
-
-def _get_version() -> str:
-    """Return short version information from git.
-
-    Uses the commit count combined with the short hash so the value
-    automatically changes with every commit. Falls back to ``"dev"`` if
-    git is unavailable so the page always renders.
-    """
-    try:
-        count = subprocess.check_output(
-            ["git", "rev-list", "--count", "HEAD"], text=True
-        ).strip()
-        short = subprocess.check_output(
-            ["git", "rev-parse", "--short", "HEAD"], text=True
-        ).strip()
-        return f"{count}-{short}"
-    except Exception:
-        return "dev"
+# Selector label for the board stored in the default database file.
+DEFAULT_BOARD = "(default)"
 
 
 def main() -> None:
@@ -39,12 +23,41 @@ def main() -> None:
         layout="wide",
     )
 
-    init_db()
+    ensure_db()
     username = st.session_state.get("username", "user")
     load_css()
     st.title("Lumen Strategic Dashboard")
-    st.caption(f"Version: {_get_version()}")
+    st.caption(f"Version: {get_version()}")
 
+    board = _select_board()
+    with use_board(board):
+        _render_board(username)
+
+
+def _select_board() -> str | None:
+    """Sidebar board picker; returns the chosen board, ``None`` for the default."""
+    with st.sidebar:
+        st.header("Board")
+        boards = [DEFAULT_BOARD, *list_boards()]
+        current = st.session_state.get("board") or DEFAULT_BOARD
+        choice = st.selectbox(
+            "Board", boards, index=boards.index(current) if current in boards else 0, key="board_choice"
+        )
+        new_board = st.text_input("New board name")
+        if st.button("Create board") and new_board:
+            try:
+                create_board(new_board)
+            except ValueError as exc:
+                st.error(str(exc))
+            else:
+                st.session_state["board"] = new_board
+                st.session_state.pop("board_choice", None)
+                st.rerun()
+    st.session_state["board"] = None if choice == DEFAULT_BOARD else choice
+    return st.session_state["board"]
+
+
+def _render_board(username: str) -> None:
     with st.sidebar:
         st.header("Add / Update Initiative")
         edit_id = st.session_state.pop("edit_initiative_id", None)
@@ -58,6 +71,7 @@ def main() -> None:
                 st.session_state["form_category"] = data.get("category", "")
                 st.session_state["form_x"] = int(data.get("x", 50))
                 st.session_state["form_y"] = int(data.get("y", 50))
+                st.session_state["form_version"] = data["change_version"]
 
         with st.form("initiative_form", clear_on_submit=True):
             initiative_id = st.number_input(
@@ -74,30 +88,51 @@ def main() -> None:
             y = st.slider("Value", 0, 100, st.session_state.get("form_y", 50))
             submitted = st.form_submit_button("Save")
         if submitted and title:
-            new_id = upsert_initiative(
-                initiative_id if initiative_id else None,
-                title,
-                details,
-                color,
-                category,
-                float(x),
-                float(y),
-                username,
+            # Only an edit of the initiative loaded into the form is checked
+            # against the version it was loaded at.
+            expected = (
+                st.session_state.get("form_version")
+                if initiative_id and initiative_id == st.session_state.get("form_id")
+                else None
             )
-            st.success(f"Saved initiative {new_id}")
-            for key in [
-                "form_id",
-                "form_title",
-                "form_details",
-                "form_color",
-                "form_category",
-                "form_x",
-                "form_y",
-            ]:
-                st.session_state.pop(key, None)
-            st.rerun()
-
-    create_draggable_matrix(username)
+            try:
+                new_id = upsert_initiative(
+                    initiative_id if initiative_id else None,
+                    title,
+                    details,
+                    color,
+                    category,
+                    float(x),
+                    float(y),
+                    username,
+                    expected,
+                )
+            except VersionConflict as exc:
+                st.error(f"{exc} since you opened it. Open it again to edit the latest version.")
+            else:
+                st.success(f"Saved initiative {new_id}")
+                for key in [
+                    "form_id",
+                    "form_title",
+                    "form_details",
+                    "form_color",
+                    "form_category",
+                    "form_x",
+                    "form_y",
+                    "form_version",
+                ]:
+                    st.session_state.pop(key, None)
+                st.rerun()
+
+    with st.sidebar:
+        st.header("History")
+        as_of = None
+        if st.checkbox("View the board at a past date"):
+            day = st.date_input("Date (UTC)")
+            moment = st.time_input("Time (UTC)")
+            as_of = f"{day.isoformat()}T{moment.isoformat()}"
+
+    create_draggable_matrix(username, as_of)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,584 @@
+"""Async (ASGI) serving mode for the initiatives API.
+
+Serves the routes of :mod:`api` with the same JSON bodies, using Starlette.
+Blocking :mod:`db` calls run on worker threads: reads share at most
+``ASGI_DB_THREADS`` threads and writes are limited to ``ASGI_MAX_WRITERS``
+at a time, so writers queue on the event loop rather than in SQLite's busy
+handler. Once ``ASGI_MAX_QUEUE`` calls are waiting for a thread, further
+requests are answered with 503 instead of queueing without bound. Change
+streams wait on the event loop and hold no thread while idle.
+
+Start locally with ``python asgi.py --workers 4``, or ``uvicorn asgi:app``.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from tempfile import SpooledTemporaryFile
+from typing import Callable
+
+import anyio
+import anyio.from_thread
+import anyio.lowlevel
+import anyio.to_thread
+from starlette.applications import Starlette
+from starlette.datastructures import MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.http import http_date, parse_date, parse_etags
+
+from bootstrap import ensure_db
+from db import (
+    EXPORT_FORMATS,
+    VersionConflict,
+    create_board,
+    delete_initiative,
+    get_audit_log,
+    get_board_state,
+    get_changes,
+    get_initiatives_as_of,
+    get_initiatives_json,
+    get_initiatives_since,
+    get_quadrant_summary,
+    import_initiatives,
+    iter_export,
+    iter_initiatives_json,
+    list_boards,
+    query_initiatives,
+    queue_positions,
+    search_initiatives,
+    upsert_initiative,
+    use_board,
+    use_path,
+)
+from events import notifier_for
+from http_common import (
+    COLUMNS_MEDIA_TYPE,
+    FILTER_PARAMS,
+    GZIP_ETAG_SUFFIX,
+    GZIP_LEVEL,
+    GZIP_MIN_BYTES,
+    PAGE_PARAMS,
+    STREAM_HEARTBEAT,
+    entity_tag,
+    initiatives_format,
+    last_modified,
+    matching_tag,
+    page_cursor,
+    parse_initiative,
+    parse_positions,
+    record_request,
+    sse,
+)
+from metrics import render, track_rows
+
+logger = logging.getLogger(__name__)
+
+ensure_db()
+
+# Worker threads for blocking reads, concurrent writers, and calls allowed
+# to wait for a thread before requests are turned away with 503.
+DB_THREADS = int(os.getenv("ASGI_DB_THREADS", "16"))
+MAX_WRITERS = int(os.getenv("ASGI_MAX_WRITERS", "1"))
+MAX_QUEUE = int(os.getenv("ASGI_MAX_QUEUE", "256"))
+# Bytes of an import body held in memory before it is spooled to disk.
+IMPORT_SPOOL_BYTES = int(os.getenv("ASGI_IMPORT_SPOOL_BYTES", str(8 * 1024 * 1024)))
+
+# Calls run under _readers must not write: the db read paths overlay
+# buffered moves instead of flushing them, and a board is first opened,
+# which migrates its schema, under _writers. MAX_WRITERS bounds the writes
+# made by requests only. db's write-behind flush thread, its audit writer
+# thread and its background board snapshots write from their own threads
+# and wait for SQLite's write lock (busy timeout) instead.
+_readers = anyio.CapacityLimiter(DB_THREADS)
+_writers = anyio.CapacityLimiter(MAX_WRITERS)
+_board_paths: dict[str, str] = {}
+
+
+def _open_board(board: str | None) -> str:
+    with use_board(board) as path:
+        return path
+
+
+async def _db_path(request: Request) -> str:
+    """Return the database file for the board in the URL, if any."""
+    board = request.path_params.get("board")
+    path = _board_paths.get(board)
+    if path is None:
+        try:
+            # Opening a board for the first time migrates it: a write.
+            path = await anyio.to_thread.run_sync(_open_board, board, limiter=_writers)
+        except (LookupError, ValueError) as exc:
+            raise HTTPException(404, str(exc))
+        _board_paths[board] = path
+    return path
+
+
+async def _run(request: Request, func: Callable, *args, write: bool = False, **kwargs):
+    """Run a blocking :mod:`db` call for ``request`` on a worker thread."""
+    limiter = _writers if write else _readers
+    if limiter.statistics().tasks_waiting >= MAX_QUEUE:
+        raise HTTPException(503, "Server busy, retry shortly", headers={"Retry-After": "1"})
+    path = await _db_path(request)
+
+    def call():
+        with use_path(path):
+            return func(*args, **kwargs)
+
+    return await anyio.to_thread.run_sync(call, limiter=limiter)
+
+
+def _error(status: int, message: str) -> HTTPException:
+    return HTTPException(status, message)
+
+
+def _with_validators(response: Response, state: dict, layout: str = "records") -> Response:
+    """Attach an ETag derived from the board version and Last-Modified.
+
+    :class:`_EncodingTagMiddleware` extends the tag when the body is gzipped.
+    """
+    response.headers["ETag"] = f'"{entity_tag(state, layout)}"'
+    response.headers.add_vary_header("Accept-Encoding")
+    modified = last_modified(state)
+    if modified is not None:
+        response.headers["Last-Modified"] = http_date(modified)
+    return response
+
+
+def _not_modified(request: Request, state: dict, layout: str = "records") -> Response | None:
+    """Return a 304 response if the client's cached copy is still current."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tag = matching_tag(parse_etags(if_none_match), state, layout)
+        fresh = tag is not None
+    else:
+        tag = entity_tag(state, layout)
+        modified = last_modified(state)
+        since = parse_date(request.headers.get("if-modified-since"))
+        fresh = since is not None and modified is not None and modified <= since
+    if not fresh:
+        return None
+    response = _with_validators(Response(status_code=304), state, layout)
+    response.headers["ETag"] = f'"{tag}"'
+    return response
+
+
+async def _json_object(request: Request) -> dict:
+    """Return the request body as a JSON object, or answer 400 as :mod:`api` does."""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        raise _error(400, "Request body must be a JSON object")
+    return data
+
+
+def _json_body(body: str, status_code: int = 200) -> Response:
+    return Response(body, status_code=status_code, media_type="application/json")
+
+
+async def api_get_initiatives(request: Request) -> Response:
+    args = request.query_params
+    as_of = args.get("as_of")
+    if as_of is not None:
+        try:
+            rows = await _run(request, get_initiatives_as_of, as_of)
+        except ValueError as exc:
+            raise _error(400, str(exc))
+        return JSONResponse({"initiatives": rows, "as_of": as_of, "read_only": True})
+    since = args.get("since")
+    try:
+        fields, layout = initiatives_format(args, request.headers.get("accept"))
+    except ValueError as exc:
+        raise _error(400, str(exc))
+    state = await _run(request, get_board_state, flush=False)
+    not_modified = _not_modified(request, state, layout)
+    if not_modified is not None:
+        not_modified.headers["Vary"] = "Accept, Accept-Encoding"
+        return not_modified
+    if since is None and any(name in args for name in PAGE_PARAMS):
+        try:
+            cursor = page_cursor(args)
+        except ValueError as exc:
+            raise _error(400, str(exc))
+
+        def page() -> tuple[str, dict]:
+            rows, names, next_cursor = query_initiatives(
+                {name: args[name] for name in FILTER_PARAMS if name in args},
+                fields=fields,
+                after=cursor,
+                limit=int(args.get("limit", 100)),
+            )
+            return "".join(iter_initiatives_json(rows, names, layout, names)), {"next_cursor": next_cursor, **state}
+
+        try:
+            body, envelope = await _run(request, page)
+        except ValueError as exc:
+            raise _error(400, str(exc))
+    elif since is None:
+        body = await _run(request, get_initiatives_json, fields, layout)
+        envelope = state
+    else:
+
+        def delta() -> tuple[str, dict]:
+            rows, deleted = get_initiatives_since(int(since) if since.isdigit() else since)
+            return "".join(iter_initiatives_json(rows, fields, layout)), {"deleted": deleted, **state}
+
+        try:
+            body, envelope = await _run(request, delta)
+        except ValueError as exc:
+            raise _error(400, str(exc))
+    response = _json_body(f'{{"initiatives":{body},{json.dumps(envelope)[1:]}')
+    if layout == "columns":
+        response.headers["Content-Type"] = COLUMNS_MEDIA_TYPE
+    response.headers["Vary"] = "Accept"
+    return _with_validators(response, state, layout)
+
+
+async def api_summary(request: Request) -> Response:
+    state = await _run(request, get_board_state, flush=False)
+    not_modified = _not_modified(request, state)
+    if not_modified is not None:
+        return not_modified
+    summary = await _run(request, get_quadrant_summary)
+    return _with_validators(JSONResponse({"summary": summary, **state}), state)
+
+
+def _int_arg(request: Request, name: str) -> int | None:
+    value = request.query_params.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+async def api_audit(request: Request) -> Response:
+    args = request.query_params
+    try:
+        entries, next_cursor = await _run(
+            request,
+            get_audit_log,
+            initiative_id=_int_arg(request, "initiative_id"),
+            user=args.get("user"),
+            before=_int_arg(request, "before"),
+            limit=int(args.get("limit", 50)),
+        )
+    except ValueError as exc:
+        raise _error(400, str(exc))
+    return JSONResponse({"entries": entries, "next_cursor": next_cursor})
+
+
+async def api_search(request: Request) -> Response:
+    text = request.query_params.get("q", "")
+    try:
+        results = await _run(request, search_initiatives, text, limit=int(request.query_params.get("limit", 20)))
+    except ValueError as exc:
+        raise _error(400, str(exc))
+    return JSONResponse({"query": text, "results": results})
+
+
+async def api_export(request: Request) -> Response:
+    fmt = request.query_params.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        raise _error(400, f"Unsupported format: {fmt}")
+    include_deleted = request.query_params.get("include_deleted", "0").lower() in ("1", "true")
+    chunks = await _run(request, iter_export, fmt, include_deleted)
+
+    async def stream():
+        while (chunk := await anyio.to_thread.run_sync(next, chunks, None, limiter=_readers)) is not None:
+            yield chunk
+
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename=initiatives.{fmt}"},
+    )
+
+
+async def _spool_body(request: Request) -> SpooledTemporaryFile:
+    """Receive the whole request body, keeping at most IMPORT_SPOOL_BYTES in memory."""
+    spool = SpooledTemporaryFile(IMPORT_SPOOL_BYTES)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+async def api_import(request: Request) -> Response:
+    """Import CSV or NDJSON from the request body.
+
+    The body is received in full before a writer slot is taken, so a slow
+    upload does not hold up every other write.
+    """
+    fmt = request.query_params.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        raise _error(400, f"Unsupported format: {fmt}")
+
+    def run() -> dict:
+        result = import_initiatives(
+            (line.decode("utf-8") for line in spool),
+            fmt,
+            user=request.query_params.get("user", "import"),
+            progress=lambda totals: logger.info("Import progress: %s", totals),
+        )
+        return {**result, **get_board_state()}
+
+    with await _spool_body(request) as spool:
+        try:
+            return JSONResponse(await _run(request, run, write=True))
+        except UnicodeDecodeError as exc:
+            raise _error(400, f"Body is not valid UTF-8: {exc.reason}")
+
+
+async def api_save_positions(request: Request) -> Response:
+    data = await _json_object(request)
+    user = data.get("user", "user")
+    try:
+        positions = parse_positions(data)
+    except ValueError as exc:
+        raise _error(400, str(exc))
+    conflicts: list[dict] = []
+
+    def run() -> tuple[int, dict]:
+        updated = queue_positions(positions, user, conflicts)
+        return updated, get_board_state(flush=False)
+
+    updated, state = await _run(request, run, write=True)
+    body = {"status": "conflict" if conflicts else "ok", "updated": updated, **state}
+    if conflicts:
+        return JSONResponse({**body, "conflicts": conflicts}, status_code=409)
+    return JSONResponse(body)
+
+
+async def api_upsert_initiative(request: Request) -> Response:
+    data = await _json_object(request)
+    try:
+        fields = parse_initiative(data)
+    except ValueError as exc:
+        raise _error(400, str(exc))
+
+    def run() -> dict:
+        try:
+            new_id = upsert_initiative(
+                fields["id"],
+                data.get("title"),
+                data.get("details", ""),
+                data.get("color", "pink"),
+                data.get("category", ""),
+                fields["x"],
+                fields["y"],
+                data.get("user", "user"),
+                fields["change_version"],
+            )
+        except VersionConflict as exc:
+            return {"error": str(exc), "current": exc.current, **get_board_state()}
+        return {"id": new_id, **get_board_state()}
+
+    body = await _run(request, run, write=True)
+    return JSONResponse(body, status_code=409 if "error" in body else 200)
+
+
+async def api_delete_initiative(request: Request) -> Response:
+    initiative_id = request.path_params["initiative_id"]
+    user = request.query_params.get("user", "user")
+
+    def run() -> dict:
+        delete_initiative(initiative_id, user)
+        return {"status": "ok", **get_board_state()}
+
+    return JSONResponse(await _run(request, run, write=True))
+
+
+async def api_last_updated(request: Request) -> Response:
+    state = await _run(request, get_board_state, flush=False)
+    return _not_modified(request, state) or _with_validators(JSONResponse(state), state)
+
+
+async def api_stream(request: Request) -> Response:
+    """Server-Sent Events stream of board changes; see :func:`api.api_stream`."""
+    notifier = notifier_for(await _db_path(request))
+    last_event_id = request.headers.get("last-event-id", "")
+    token = anyio.lowlevel.current_token()
+    # The event the stream is waiting on; set from the publishing thread.
+    arrived = [anyio.Event()]
+
+    def wake() -> None:
+        try:
+            anyio.from_thread.run_sync(arrived[0].set, token=token)
+        except RuntimeError:
+            # The event loop has shut down; nobody is waiting any more.
+            pass
+
+    async def generate():
+        subscription = await _run(request, notifier.subscribe, wake)
+        try:
+            yield "retry: 3000\n\n"
+            if last_event_id.isdigit():
+                catch_up = await _run(request, get_changes, int(last_event_id))
+                if catch_up["changed"] or catch_up["deleted"]:
+                    yield sse(catch_up)
+            while True:
+                # Replaced before the queue is checked, so an event published
+                # after the check sets the event waited on below.
+                arrived[0] = anyio.Event()
+                event = subscription.get(timeout=0)
+                if event is not None:
+                    yield sse(event)
+                    continue
+                with anyio.move_on_after(STREAM_HEARTBEAT) as idle:
+                    await arrived[0].wait()
+                if idle.cancelled_caught:
+                    yield ": keep-alive\n\n"
+        finally:
+            notifier.unsubscribe(subscription)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def api_boards(request: Request) -> Response:
+    if request.method == "GET":
+        return JSONResponse({"boards": await anyio.to_thread.run_sync(list_boards, limiter=_readers)})
+    board = (await _json_object(request)).get("board", "")
+    try:
+        await anyio.to_thread.run_sync(create_board, board, limiter=_writers)
+    except ValueError as exc:
+        raise _error(400, str(exc))
+    return JSONResponse({"board": board}, status_code=201)
+
+
+async def api_metrics(request: Request) -> Response:
+    """Latency histograms and counters of this worker in Prometheus text format."""
+    return Response(render(), media_type="text/plain; version=0.0.4")
+
+
+class _MetricsMiddleware:
+    """Record latency, rows and bytes per endpoint as :mod:`api` does."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        rows = track_rows()
+        response = {"status": 500, "size": 0, "stream": False}
+
+        async def counting_send(message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["stream"] = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message["headers"]
+                )
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            if not response["stream"]:
+                endpoint = getattr(scope.get("endpoint"), "__name__", "unmatched")
+                seconds = time.perf_counter() - started
+                record_request(endpoint, scope["method"], response["status"], seconds, rows[0], response["size"])
+
+
+class _EncodingTagMiddleware:
+    """Give gzipped bodies their own ETag, as :func:`api._compress` does.
+
+    Sits just outside ``GZipMiddleware``, which leaves the ETag alone and
+    appends ``Accept-Encoding`` to ``Vary`` even when it is already listed.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def tagging_send(message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if etag and headers.get("content-encoding") == "gzip":
+                    headers["ETag"] = f'{etag[:-1]}{GZIP_ETAG_SUFFIX}"'
+                if "vary" in headers:
+                    vary = [value.strip() for value in headers["vary"].split(",")]
+                    headers["Vary"] = ", ".join(dict.fromkeys(vary))
+            await send(message)
+
+        await self.app(scope, receive, tagging_send)
+
+
+async def _http_error(request: Request, exc: HTTPException) -> Response:
+    return JSONResponse({"error": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+
+
+_routes = [
+    Route("/initiatives", api_get_initiatives, methods=["GET"]),
+    Route("/summary", api_summary, methods=["GET"]),
+    Route("/audit", api_audit, methods=["GET"]),
+    Route("/search", api_search, methods=["GET"]),
+    Route("/export", api_export, methods=["GET"]),
+    Route("/import", api_import, methods=["POST"]),
+    Route("/positions", api_save_positions, methods=["POST"]),
+    Route("/initiative", api_upsert_initiative, methods=["POST"]),
+    Route("/initiative/{initiative_id:int}", api_delete_initiative, methods=["DELETE"]),
+    Route("/last_updated", api_last_updated, methods=["GET"]),
+    Route("/stream", api_stream, methods=["GET"]),
+]
+
+app = Starlette(
+    routes=[
+        Route("/api/metrics", api_metrics, methods=["GET"]),
+        Route("/api/boards", api_boards, methods=["GET", "POST"]),
+        Mount("/api/boards/{board}", routes=_routes),
+        Mount("/api", routes=_routes),
+    ],
+    middleware=[
+        Middleware(
+            CORSMiddleware,
+            allow_origins=["*"],
+            allow_methods=["*"],
+            allow_headers=["*"],
+            expose_headers=["ETag", "Last-Modified"],
+        ),
+        Middleware(_MetricsMiddleware),
+        Middleware(_EncodingTagMiddleware),
+        Middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=GZIP_LEVEL),
+    ],
+    exception_handlers={HTTPException: _http_error},
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the initiatives API with uvicorn.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    uvicorn.run(
+        "asgi:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+    )
@@ -0,0 +1,207 @@
+"""Background, batched writer for the ``audit_log`` table.
+
+:mod:`db` hands every committed change to :meth:`AuditWriter.record`, which
+only enqueues it. A single writer thread drains the bounded queue and
+inserts whole batches in one transaction per database file, keeping
+auditing off the latency path of the write that produced it. Pending
+entries are flushed when the process exits.
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import AbstractContextManager
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Entries older than this many days are deleted once a board snapshot
+# covers them; 0 keeps them forever.
+RETENTION_DAYS = float(os.getenv("LUMEN_AUDIT_RETENTION_DAYS", "0"))
+# Move entries older than this many days are compacted to the last move per
+# initiative per day; 0 disables compaction. Compaction deletes moves that
+# db.get_initiatives_as_of replays, so reconstructions within compacted days
+# show positions from before those moves; it is therefore off by default.
+COMPACT_AFTER_DAYS = float(os.getenv("LUMEN_AUDIT_COMPACT_AFTER_DAYS", "0"))
+# Seconds between retention/compaction passes run by the writer thread.
+MAINTENANCE_INTERVAL = float(os.getenv("LUMEN_AUDIT_MAINTENANCE_INTERVAL", "3600"))
+
+_INSERT_SQL = (
+    "INSERT INTO audit_log (action, initiative_id, initiative_title, user, details, timestamp, board_version) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+_STOP = object()
+
+
+def apply_retention(
+    conn: sqlite3.Connection,
+    retention_days: float = RETENTION_DAYS,
+    compact_after_days: float = COMPACT_AFTER_DAYS,
+) -> int:
+    """Delete expired entries and compact old moves; return rows removed.
+
+    db.get_initiatives_as_of replays the entries recorded after the newest
+    snapshot taken before the time asked for, so retention only deletes
+    entries already reflected in the newest snapshot taken before the
+    cutoff; without such a snapshot nothing expires.
+    """
+    removed = 0
+    if retention_days > 0:
+        removed += conn.execute(
+            """
+            DELETE FROM audit_log
+            WHERE timestamp < datetime('now', :age)
+              AND board_version <= (
+                  SELECT version FROM board_snapshots
+                  WHERE taken_at <= datetime('now', :age)
+                  ORDER BY taken_at DESC, id DESC LIMIT 1
+              )
+            """,
+            {"age": f"-{retention_days} days"},
+        ).rowcount
+    if compact_after_days > 0:
+        removed += conn.execute(
+            """
+            DELETE FROM audit_log
+            WHERE action = 'move' AND timestamp < datetime('now', :age)
+              AND id NOT IN (
+                  SELECT MAX(id) FROM audit_log
+                  WHERE action = 'move' AND timestamp < datetime('now', :age)
+                  GROUP BY initiative_id, date(timestamp)
+              )
+            """,
+            {"age": f"-{compact_after_days} days"},
+        ).rowcount
+    conn.commit()
+    return removed
+
+
+class AuditWriter:
+    """Queue audit entries and insert them in batches from a worker thread.
+
+    ``connect`` maps a database path to a context manager yielding a
+    connection. :meth:`record` blocks when ``max_queue`` entries are
+    pending, applying backpressure rather than dropping history.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[str], AbstractContextManager[sqlite3.Connection]],
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.2,
+    ) -> None:
+        self._connect = connect
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._paths: set[str] = set()
+        self._last_maintenance = time.monotonic()
+        self.written = 0
+
+    def record(self, path: str, entries: Iterable[tuple]) -> None:
+        """Enqueue ``(action, initiative_id, title, user, details, timestamp, board_version)`` rows."""
+        self._ensure_thread()
+        for entry in entries:
+            self._queue.put((path, entry))
+
+    def flush(self, timeout: float | None = 10.0) -> bool:
+        """Wait until everything recorded so far is written."""
+        with self._lock:
+            if self._thread is None:
+                return True
+        self._ensure_thread()
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Write all pending entries and stop the worker thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="lumen-audit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch, markers, stop = [], [], False
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stop or markers or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if stop:
+                # Drain whatever arrived before the stop request.
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        markers.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+            # A dead writer would leave flush() waiting and record() blocked
+            # once the queue fills, so failures are logged and the loop goes on.
+            try:
+                self._write_batch(batch)
+            except Exception:
+                logger.exception("Failed to write %d audit entries", len(batch))
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+            try:
+                self._maybe_maintain()
+            except Exception:
+                logger.exception("Audit maintenance failed")
+
+    def _write_batch(self, batch: list[tuple]) -> None:
+        by_path: dict[str, list[tuple]] = {}
+        for path, entry in batch:
+            by_path.setdefault(path, []).append(entry)
+        for path, entries in by_path.items():
+            self._paths.add(path)
+            try:
+                with self._connect(path) as conn:
+                    conn.executemany(_INSERT_SQL, entries)
+                    conn.commit()
+                self.written += len(entries)
+            except sqlite3.Error:
+                logger.exception("Failed to write %d audit entries to %s", len(entries), path)
+
+    def _maybe_maintain(self) -> None:
+        if time.monotonic() - self._last_maintenance < MAINTENANCE_INTERVAL:
+            return
+        self._last_maintenance = time.monotonic()
+        for path in list(self._paths):
+            try:
+                with self._connect(path) as conn:
+                    removed = apply_retention(conn)
+                if removed:
+                    logger.info("Audit maintenance removed %d entries from %s", removed, path)
+            except sqlite3.Error:
+                logger.exception("Audit maintenance failed for %s", path)
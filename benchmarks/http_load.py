@@ -0,0 +1,148 @@
+"""Compare throughput and tail latency of the Flask and ASGI API servers.
+
+Starts each server as a subprocess on a fresh copy of a seeded database,
+then drives ``/api/initiatives`` reads and ``/api/positions`` writes from
+concurrent client threads and prints requests per second and p50/p95/p99
+latencies in milliseconds::
+
+    python benchmarks/http_load.py --rows 2000 --clients 32 --seconds 10
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SERVERS = {
+    "flask": [sys.executable, "-c", "import api; api.app.run(port={port}, threaded=True)"],
+    "asgi": [sys.executable, "asgi.py", "--port", "{port}", "--workers", "{workers}"],
+}
+
+
+def _seed(path: Path, rows: int) -> None:
+    env = {**os.environ, "LUMEN_DB": str(path), "PYTHONPATH": str(ROOT)}
+    script = (
+        "import db; db.init_db(seed=False); "
+        "import json; "
+        f"db.import_initiatives((json.dumps({{'title': f'Item {{i}}', 'x': i % 100, 'y': i * 7 % 100}}) "
+        f"for i in range({rows})), 'ndjson', 'bench')"
+    )
+    subprocess.run([sys.executable, "-c", script], env=env, check=True)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+
+def _drive(base: str, clients: int, seconds: float, write_share: float, rows: int) -> dict:
+    latencies: dict[str, list[float]] = {"read": [], "write": []}
+    errors = 0
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def client(index: int) -> None:
+        nonlocal errors
+        n = 0
+        while time.monotonic() < stop:
+            n += 1
+            write = (n * (index + 1)) % 100 < write_share * 100
+            if write:
+                body = json.dumps({"positions": [{"id": (index * 997 + n) % rows + 1, "x": n % 100, "y": index % 100}]})
+                req = urllib.request.Request(
+                    f"{base}/api/positions", body.encode(), {"Content-Type": "application/json"}
+                )
+            else:
+                req = urllib.request.Request(f"{base}/api/initiatives")
+            started = time.perf_counter()
+            try:
+                urllib.request.urlopen(req, timeout=30).read()
+            except (urllib.error.URLError, ConnectionError):
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                latencies["write" if write else "read"].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = {"errors": errors}
+    for kind, samples in latencies.items():
+        if samples:
+            result[kind] = {
+                "rps": round(len(samples) / seconds, 1),
+                "p50": round(_percentile(samples, 0.50), 1),
+                "p95": round(_percentile(samples, 0.95), 1),
+                "p99": round(_percentile(samples, 0.99), 1),
+                "mean": round(statistics.fmean(samples) * 1000, 1),
+            }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--write-share", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--servers", nargs="+", default=list(SERVERS), choices=list(SERVERS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded = Path(tmp) / "seed.db"
+        _seed(seeded, args.rows)
+        results = {}
+        for name in args.servers:
+            db_path = Path(tmp) / f"{name}.db"
+            shutil.copy(seeded, db_path)
+            port = _free_port()
+            command = [part.format(port=port, workers=args.workers) for part in SERVERS[name]]
+            env = {**os.environ, "LUMEN_DB": str(db_path), "LUMEN_BOARDS_DIR": str(Path(tmp) / "boards")}
+            server = subprocess.Popen(
+                command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                base = f"http://127.0.0.1:{port}"
+                _wait_ready(f"{base}/api/last_updated")
+                results[name] = _drive(base, args.clients, args.seconds, args.write_share, args.rows)
+            finally:
+                server.terminate()
+                server.wait()
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
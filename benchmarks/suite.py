@@ -0,0 +1,312 @@
+"""Reproducible benchmarks for the db and API hot paths.
+
+Each portfolio size gets a freshly seeded database in a temporary
+directory: deterministic synthetic initiatives, a share of them
+soft-deleted. Against it the suite times board reads (cold and cached),
+the ``/api/initiatives`` variants, bulk position saves, upserts, and
+several processes writing to the same file at once.
+
+Record a baseline, then compare a later run against it::
+
+    python benchmarks/suite.py --rows 10000 100000 --save benchmarks/baselines/default.json
+    python benchmarks/suite.py --compare benchmarks/baselines/default.json
+
+A comparison reruns the suite with the baseline's parameters (or reads
+``--current``) and exits with status 1 if any median latency grew, or any
+throughput fell, by more than ``--tolerance``. Baselines are only
+comparable on the machine that recorded them.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CATEGORIES = ("Growth", "Platform", "Compliance", "Operations", "Research", "Support")
+COLORS = ("pink", "blue", "green", "yellow", "orange", "purple")
+# Rows moved per bulk position save, as when a board is re-laid out.
+BULK_MOVE = 500
+# Rows moved per /api/positions request, as sent after a drag session.
+API_MOVE = 50
+
+
+def _import_db(db_path: str):
+    """Import :mod:`db` with ``db_path`` as its default database."""
+    os.environ["LUMEN_DB"] = db_path
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    import db
+
+    return db
+
+
+def seed(path: str, rows: int, deleted_share: float = 0.1, seed_value: int = 1) -> None:
+    """Create a board at ``path`` with ``rows`` synthetic initiatives.
+
+    The same arguments always produce the same rows; every
+    ``1 / deleted_share``-th of them is soft-deleted.
+    """
+    db = sys.modules["db"]
+    rng = random.Random(seed_value)
+    records = (
+        json.dumps(
+            {
+                "title": f"Initiative {i}",
+                "details": " ".join(rng.choices(("scope", "risk", "customer", "launch", "cost"), k=12)),
+                "color": rng.choice(COLORS),
+                "category": rng.choice(CATEGORIES),
+                "x": round(rng.uniform(0, 100), 2),
+                "y": round(rng.uniform(0, 100), 2),
+            }
+        )
+        for i in range(rows)
+    )
+    with db.use_path(path):
+        db.init_db(seed=False)
+        db.import_initiatives(records, "ndjson", user="bench")
+    if deleted_share:
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.execute("UPDATE initiatives SET is_deleted = 1 WHERE id % ? = 0", (round(1 / deleted_share),))
+        conn.close()
+
+
+def _summarize(samples: list[float], items: int = 1) -> dict:
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 3),
+        "ops_per_s": round(items * len(ordered) / sum(ordered), 1),
+    }
+
+
+def _measure(func: Callable[[int], object], repeat: int, items: int = 1, before: Callable | None = None) -> dict:
+    """Time ``func(i)`` ``repeat`` times after one warm-up call."""
+    if before is not None:
+        before()
+    func(-1)
+    samples = []
+    for i in range(repeat):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - started)
+    return _summarize(samples, items)
+
+
+def _moves(rng: random.Random, ids: list[int], count: int) -> list[dict]:
+    return [
+        {"id": row_id, "x": round(rng.uniform(0, 100), 2), "y": round(rng.uniform(0, 100), 2)}
+        for row_id in rng.sample(ids, count)
+    ]
+
+
+def _live_ids(path: str) -> list[int]:
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT id FROM initiatives WHERE is_deleted = 0")]
+    finally:
+        conn.close()
+
+
+def bench_board(path: str, repeat: int, processes: int, seconds: float) -> dict:
+    """Run every scenario against the seeded board at ``path``."""
+    db = sys.modules["db"]
+    import api
+
+    client = api.app.test_client()
+    rng = random.Random(2)
+    ids = _live_ids(path)
+    # Small portfolios (--rows) have fewer rows than a full move batch.
+    bulk_move, api_move = min(BULK_MOVE, len(ids)), min(API_MOVE, len(ids))
+    results = {}
+    with db.use_path(path):
+        invalidate = lambda: db._snapshot_cache.invalidate(path)  # noqa: E731
+        results["get_initiatives.cold"] = _measure(lambda i: db.get_initiatives(), repeat, before=invalidate)
+        results["get_initiatives.cached"] = _measure(lambda i: db.get_initiatives(), repeat)
+        results["get_quadrant_summary"] = _measure(lambda i: db.get_quadrant_summary(), repeat)
+
+        def api_get(url: str) -> Callable[[int], object]:
+            def call(i: int) -> None:
+                response = client.get(url)
+                assert response.status_code == 200, response.status_code
+                response.get_data()
+
+            return call
+
+        results["api.initiatives.cold"] = _measure(api_get("/api/initiatives"), repeat, before=invalidate)
+        results["api.initiatives.cached"] = _measure(api_get("/api/initiatives"), repeat)
+        results["api.initiatives.page"] = _measure(
+            api_get("/api/initiatives?category=Growth&limit=100&fields=id,title,x,y"), repeat
+        )
+        since = db.get_board_version()
+        db.update_positions(_moves(rng, ids, api_move), "bench")
+        results["api.initiatives.since"] = _measure(api_get(f"/api/initiatives?since={since}"), repeat)
+
+        batches = [_moves(rng, ids, bulk_move) for _ in range(repeat + 1)]
+        results["update_positions.bulk"] = _measure(
+            lambda i: db.update_positions(batches[i], "bench"), repeat, items=bulk_move
+        )
+
+        def api_post(i: int) -> None:
+            response = client.post("/api/positions", json={"positions": _moves(rng, ids, api_move), "user": "bench"})
+            assert response.status_code == 200, response.status_code
+
+        results["api.positions"] = _measure(api_post, repeat, items=api_move)
+
+        def upsert(i: int) -> None:
+            row = rng.choice(ids) if i % 2 else None
+            db.upsert_initiative(row, f"Upsert {i}", "", "blue", "Growth", rng.uniform(0, 100), rng.uniform(0, 100), "bench")
+
+        results["upsert_initiative"] = _measure(upsert, repeat * 5)
+    results["contention"] = contention(path, processes, seconds)
+    return results
+
+
+def _contend(args: tuple) -> dict:
+    """Worker process: mix reads, drags and edits on one board for a while."""
+    path, index, seconds = args
+    db = _import_db(path)
+    rng = random.Random(100 + index)
+    ids = _live_ids(path)
+    writes, reads, errors = [], 0, 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        roll = rng.random()
+        started = time.perf_counter()
+        try:
+            if roll < 0.5:
+                db.get_initiative_rows()
+                reads += 1
+                continue
+            if roll < 0.8:
+                db.update_positions(_moves(rng, ids, min(20, len(ids))), f"bench-{index}")
+            else:
+                row = rng.choice(ids)
+                db.upsert_initiative(row, f"Edit {row}", "", "pink", "Support", rng.uniform(0, 100), rng.uniform(0, 100), f"bench-{index}")
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        writes.append(time.perf_counter() - started)
+    db.flush_audit_log()
+    return {"writes": writes, "reads": reads, "errors": errors}
+
+
+def contention(path: str, processes: int, seconds: float) -> dict:
+    """Time writes while ``processes`` processes share the database file."""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        outcomes = pool.map(_contend, [(path, i, seconds) for i in range(processes)])
+    writes = [sample for outcome in outcomes for sample in outcome["writes"]]
+    summary = _summarize(writes) if writes else {"n": 0}
+    summary.update(
+        processes=processes,
+        # Wall-clock rates: the processes overlap, so samples can't be summed.
+        ops_per_s=round(len(writes) / seconds, 1),
+        reads_per_s=round(sum(o["reads"] for o in outcomes) / seconds, 1),
+        p99_ms=round(sorted(writes)[int(0.99 * len(writes))] * 1000, 3) if writes else None,
+        errors=sum(o["errors"] for o in outcomes),
+    )
+    return summary
+
+
+def run(rows: list[int], repeat: int, deleted_share: float, processes: int, seconds: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _import_db(os.path.join(tmp, "default.db"))
+        os.environ["LUMEN_BOARDS_DIR"] = os.path.join(tmp, "boards")
+        results = {}
+        for size in rows:
+            path = os.path.join(tmp, f"bench-{size}.db")
+            seed(path, size, deleted_share)
+            print(f"Seeded {size} rows; running scenarios", file=sys.stderr)
+            results[str(size)] = bench_board(path, repeat, processes, seconds)
+        db.flush_audit_log()
+        db.close_connections()
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+            "rows": rows,
+            "repeat": repeat,
+            "deleted_share": deleted_share,
+            "processes": processes,
+            "seconds": seconds,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    """Return a line per metric that regressed by more than ``tolerance``.
+
+    Median latency (``p50_ms``) must not grow and throughput
+    (``ops_per_s``) must not fall by more than that fraction.
+    """
+    regressions = []
+    for size, scenarios in baseline["results"].items():
+        for name, before in scenarios.items():
+            after = current["results"].get(size, {}).get(name)
+            if after is None:
+                regressions.append(f"{size} {name}: missing from current run")
+                continue
+            for metric, worse in (("p50_ms", 1), ("ops_per_s", -1)):
+                old, new = before.get(metric), after.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                line = f"{size:>7} {name:<26} {metric:<9} {old:>10} -> {new:<10} ({change:+.0%})"
+                if change * worse > tolerance:
+                    regressions.append(line)
+                print(line + ("  REGRESSION" if change * worse > tolerance else ""))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--deleted-share", type=float, default=0.1)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of the contention run")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a saved baseline")
+    parser.add_argument("--current", metavar="PATH", help="results to compare instead of a new run")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    if args.current:
+        current = json.loads(Path(args.current).read_text())
+    else:
+        params = baseline["meta"] if baseline else vars(args)
+        current = run(params["rows"], params["repeat"], params["deleted_share"], params["processes"], params["seconds"])
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(current, indent=2) + "\n")
+    if baseline is None:
+        print(json.dumps(current, indent=2))
+        return
+    regressions = compare(baseline, current, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
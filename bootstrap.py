@@ -0,0 +1,109 @@
+"""Once-per-process startup work shared by the Streamlit app and the API.
+
+Streamlit re-executes ``app.py`` on every interaction, but imported modules
+stay loaded, so state kept here survives reruns. Each phase runs once per
+process and its duration is recorded for :func:`startup_report`.
+"""
+
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+import db
+
+# Build-time version stamp, used when git metadata is unavailable (e.g. in
+# a container image). Write it with ``python bootstrap.py``.
+VERSION_FILE = os.getenv(
+    "LUMEN_VERSION_FILE",
+    os.path.join(os.path.dirname(__file__), "version.txt"),
+)
+
+_lock = threading.Lock()
+_version: str | None = None
+_databases: dict[str, dict] = {}
+_timings: dict[str, float] = {}
+
+
+@contextmanager
+def _phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timings[name] = _timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def _git_version() -> str | None:
+    """Return ``<commit count>-<short hash>`` from git, or ``None``."""
+    try:
+        count = subprocess.check_output(
+            ["git", "rev-list", "--count", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+        short = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+        return f"{count}-{short}"
+    except Exception:
+        return None
+
+
+def _stamped_version() -> str | None:
+    try:
+        with open(VERSION_FILE, encoding="utf-8") as fh:
+            return fh.read().strip() or None
+    except OSError:
+        return None
+
+
+def get_version() -> str:
+    """Return short version information, computed once per process.
+
+    Uses the git commit count combined with the short hash so the value
+    automatically changes with every commit. Falls back to the build-time
+    stamp file and then to ``"dev"`` so the page always renders.
+    """
+    global _version
+    if _version is None:
+        with _lock, _phase("version"):
+            if _version is None:
+                _version = _git_version() or _stamped_version() or "dev"
+    return _version
+
+
+def ensure_db() -> dict:
+    """Create the schema and seed data once per process and database file.
+
+    Returns the recorded state for the current ``db.DB_PATH``: whether the
+    seed CSV was loaded and how long initialisation took.
+    """
+    path = db.DB_PATH
+    state = _databases.get(path)
+    if state is None:
+        with _lock:
+            state = _databases.get(path)
+            if state is None:
+                start = time.perf_counter()
+                with _phase("init_db"):
+                    seeded = db.init_db()
+                state = {"seeded": seeded, "seconds": time.perf_counter() - start}
+                _databases[path] = state
+    return state
+
+
+def startup_report() -> dict:
+    """Return the time spent in each startup phase, in seconds."""
+    return dict(_timings)
+
+
+def write_version_stamp() -> str:
+    """Record the current git version in :data:`VERSION_FILE`."""
+    version = _git_version() or "dev"
+    with open(VERSION_FILE, "w", encoding="utf-8") as fh:
+        fh.write(version + "\n")
+    return version
+
+
+if __name__ == "__main__":
+    print(write_version_stamp())
@@ -1,9 +1,35 @@
+import atexit
+import csv
+import functools
+import html
+import io
+import json
+import logging
 import os
+import re
+import reprlib
 import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, namedtuple
 from contextlib import contextmanager
-from typing import Tuple
+from contextvars import ContextVar
+from operator import itemgetter
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Mapping, Sequence, TextIO, Tuple
 
-import pandas as pd
+import migrations
+from audit import AuditWriter
+from metrics import Histogram, count_rows
+from writebehind import PartialFlushError, WriteBehindBuffer
+
+# pandas is imported lazily by the few functions that build DataFrames so
+# the API can serve requests without paying for the import.
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
 
 # Always resolve the database relative to this file so multiple app
 # instances on the same machine share a single database file.  This
@@ -15,120 +41,1505 @@ DB_PATH = os.getenv(
 )
 
 
-def _value_effort(x: float, y: float) -> Tuple[str, str]:
+DEFAULT_THRESHOLDS = (33.0, 66.0)
+
+
+def _parse_thresholds(raw: str) -> Tuple[float, float]:
+    """Parse ``LUMEN_THRESHOLDS``, falling back to the defaults if it is malformed."""
+    try:
+        low, high = (float(t) for t in raw.split(","))
+    except ValueError:
+        low = high = float("nan")
+    if not low < high:
+        logger.warning("Ignoring LUMEN_THRESHOLDS=%r; expected two increasing numbers", raw)
+        return DEFAULT_THRESHOLDS
+    return low, high
+
+
+# Boundaries between the Low/Medium and Medium/High buckets on the 0-100
+# scale, e.g. ``LUMEN_THRESHOLDS=25,75``. A coordinate equal to a boundary
+# falls into the lower bucket.
+THRESHOLDS: Tuple[float, float] = _parse_thresholds(os.getenv("LUMEN_THRESHOLDS", "33,66"))
+BUCKETS = ("Low", "Medium", "High")
+
+# Calls to the functions below slower than this many milliseconds are
+# logged with their arguments; 0 disables this slow-query log.
+SLOW_QUERY_MS = float(os.getenv("LUMEN_SLOW_QUERY_MS", "0"))
+
+_call_seconds = Histogram("lumen_db_call_seconds", "Time spent in db functions.", ("function",))
+_stage_seconds = Histogram(
+    "lumen_db_stage_seconds",
+    "Time spent acquiring connections, waiting for the write lock and building DataFrames and JSON.",
+    ("stage",),
+)
+_connect_seconds = _stage_seconds.labels(stage="connect")
+
+
+def _timed(func: Callable) -> Callable:
+    """Record the duration of every call to ``func`` and log slow ones."""
+    name = func.__name__
+    observe = _call_seconds.labels(function=name).observe
+
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            observe(elapsed)
+            if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+                logger.warning(
+                    "Slow %s took %.1f ms on %s: %s", name, elapsed * 1000, current_path(), reprlib.repr((args, kwargs))
+                )
+
+    return timed
+
+
+def _value_effort(x: float, y: float, thresholds: Sequence[float] | None = None) -> Tuple[str, str]:
     """Return categorical value/effort strings for coordinates.
 
     Parameters
     ----------
     x, y:
         Coordinates on a 0-100 scale.
+    thresholds:
+        Bucket boundaries; defaults to :data:`THRESHOLDS`.
     """
-    value = "High" if y > 66 else "Medium" if y > 33 else "Low"
-    effort = "High" if x > 66 else "Medium" if x > 33 else "Low"
+    low, high = thresholds or THRESHOLDS
+    value = "High" if y > high else "Medium" if y > low else "Low"
+    effort = "High" if x > high else "Medium" if x > low else "Low"
     return value, effort
 
 
+def classify_value_effort(xs, ys, thresholds: Sequence[float] | None = None):
+    """Vectorised :func:`_value_effort` for whole arrays of coordinates.
+
+    Parameters
+    ----------
+    xs, ys:
+        Array-likes of effort (x) and value (y) coordinates.
+    thresholds:
+        Bucket boundaries; defaults to :data:`THRESHOLDS`.
+
+    Returns two NumPy arrays of bucket names: values and efforts.
+    """
+    import numpy as np
+
+    bounds = np.asarray(thresholds or THRESHOLDS, dtype=float)
+    names = np.array(BUCKETS)
+    values = names[np.digitize(np.asarray(ys, dtype=float), bounds, right=True)]
+    efforts = names[np.digitize(np.asarray(xs, dtype=float), bounds, right=True)]
+    return values, efforts
+
+
+# Connection tuning. Every connection runs in WAL mode so readers never
+# block the writer, and waits up to ``BUSY_TIMEOUT_MS`` for the write lock
+# instead of failing immediately with "database is locked".
+POOL_SIZE = int(os.getenv("LUMEN_DB_POOL_SIZE", "8"))
+BUSY_TIMEOUT_MS = int(os.getenv("LUMEN_DB_BUSY_TIMEOUT", "5000"))
+CACHE_SIZE_KB = int(os.getenv("LUMEN_DB_CACHE_KB", "16384"))
+
+
+def _open_connection(path: str) -> sqlite3.Connection:
+    """Open a new connection to ``path`` with the tuning pragmas applied."""
+    # Connections are handed between threads by the pool, but only one
+    # thread ever uses a given connection at a time.
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+class _ConnectionPool:
+    """Thread-safe pool of reusable connections to one database file.
+
+    At most ``size`` idle connections are kept. When every pooled
+    connection is checked out a new one is opened rather than blocking, and
+    surplus connections are closed when they are released, as are
+    connections released after the pool was closed.
+    """
+
+    def __init__(self, path: str, size: int) -> None:
+        self.path = path
+        self.size = size
+        self.last_used = time.monotonic()
+        self._idle: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return _open_connection(self.path)
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+# With one database file per board, pools are kept for at most
+# MAX_OPEN_DATABASES files, least recently used first out, and a file's
+# pool is closed once it has not been used for DATABASE_IDLE_SECONDS.
+MAX_OPEN_DATABASES = int(os.getenv("LUMEN_MAX_OPEN_DATABASES", "64"))
+DATABASE_IDLE_SECONDS = float(os.getenv("LUMEN_DATABASE_IDLE_SECONDS", "300"))
+
+_pools: "OrderedDict[str, _ConnectionPool]" = OrderedDict()
+_pools_lock = threading.Lock()
+
+
+def _get_pool(path: str) -> _ConnectionPool:
+    now = time.monotonic()
+    evicted = []
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = _ConnectionPool(path, POOL_SIZE)
+        else:
+            _pools.move_to_end(path)
+        pool.last_used = now
+        while len(_pools) > MAX_OPEN_DATABASES:
+            evicted.append(_pools.popitem(last=False)[1])
+        while now - next(iter(_pools.values())).last_used > DATABASE_IDLE_SECONDS:
+            evicted.append(_pools.popitem(last=False)[1])
+    for stale in evicted:
+        stale.close()
+    return pool
+
+
+def open_databases() -> list[str]:
+    """Return the paths that currently have a connection pool, oldest first."""
+    with _pools_lock:
+        return list(_pools)
+
+
+def close_connections() -> None:
+    """Close every idle pooled connection, e.g. on shutdown."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+# Each board keeps its initiatives in its own file under BOARDS_DIR, so
+# writers on one board never wait for another board's lock. The database
+# used by this module is chosen per thread or request with use_board() or
+# use_path(); outside of those it is DB_PATH, the default board.
+BOARDS_DIR = os.getenv("LUMEN_BOARDS_DIR", os.path.join(os.path.dirname(__file__), "boards"))
+_BOARD_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,63}")
+_active_path: ContextVar[str | None] = ContextVar("lumen_db_path", default=None)
+_initialized: set[str] = set()
+_init_lock = threading.Lock()
+
+
+def current_path() -> str:
+    """Return the database file used by this thread or request."""
+    return _active_path.get() or DB_PATH
+
+
 @contextmanager
-def _connect():
-    """Context manager yielding a SQLite connection."""
-    conn = sqlite3.connect(DB_PATH)
+def use_path(path: str):
+    """Direct this module's functions at the database file ``path``."""
+    token = _active_path.set(path)
+    try:
+        yield path
+    finally:
+        _active_path.reset(token)
+
+
+def board_path(board: str) -> str:
+    """Return the database file for ``board``; raise ``ValueError`` for bad names."""
+    if not _BOARD_NAME.fullmatch(board or ""):
+        raise ValueError(f"Invalid board name: {board!r}")
+    return os.path.join(BOARDS_DIR, f"{board}.db")
+
+
+def list_boards() -> list[str]:
+    """Return the names of the existing boards, sorted."""
+    try:
+        names = os.listdir(BOARDS_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-3] for name in names if name.endswith(".db") and _BOARD_NAME.fullmatch(name[:-3]))
+
+
+@contextmanager
+def use_board(board: str | None, create: bool = False):
+    """Direct this module's functions at ``board``'s database.
+
+    ``None`` selects the default board. A board's schema is migrated the
+    first time it is used in this process. Unknown boards raise
+    ``LookupError`` unless ``create`` is true, in which case an empty board
+    is created.
+    """
+    if board is None:
+        with use_path(DB_PATH) as path:
+            yield path
+        return
+    path = board_path(board)
+    if path not in _initialized:
+        if not create and not os.path.exists(path):
+            raise LookupError(f"Unknown board: {board}")
+        with _init_lock:
+            if path not in _initialized:
+                os.makedirs(BOARDS_DIR, exist_ok=True)
+                with use_path(path):
+                    init_db(seed=False)
+                _initialized.add(path)
+    with use_path(path):
+        yield path
+
+
+def create_board(board: str) -> str:
+    """Create ``board`` if it does not exist yet and return its database file."""
+    with use_board(board, create=True) as path:
+        return path
+
+
+@contextmanager
+def _connect(path: str | None = None):
+    """Context manager yielding a pooled SQLite connection.
+
+    Connects to ``path``, defaulting to :func:`current_path`. Any transaction
+    left open when the block exits (for instance because it raised) is
+    rolled back before the connection returns to the pool.
+    """
+    started = time.perf_counter()
+    pool = _get_pool(path or current_path())
+    conn = pool.acquire()
+    _connect_seconds.observe(time.perf_counter() - started)
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
+
+
+# Callables notified after every committed write made through this module,
+# with the database path and an event of the form
+# ``{"version", "changed", "deleted"}``.
+_change_listeners: list[Callable[[str, dict], None]] = []
+
+
+def add_change_listener(listener: Callable[[str, dict], None]) -> None:
+    """Register ``listener`` to be called after each committed write."""
+    _change_listeners.append(listener)
+
+
+def remove_change_listener(listener: Callable[[str, dict], None]) -> None:
+    if listener in _change_listeners:
+        _change_listeners.remove(listener)
+
+
+def _read_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT version FROM board_state WHERE id = 1").fetchone()
+    return row[0] if row else 0
 
 
-def init_db() -> None:
-    """Initialize database tables and seed data from CSV if empty."""
+_CHANGES_QUERY = "SELECT id, is_deleted FROM initiatives WHERE change_version > ? ORDER BY change_version"
+
+
+def _collect_changes(conn: sqlite3.Connection, since: int) -> dict:
+    changed, deleted = [], []
+    for row_id, is_deleted in conn.execute(_CHANGES_QUERY, (since,)):
+        (deleted if is_deleted else changed).append(row_id)
+    return {"version": _read_version(conn), "changed": changed, "deleted": deleted}
+
+
+@_timed
+def get_changes(since: int) -> dict:
+    """Return the ids changed and deleted after board version ``since``."""
     with _connect() as conn:
-        c = conn.cursor()
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS initiatives (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                details TEXT,
-                color TEXT,
-                category TEXT,
-                x REAL,
-                y REAL,
-                value TEXT,
-                effort TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                created_by TEXT,
-                updated_by TEXT,
-                is_deleted BOOLEAN DEFAULT 0
+        return _collect_changes(conn, since)
+
+
+_audit_writer = AuditWriter(_connect)
+atexit.register(_audit_writer.close)
+
+_CHANGED_ROWS_QUERY = (
+    "SELECT id, title, details, color, category, x, y, value, effort, change_version, is_deleted "
+    "FROM initiatives WHERE change_version > ? ORDER BY change_version"
+)
+_AUDITED_FIELDS = ("title", "details", "color", "category", "x", "y", "value", "effort")
+
+
+@contextmanager
+def _write(action: str, user: str):
+    """Context manager for a write transaction.
+
+    The transaction takes the write lock up front (``BEGIN IMMEDIATE``) and
+    commits when the block exits normally. The rows it changed are read
+    back before the commit; afterwards they are queued for the audit log
+    under ``action`` and ``user`` and the change listeners are notified
+    with the ``since`` and new ``version`` and the ids changed and deleted.
+    """
+    path = current_path()
+    with _connect(path) as conn:
+        with _stage_seconds.time(stage="write_lock"):
+            conn.execute("BEGIN IMMEDIATE")
+        before = _read_version(conn)
+        yield conn
+        rows = conn.execute(_CHANGED_ROWS_QUERY, (before,)).fetchall()
+        version = _read_version(conn)
+        conn.commit()
+    _snapshot_cache.invalidate(path)
+    if not rows:
+        return
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+    _audit_writer.record(
+        path,
+        (
+            (
+                "delete" if row[-1] else action,
+                row[0],
+                row[1],
+                user,
+                json.dumps(dict(zip(_AUDITED_FIELDS, row[1:-2]))),
+                timestamp,
+                row[-2],
             )
-            """
+            for row in rows
+        ),
+    )
+    _maybe_snapshot(path, version)
+    # ``since`` lets listeners notice versions written by other processes
+    # between the last event they saw and this one.
+    event = {
+        "since": before,
+        "version": version,
+        "changed": [row[0] for row in rows if not row[-1]],
+        "deleted": [row[0] for row in rows if row[-1]],
+    }
+    for listener in list(_change_listeners):
+        listener(path, event)
+
+
+def flush_audit_log(timeout: float | None = 10.0) -> bool:
+    """Block until queued audit entries are written; ``False`` on timeout."""
+    return _audit_writer.flush(timeout)
+
+
+@_timed
+def get_audit_log(
+    initiative_id: int | None = None,
+    user: str | None = None,
+    before: int | None = None,
+    limit: int = 50,
+) -> Tuple[list[dict], int | None]:
+    """Return one page of audit entries, newest first.
+
+    Entries can be narrowed to one ``initiative_id`` and/or ``user``.
+    ``before`` is the keyset cursor returned with the previous page. Queued
+    entries are flushed first so callers see their own writes. Moves still
+    in the write-behind buffer are audited when they are written, not
+    before: this is a read and does not flush them.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    flush_audit_log()
+    clauses, params = [], []
+    if initiative_id is not None:
+        clauses.append("initiative_id = ?")
+        params.append(initiative_id)
+    if user is not None:
+        clauses.append("user = ?")
+        params.append(user)
+    if before is not None:
+        clauses.append("id < ?")
+        params.append(before)
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    with _connect() as conn:
+        cursor = conn.execute(
+            "SELECT id, action, initiative_id, initiative_title, user, details, timestamp "
+            f"FROM audit_log {where}ORDER BY id DESC LIMIT ?",
+            (*params, limit + 1),
         )
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS audit_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                action TEXT,
-                initiative_id INTEGER,
-                initiative_title TEXT,
-                user TEXT,
-                details TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        names = [col[0] for col in cursor.description]
+        entries = [dict(zip(names, row)) for row in cursor]
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = entries[-1]["id"]
+    for entry in entries:
+        entry["details"] = json.loads(entry["details"]) if entry["details"] else None
+    count_rows(len(entries))
+    return entries, next_cursor
+
+
+# A new board snapshot is taken in the background once this many changes
+# have accumulated since the previous one. This bounds the number of audit
+# entries replayed by get_initiatives_as_of however long the history is.
+SNAPSHOT_EVERY = int(os.getenv("LUMEN_SNAPSHOT_EVERY", "1000"))
+
+_HISTORY_FIELDS = ("id", *_AUDITED_FIELDS)
+# Bounded above by the version of the next snapshot, so a reconstruction
+# reads at most one snapshot interval of the index, not the rest of history.
+_HISTORY_DELTAS_QUERY = (
+    "SELECT action, initiative_id, details FROM audit_log "
+    "WHERE board_version > ? AND board_version <= ? AND timestamp <= ? ORDER BY board_version"
+)
+_snapshot_versions: dict[str, int] = {}
+_snapshot_lock = threading.Lock()
+
+
+@_timed
+def take_snapshot(path: str | None = None) -> int:
+    """Store a compressed snapshot of every live initiative.
+
+    Returns the board version the snapshot reflects.
+    """
+    path = path or current_path()
+    # Stamped before the read: a change missing from the snapshot is then
+    # audited no earlier than taken_at, which get_initiatives_as_of relies on.
+    taken_at = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+    with _connect(path) as conn:
+        # One read transaction so the version and rows agree.
+        conn.execute("BEGIN")
+        version = _read_version(conn)
+        rows = conn.execute(
+            f"SELECT {', '.join(_HISTORY_FIELDS)} FROM initiatives WHERE is_deleted = 0 ORDER BY id"
+        ).fetchall()
+        conn.commit()
+        data = zlib.compress(json.dumps(rows, separators=(",", ":")).encode())
+        conn.execute(
+            "INSERT INTO board_snapshots (version, taken_at, data) VALUES (?, ?, ?)", (version, taken_at, data)
+        )
+        conn.commit()
+    _snapshot_versions[path] = version
+    return version
+
+
+def _maybe_snapshot(path: str, version: int) -> None:
+    last = _snapshot_versions.get(path)
+    if last is None:
+        with _connect(path) as conn:
+            last = conn.execute("SELECT COALESCE(MAX(version), 0) FROM board_snapshots").fetchone()[0]
+        _snapshot_versions[path] = last
+    if version - last < SNAPSHOT_EVERY or not _snapshot_lock.acquire(blocking=False):
+        return
+    _snapshot_versions[path] = version
+
+    def run() -> None:
+        try:
+            take_snapshot(path)
+        except sqlite3.Error:
+            logger.exception("Board snapshot failed for %s", path)
+        finally:
+            _snapshot_lock.release()
+
+    threading.Thread(target=run, name="lumen-board-snapshot", daemon=True).start()
+
+
+def _normalize_timestamp(value: str) -> str:
+    """Convert an ISO 8601 timestamp to SQLite's UTC ``YYYY-MM-DD HH:MM:SS``."""
+    moment = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+@_timed
+def get_initiatives_as_of(as_of: str) -> list[dict]:
+    """Reconstruct the live initiatives as they stood at ``as_of``.
+
+    Starts from the newest snapshot taken at or before ``as_of`` and
+    replays the audited changes recorded after it up to that time; every
+    such change is covered by the next snapshot, if there is one. Before
+    the first snapshot, history is replayed from the start of the audit log.
+    Moves still in the write-behind buffer are not history until they are
+    written and audited, so they are neither flushed nor included.
+    Raises ``ValueError`` for an unparseable timestamp.
+    """
+    as_of = _normalize_timestamp(as_of)
+    flush_audit_log()
+    board: dict[int, list] = {}
+    version = 0
+    with _connect() as conn:
+        snapshot = conn.execute(
+            "SELECT version, data FROM board_snapshots WHERE taken_at <= ? ORDER BY taken_at DESC, id DESC LIMIT 1",
+            (as_of,),
+        ).fetchone()
+        if snapshot is not None:
+            version = snapshot[0]
+            board = {row[0]: row for row in json.loads(zlib.decompress(snapshot[1]))}
+        following = conn.execute(
+            "SELECT version FROM board_snapshots WHERE taken_at > ? ORDER BY taken_at, id LIMIT 1", (as_of,)
+        ).fetchone()
+        until = following[0] if following is not None else _read_version(conn)
+        for action, initiative_id, details in conn.execute(_HISTORY_DELTAS_QUERY, (version, until, as_of)):
+            if action == "delete":
+                board.pop(initiative_id, None)
+            elif details:
+                state = json.loads(details)
+                board[initiative_id] = [initiative_id, *(state.get(field) for field in _AUDITED_FIELDS)]
+    count_rows(len(board))
+    return [dict(zip(_HISTORY_FIELDS, board[key])) for key in sorted(board)]
+
+
+def init_db(seed: bool = True) -> bool:
+    """Apply pending schema migrations and seed data from CSV if empty.
+
+    Stored value/effort buckets are recomputed when :data:`THRESHOLDS`
+    differs from the thresholds they were derived with. Safe to call
+    repeatedly; returns ``True`` only when seed data was loaded by this call. New boards pass ``seed=False`` and start empty.
+    """
+    with _connect() as conn:
+        migrations.migrate(conn)
+        empty = conn.execute("SELECT COUNT(*) FROM initiatives").fetchone()[0] == 0
+    seeded = False
+    csv_path = os.path.join(os.path.dirname(__file__), "lumen_initiatives.csv")
+    if seed and empty and os.path.exists(csv_path):
+        with open(csv_path, newline="", encoding="utf-8") as fh:
+            # The seed's own timestamps are kept; its buckets are re-derived.
+            seeded = import_initiatives(fh, user="system", keep_timestamps=True)["imported"] > 0
+    _sync_thresholds()
+    with _connect() as conn:
+        has_snapshot = conn.execute("SELECT 1 FROM board_snapshots LIMIT 1").fetchone() is not None
+    if not has_snapshot:
+        # Baseline for history, covering rows that predate the audit log.
+        take_snapshot()
+    return seeded
+
+
+def _sync_thresholds() -> None:
+    """Re-bucket stored value/effort if :data:`THRESHOLDS` has changed.
+
+    The thresholds the buckets were derived with are kept in
+    ``board_state``; filters on ``value`` and ``effort`` read the stored
+    columns, so they would otherwise disagree with the quadrant summary,
+    which buckets x/y with the current thresholds.
+    """
+    current = json.dumps(list(THRESHOLDS))
+    with _connect() as conn:
+        row = conn.execute("SELECT thresholds FROM board_state WHERE id = 1").fetchone()
+    if row is not None and row[0] == current:
+        return
+    changed = reclassify_initiatives(THRESHOLDS)
+    if changed:
+        logger.info("Re-bucketed %d initiatives for thresholds %s", changed, current)
+    with _connect() as conn:
+        conn.execute("UPDATE board_state SET thresholds = ? WHERE id = 1", (current,))
+        conn.commit()
+
+
+# ``change_version`` is the board version of the row's latest write; it
+# doubles as the row version checked by optimistic writes.
+INITIATIVE_FIELDS = (
+    "id", "title", "details", "color", "category", "x", "y", "value", "effort",
+    "created_at", "updated_at", "created_by", "updated_by", "change_version",
+)
+_INITIATIVE_COLUMNS = ", ".join(INITIATIVE_FIELDS)
+
+_LIVE_QUERY = f"SELECT {_INITIATIVE_COLUMNS} FROM initiatives WHERE is_deleted = 0 ORDER BY id"
+# Delta queries are ordered by the indexed column; ``ORDER BY id`` would make
+# SQLite walk the whole table in rowid order instead of using the index.
+_SINCE_VERSION_QUERY = (
+    f"SELECT {_INITIATIVE_COLUMNS}, is_deleted FROM initiatives "
+    "WHERE change_version > ? ORDER BY change_version"
+)
+# ``updated_at`` has one-second resolution, so rows stamped in the second a
+# client chains from are sent again rather than skipped; clients dedupe
+# by id and change_version.
+_SINCE_TIMESTAMP_QUERY = (
+    f"SELECT {_INITIATIVE_COLUMNS}, is_deleted FROM initiatives "
+    "WHERE updated_at >= ? ORDER BY updated_at"
+)
+
+# Lightweight row type built directly from cursor tuples.
+InitiativeRow = namedtuple("InitiativeRow", INITIATIVE_FIELDS)
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def iter_records_json(rows: Iterable[Sequence], fields: Sequence[str] = INITIATIVE_FIELDS) -> Iterator[str]:
+    """Yield a JSON array of records for ``rows`` chunk by chunk.
+
+    Each row is a sequence of values in ``fields`` order. Nothing is
+    buffered beyond the current record, so the output can be streamed.
+    """
+    keys = [_encode(field) + ":" for field in fields]
+    separator = "["
+    for row in rows:
+        yield separator + "{" + ",".join(key + _encode(value) for key, value in zip(keys, row)) + "}"
+        separator = ","
+    yield "[]" if separator == "[" else "]"
+
+
+def iter_columns_json(rows: Sequence[Sequence], fields: Sequence[str] = INITIATIVE_FIELDS) -> Iterator[str]:
+    """Yield ``rows`` as columnar JSON, one chunk per column.
+
+    The output is ``{"columns": [...], "values": [[...], ...]}`` where
+    ``values[i]`` holds field ``fields[i]`` of every row, so each name is
+    sent once instead of once per row.
+    """
+    yield '{"columns":' + _encode(list(fields)) + ',"values":['
+    for index in range(len(fields)):
+        yield ("," if index else "") + _encode([row[index] for row in rows])
+    yield "]}"
+
+
+# Layouts accepted by iter_initiatives_json.
+JSON_LAYOUTS = ("records", "columns")
+
+
+def select_fields(fields: Sequence[str] | None = None, omit: Iterable[str] = ()) -> Tuple[str, ...]:
+    """Return the initiative fields to send: ``fields`` minus ``omit``.
+
+    ``id`` always comes first and cannot be omitted. Raises ``ValueError``
+    for unknown field names.
+    """
+    omit = set(omit)
+    selected = tuple(dict.fromkeys(("id", *(fields or INITIATIVE_FIELDS))))
+    unknown = sorted(name for name in omit.union(selected) if name not in INITIATIVE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(name for name in selected if name == "id" or name not in omit)
+
+
+def iter_initiatives_json(
+    rows: Sequence[Sequence],
+    fields: Sequence[str] = INITIATIVE_FIELDS,
+    layout: str = "records",
+    row_fields: Sequence[str] = INITIATIVE_FIELDS,
+) -> Iterator[str]:
+    """Yield ``rows``, whose values are in ``row_fields`` order, as JSON.
+
+    Only ``fields`` are written, in the given ``layout`` (see
+    :data:`JSON_LAYOUTS`). Values are picked straight from the row tuples.
+    """
+    if layout not in JSON_LAYOUTS:
+        raise ValueError(f"Unsupported layout: {layout}")
+    if tuple(fields) != tuple(row_fields):
+        indices = [row_fields.index(field) for field in fields]
+        pick = itemgetter(*indices) if len(indices) > 1 else lambda row: (row[indices[0]],)
+        rows = list(map(pick, rows)) if layout == "columns" else map(pick, rows)
+    if layout == "columns":
+        return iter_columns_json(rows, fields)
+    return iter_records_json(rows, fields)
+
+
+# Bounds for the in-memory board snapshot cache: the number of database
+# files kept and how long (seconds) a snapshot may be served before it is
+# re-read even if the version did not move.
+CACHE_SIZE = int(os.getenv("LUMEN_CACHE_SIZE", "4"))
+CACHE_TTL = float(os.getenv("LUMEN_CACHE_TTL", "300"))
+
+
+class _Snapshot:
+    """Live initiatives at one board version.
+
+    JSON encodings, the DataFrame and the quadrant cell counts are derived
+    from the rows on first use and kept alongside them, up to
+    ``MAX_ENCODINGS`` JSON variants.
+    """
+
+    MAX_ENCODINGS = 4
+
+    __slots__ = ("version", "rows", "loaded_at", "_encodings", "_frame", "_cells")
+
+    def __init__(self, version: int, rows: list[InitiativeRow]) -> None:
+        self.version = version
+        self.rows = rows
+        self.loaded_at = time.monotonic()
+        self._encodings: dict[tuple, str] = {}
+        self._frame: "pd.DataFrame | None" = None
+        self._cells: list[dict] | None = None
+
+    @property
+    def cells(self) -> list[dict]:
+        if self._cells is None:
+            counts = Counter((row.value, row.effort) for row in self.rows)
+            self._cells = [
+                {"value": value, "effort": effort, "count": counts[(value, effort)]}
+                for value in BUCKETS
+                for effort in BUCKETS
+            ]
+        return self._cells
+
+    @property
+    def json(self) -> str:
+        return self.encode()
+
+    def encode(self, fields: Tuple[str, ...] = INITIATIVE_FIELDS, layout: str = "records") -> str:
+        body = self._encodings.get((fields, layout))
+        if body is None:
+            with _stage_seconds.time(stage="json"):
+                body = "".join(iter_initiatives_json(self.rows, fields, layout))
+            if len(self._encodings) < self.MAX_ENCODINGS:
+                self._encodings[fields, layout] = body
+        return body
+
+    @property
+    def frame(self) -> "pd.DataFrame":
+        if self._frame is None:
+            import pandas as pd
+
+            with _stage_seconds.time(stage="frame"):
+                self._frame = pd.DataFrame.from_records(self.rows, columns=INITIATIVE_FIELDS)
+        return self._frame
+
+
+class _SnapshotCache:
+    """Version-keyed LRU of board snapshots, one entry per database file.
+
+    An entry is only served while its version matches the board's current
+    change version, so writes from other processes invalidate it too.
+    """
+
+    def __init__(self, max_entries: int, max_age: float) -> None:
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, _Snapshot] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, version: int) -> _Snapshot | None:
+        with self._lock:
+            snapshot = self._entries.get(path)
+            if (
+                snapshot is None
+                or snapshot.version != version
+                or time.monotonic() - snapshot.loaded_at > self.max_age
+            ):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return snapshot
+
+    def put(self, path: str, snapshot: _Snapshot) -> None:
+        with self._lock:
+            self._entries[path] = snapshot
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path: str | None = None) -> None:
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_snapshot_cache = _SnapshotCache(CACHE_SIZE, CACHE_TTL)
+
+
+def cache_stats() -> dict:
+    """Return hit/miss counters for the board snapshot cache."""
+    return _snapshot_cache.stats()
+
+
+def _board_snapshot() -> _Snapshot:
+    # Read the version before the rows: a concurrent write then makes the
+    # entry look older than its data, never newer, so it is simply reloaded.
+    path = current_path()
+    version = get_board_version()
+    snapshot = _snapshot_cache.get(path, version)
+    if snapshot is None:
+        with _connect(path) as conn:
+            cursor = conn.execute(_LIVE_QUERY)
+            snapshot = _Snapshot(version, list(map(InitiativeRow._make, cursor)))
+        _snapshot_cache.put(path, snapshot)
+    return snapshot
+
+
+# Per database file: the last snapshot overlaid with buffered moves, the
+# moves and the result, reused while neither changes.
+_overlays: dict[str, tuple[_Snapshot, dict, _Snapshot]] = {}
+
+
+def _live_snapshot() -> _Snapshot:
+    """Return the board snapshot with buffered moves applied on top."""
+    snapshot = _board_snapshot()
+    count_rows(len(snapshot.rows))
+    path = current_path()
+    pending = _pending_moves()
+    if not pending:
+        _overlays.pop(path, None)
+        return snapshot
+    cached = _overlays.get(path)
+    if cached is not None and cached[0] is snapshot and cached[1] == pending:
+        return cached[2]
+    live = _Snapshot(snapshot.version, _apply_moves(snapshot.rows, pending))
+    _overlays[path] = (snapshot, pending, live)
+    return live
+
+
+def _apply_moves(rows: Iterable[InitiativeRow], pending: Mapping[int, tuple]) -> list[InitiativeRow]:
+    """Return ``rows`` with the buffered ``pending`` moves applied."""
+    moved = []
+    for row in rows:
+        move = pending.get(row.id)
+        if move is not None:
+            x, y = move[:2]
+            value, effort = _value_effort(x, y)
+            row = row._replace(x=x, y=y, value=value, effort=effort)
+        moved.append(row)
+    return moved
+
+
+def _overlay_moves(rows: Iterable[Sequence], fields: Sequence[str], pending: Mapping[int, tuple]) -> list[tuple]:
+    """Return tuples of ``fields``, ``id`` first, with the buffered ``pending`` moves applied."""
+    columns = [fields.index(field) if field in fields else None for field in ("x", "y", "value", "effort")]
+    moved = []
+    for row in rows:
+        move = pending.get(row[0])
+        if move is not None:
+            x, y = move[:2]
+            row = list(row)
+            for index, value in zip(columns, (x, y, *_value_effort(x, y))):
+                if index is not None:
+                    row[index] = value
+            row = tuple(row)
+        moved.append(row)
+    return moved
+
+
+@_timed
+def get_initiatives() -> "pd.DataFrame":
+    return _live_snapshot().frame.copy()
+
+
+@_timed
+def get_initiatives_frame() -> "pd.DataFrame":
+    """Return the live initiatives as the DataFrame cached with the snapshot.
+
+    Unlike :func:`get_initiatives` the frame is not copied, so reading an
+    unchanged board costs nothing; callers must not modify it.
+    """
+    return _live_snapshot().frame
+
+
+@_timed
+def get_initiative_rows() -> list[InitiativeRow]:
+    """Return the live initiatives as :class:`InitiativeRow` tuples."""
+    return list(_live_snapshot().rows)
+
+
+@_timed
+def get_initiatives_json(fields: Tuple[str, ...] = INITIATIVE_FIELDS, layout: str = "records") -> str:
+    """Return the live initiatives as JSON, by default an array of records.
+
+    ``fields`` (see :func:`select_fields`) and ``layout`` (see
+    :func:`iter_initiatives_json`) choose the encoding; each is cached
+    with the board snapshot, so repeated calls return the same string.
+    """
+    if layout not in JSON_LAYOUTS:
+        raise ValueError(f"Unsupported layout: {layout}")
+    return _live_snapshot().encode(tuple(fields), layout)
+
+
+@_timed
+def get_initiatives_since(since: int | str) -> Tuple[list[InitiativeRow], list[int]]:
+    """Return rows changed after ``since`` and the ids deleted after it.
+
+    ``since`` is either a board version (see :func:`get_board_version`) or
+    an ISO 8601 timestamp; rows updated at or after it are returned, so
+    that second is resent instead of risking a miss. The first element
+    holds live rows created or updated since then; the second lists
+    soft-deleted ids (tombstones). Raises ``ValueError`` for an unparseable
+    timestamp.
+
+    Buffered moves are not flushed; rows with one pending are returned as
+    changed, and again once the move is written under a new version.
+    """
+    if isinstance(since, int):
+        query = _SINCE_VERSION_QUERY
+    else:
+        query, since = _SINCE_TIMESTAMP_QUERY, _normalize_timestamp(since)
+    pending = _pending_moves()
+    changed, deleted = [], []
+    with _connect() as conn:
+        for *row, is_deleted in conn.execute(query, (since,)):
+            if is_deleted:
+                deleted.append(row[0])
+            else:
+                changed.append(InitiativeRow._make(row))
+        unchanged = sorted(set(pending).difference(row.id for row in changed))
+        if unchanged:
+            cursor = conn.execute(
+                f"SELECT {_INITIATIVE_COLUMNS} FROM initiatives "
+                f"WHERE is_deleted = 0 AND id IN ({', '.join('?' * len(unchanged))}) ORDER BY id",
+                unchanged,
             )
+            changed.extend(map(InitiativeRow._make, cursor))
+    count_rows(len(changed) + len(deleted))
+    return _apply_moves(changed, pending), deleted
+
+
+# Upper bound on page size for query_initiatives.
+MAX_PAGE_SIZE = 1000
+
+# Equality filters accepted by query_initiatives, keyed by column.
+_EQUALITY_FILTERS = ("category", "value", "effort", "updated_by", "created_by")
+
+
+# Filters on columns a buffered move changes.
+_POSITION_FILTERS = ("value", "effort", "x_min", "x_max", "y_min", "y_max")
+
+
+def _build_query(
+    filters: Mapping[str, object],
+    fields: Sequence[str],
+    after: int | None,
+    limit: int,
+    moving: Sequence[int] = (),
+) -> Tuple[str, list]:
+    # Rows in ``moving`` have buffered moves, so their stored position says
+    # nothing about whether they match; they are selected regardless of the
+    # position filters and checked by the caller once the moves are applied.
+    clauses, params = ["is_deleted = 0"], []
+    position, position_params = [], []
+    for column in _EQUALITY_FILTERS:
+        if filters.get(column) is not None:
+            target, target_params = (position, position_params) if column in _POSITION_FILTERS else (clauses, params)
+            target.append(f"{column} = ?")
+            target_params.append(filters[column])
+    for column in ("x", "y"):
+        low, high = filters.get(f"{column}_min"), filters.get(f"{column}_max")
+        if low is not None:
+            position.append(f"{column} >= ?")
+            position_params.append(float(low))
+        if high is not None:
+            position.append(f"{column} <= ?")
+            position_params.append(float(high))
+    if position and moving:
+        clauses.append(f"(({' AND '.join(position)}) OR id IN ({', '.join('?' * len(moving))}))")
+        params.extend((*position_params, *moving))
+    else:
+        clauses.extend(position)
+        params.extend(position_params)
+    if after is not None:
+        clauses.append("id > ?")
+        params.append(after)
+    params.append(limit)
+    query = (
+        f"SELECT {', '.join(fields)} FROM initiatives WHERE {' AND '.join(clauses)} "
+        "ORDER BY id LIMIT ?"
+    )
+    return query, params
+
+
+def _matches_position(filters: Mapping[str, object], row: Mapping[str, object]) -> bool:
+    """Return whether ``row``'s position passes the position ``filters``."""
+    value, effort = _value_effort(row["x"], row["y"])
+    for column, actual in (("value", value), ("effort", effort)):
+        if filters.get(column) is not None and filters[column] != actual:
+            return False
+    for column in ("x", "y"):
+        low, high = filters.get(f"{column}_min"), filters.get(f"{column}_max")
+        if low is not None and row[column] < float(low):
+            return False
+        if high is not None and row[column] > float(high):
+            return False
+    return True
+
+
+@_timed
+def query_initiatives(
+    filters: Mapping[str, object] | None = None,
+    fields: Sequence[str] | None = None,
+    after: int | None = None,
+    limit: int = 100,
+) -> Tuple[list[tuple], Tuple[str, ...], int | None]:
+    """Return one page of live initiatives matching ``filters``.
+
+    Parameters
+    ----------
+    filters:
+        Optional equality filters on ``category``, ``value``, ``effort``,
+        ``updated_by`` and ``created_by``, plus inclusive ``x_min``,
+        ``x_max``, ``y_min`` and ``y_max`` bounds.
+    fields:
+        Columns to return; ``id`` is always included first.
+    after:
+        Keyset cursor: only rows with an id greater than this are returned.
+    limit:
+        Page size, at most :data:`MAX_PAGE_SIZE`.
+
+    Returns the rows as tuples, the field names, and the cursor for the
+    next page (``None`` on the last page). Buffered moves are applied to
+    the rows and to the position filters without being flushed.
+    """
+    filters = filters or {}
+    unknown = set(filters) - set(_EQUALITY_FILTERS) - {"x_min", "x_max", "y_min", "y_max"}
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+    fields = tuple(dict.fromkeys(("id", *(fields or INITIATIVE_FIELDS))))
+    invalid = [field for field in fields if field not in INITIATIVE_FIELDS]
+    if invalid:
+        raise ValueError(f"Unknown fields: {', '.join(invalid)}")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    # Buffered moves are overlaid rather than flushed: paging is a read.
+    pending = _pending_moves()
+    columns = fields + tuple(column for column in ("x", "y") if pending and column not in fields)
+    # Fetch one extra row to learn whether another page follows, plus one
+    # per buffered move that may turn out not to match once applied.
+    query, params = _build_query(filters, columns, after, limit + 1 + len(pending), list(pending))
+    with _connect() as conn:
+        rows = conn.execute(query, params).fetchall()
+    if pending:
+        rows = [
+            row[:len(fields)]
+            for row in _overlay_moves(rows, columns, pending)
+            if row[0] not in pending or _matches_position(filters, dict(zip(columns, row)))
+        ][:limit + 1]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0]
+    count_rows(len(rows))
+    return rows, fields, next_cursor
+
+
+# Upper bound on the number of search results returned at once.
+MAX_SEARCH_RESULTS = 100
+
+
+def _match_expression(text: str) -> str:
+    """Turn free text into an FTS5 query matching every word.
+
+    Text is split on punctuation as the ``unicode61`` tokenizer does, so
+    "e-commerce" matches the tokens "e" and "commerce". Words are quoted so
+    they cannot be read as query syntax, and the last word matches as a
+    prefix to support search-as-you-type.
+    """
+    terms = [f'"{word}"' for word in re.findall(r"[^\W_]+", text)]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+# FTS5 wraps matches in these private-use characters; the text is escaped
+# before they are swapped for the caller's markers.
+_MATCH_MARKERS = ("\ue000", "\ue001")
+
+
+def _mark_matches(value: str | None, start: str, end: str) -> str | None:
+    if value is None:
+        return None
+    opened, closed = _MATCH_MARKERS
+    return html.escape(value).replace(opened, start).replace(closed, end)
+
+
+@_timed
+def search_initiatives(
+    text: str,
+    limit: int = 20,
+    start: str = "<mark>",
+    end: str = "</mark>",
+) -> list[dict]:
+    """Return live initiatives matching ``text``, best matches first.
+
+    Title matches weigh more than category matches, which weigh more than
+    matches in the details. Each result carries ``title_highlight`` and a
+    ``snippet`` of the details with the matched terms wrapped in ``start``
+    and ``end``; the text around and between the markers is HTML-escaped,
+    so both can be inserted into a page as they are. Buffered moves are
+    overlaid on ``x`` and ``y`` without being flushed.
+    """
+    if not 1 <= limit <= MAX_SEARCH_RESULTS:
+        raise ValueError(f"limit must be between 1 and {MAX_SEARCH_RESULTS}")
+    expression = _match_expression(text)
+    if not expression:
+        return []
+    pending = _pending_moves()
+    with _connect() as conn:
+        cursor = conn.execute(
             """
+            SELECT i.id, i.title, i.category, i.color, i.x, i.y,
+                   highlight(initiatives_fts, 0, ?, ?) AS title_highlight,
+                   snippet(initiatives_fts, 1, ?, ?, '…', 12) AS snippet,
+                   bm25(initiatives_fts, 10.0, 1.0, 5.0) AS score
+            FROM initiatives_fts
+            JOIN initiatives i ON i.id = initiatives_fts.rowid
+            WHERE initiatives_fts MATCH ?
+            ORDER BY score
+            LIMIT ?
+            """,
+            (*_MATCH_MARKERS, *_MATCH_MARKERS, expression, limit),
         )
+        names = [col[0] for col in cursor.description]
+        results = [dict(zip(names, row)) for row in cursor]
+    for result in results:
+        for key in ("title_highlight", "snippet"):
+            result[key] = _mark_matches(result[key], start, end)
+        move = pending.get(result["id"])
+        if move is not None:
+            result["x"], result["y"] = move[:2]
+    count_rows(len(results))
+    return results
+
+
+def _bucket_sql(column: str) -> str:
+    return f"CASE WHEN {column} > :high THEN 'High' WHEN {column} > :low THEN 'Medium' ELSE 'Low' END"
+
 
+@_timed
+def get_quadrant_summary(thresholds: Sequence[float] | None = None) -> dict:
+    """Return live initiative counts per value/effort cell and per category.
+
+    Buckets are derived from x/y in SQL with the current ``thresholds``,
+    so the summary stays correct even for rows stored under older ones.
+    ``cells`` lists every one of the nine cells with its ``count`` and
+    ``ids``; ``categories`` gives each category's total and per-cell
+    counts keyed ``"<value>/<effort>"``. Buffered moves are counted in
+    the cells they are moving to without being flushed.
+    """
+    pending = _pending_moves()
+    low, high = thresholds or THRESHOLDS
+    cells = {(value, effort): {"value": value, "effort": effort, "count": 0, "ids": []}
+             for value in BUCKETS for effort in BUCKETS}
+    categories: dict[str, dict] = {}
+    with _connect() as conn:
+        # One read transaction, so the moved rows are looked up in the
+        # same state of the board the cells were counted from.
+        conn.execute("BEGIN")
+        for value, effort, category, count, ids in conn.execute(
+            f"""
+            SELECT {_bucket_sql("y")} AS v, {_bucket_sql("x")} AS e, category,
+                   COUNT(*), group_concat(id)
+            FROM initiatives WHERE is_deleted = 0
+            GROUP BY v, e, category
+            """,
+            {"low": low, "high": high},
+        ):
+            cell = cells[(value, effort)]
+            cell["count"] += count
+            cell["ids"].extend(int(i) for i in ids.split(","))
+            summary = categories.setdefault(category or "", {"category": category or "", "count": 0, "cells": {}})
+            summary["count"] += count
+            summary["cells"][f"{value}/{effort}"] = count
+        moved = []
+        if pending:
+            moved = conn.execute(
+                f"SELECT id, x, y, category FROM initiatives "
+                f"WHERE is_deleted = 0 AND id IN ({', '.join('?' * len(pending))})",
+                list(pending),
+            ).fetchall()
         conn.commit()
+    for row_id, x, y, category in moved:
+        before = _value_effort(x, y, (low, high))
+        after = _value_effort(*pending[row_id][:2], (low, high))
+        if before == after:
+            continue
+        cells[before]["count"] -= 1
+        cells[before]["ids"].remove(row_id)
+        cells[after]["count"] += 1
+        cells[after]["ids"].append(row_id)
+        per_cell = categories[category or ""]["cells"]
+        for key, step in (("/".join(before), -1), ("/".join(after), 1)):
+            per_cell[key] = per_cell.get(key, 0) + step
+            if not per_cell[key]:
+                del per_cell[key]
+    for cell in cells.values():
+        cell["ids"].sort()
+    return {
+        "thresholds": [low, high],
+        "cells": list(cells.values()),
+        "categories": sorted(categories.values(), key=lambda c: c["category"]),
+    }
+
 
-        c.execute("SELECT COUNT(*) FROM initiatives")
-        if c.fetchone()[0] == 0:
-            csv_path = os.path.join(os.path.dirname(__file__), "lumen_initiatives.csv")
-            if os.path.exists(csv_path):
-                df = pd.read_csv(csv_path)
-                df["is_deleted"] = 0
-                df.to_sql("initiatives", conn, if_exists="append", index=False)
-                conn.commit()
+@_timed
+def get_quadrant_counts() -> list[dict]:
+    """Return the live initiative ``count`` of each value/effort cell.
 
+    A count-only companion to :func:`get_quadrant_summary` for callers
+    that ask on every refresh, such as the board. The counts are computed
+    once per board version from the cached snapshot's stored buckets, and
+    buffered moves are counted in the cells they are moving to.
+    """
+    return [dict(cell) for cell in _live_snapshot().cells]
 
-def get_initiatives() -> pd.DataFrame:
+
+@_timed
+def reclassify_initiatives(thresholds: Sequence[float] | None = None, user: str = "system") -> int:
+    """Re-bucket every live initiative and return how many rows changed.
+
+    Classification runs over whole arrays at once and only rows whose
+    stored value/effort differ are written, in a single transaction.
+    """
     with _connect() as conn:
-        query = (
-            "SELECT id, title, details, color, category, x, y, value, effort, created_at, updated_at, created_by, updated_by "
-            "FROM initiatives WHERE is_deleted = 0 ORDER BY id"
+        rows = conn.execute(
+            "SELECT id, x, y, value, effort FROM initiatives WHERE is_deleted = 0"
+        ).fetchall()
+    if not rows:
+        return 0
+    ids, xs, ys, old_values, old_efforts = zip(*rows)
+    values, efforts = classify_value_effort(xs, ys, thresholds)
+    params = [
+        (value, effort, user, row_id)
+        for row_id, value, effort, old_value, old_effort in zip(
+            ids, values.tolist(), efforts.tolist(), old_values, old_efforts
         )
-        df = pd.read_sql_query(query, conn)
-    return df
+        if (value, effort) != (old_value, old_effort)
+    ]
+    if not params:
+        return 0
+    with _write("reclassify", user) as conn:
+        conn.executemany(
+            "UPDATE initiatives SET value=?, effort=?, updated_at=CURRENT_TIMESTAMP, updated_by=? WHERE id=?",
+            params,
+        )
+    return len(params)
 
 
+@_timed
 def get_initiative(initiative_id: int) -> dict | None:
     """Return a single initiative as a dict or ``None`` if missing."""
     with _connect() as conn:
-        df = pd.read_sql_query(
+        cursor = conn.execute(
             """
-            SELECT id, title, details, color, category, x, y
+            SELECT id, title, details, color, category, x, y, change_version
             FROM initiatives WHERE id=? AND is_deleted=0
             """,
-            conn,
-            params=(initiative_id,),
+            (initiative_id,),
         )
-    return df.iloc[0].to_dict() if not df.empty else None
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        initiative = dict(zip((col[0] for col in cursor.description), row))
+    move = _pending_moves().get(initiative_id)
+    if move is not None:
+        initiative["x"], initiative["y"] = move[:2]
+    return initiative
+
 
+class VersionConflict(Exception):
+    """An optimistic write found the row at a different version.
 
-def update_position(initiative_id: int, x: float, y: float, user: str = "user") -> None:
+    ``current`` is the row as it is now, or ``None`` if it was deleted.
+    """
+
+    def __init__(self, initiative_id: int, current: dict | None) -> None:
+        super().__init__(f"Initiative {initiative_id} was changed by another user")
+        self.initiative_id = initiative_id
+        self.current = current
+
+
+def _current_row(conn: sqlite3.Connection, initiative_id: int) -> dict | None:
+    row = conn.execute(
+        f"SELECT {_INITIATIVE_COLUMNS} FROM initiatives WHERE id=? AND is_deleted=0", (initiative_id,)
+    ).fetchone()
+    return None if row is None else dict(zip(INITIATIVE_FIELDS, row))
+
+
+@_timed
+def update_position(
+    initiative_id: int,
+    x: float,
+    y: float,
+    user: str = "user",
+    expected_version: int | None = None,
+) -> None:
+    """Move one initiative; see :func:`upsert_initiative` for ``expected_version``."""
+    flush_positions()
     value, effort = _value_effort(x, y)
-    with _connect() as conn:
+    with _write("move", user) as conn:
         c = conn.cursor()
         c.execute(
             """
-            UPDATE initiatives SET x=?, y=?, value=?, effort=?,
-                   updated_at=CURRENT_TIMESTAMP, updated_by=? WHERE id=?
+            UPDATE initiatives SET x=?1, y=?2, value=?3, effort=?4,
+                   updated_at=CURRENT_TIMESTAMP, updated_by=?5
+            WHERE id=?6 AND (?7 IS NULL OR change_version = ?7)
             """,
-            (x, y, value, effort, user, initiative_id),
+            (x, y, value, effort, user, initiative_id, expected_version),
         )
-        conn.commit()
+        if c.rowcount == 0 and expected_version is not None:
+            raise VersionConflict(initiative_id, _current_row(conn, initiative_id))
+
 
+_MOVE_SQL = """
+    UPDATE initiatives SET x=?1, y=?2, value=?3, effort=?4,
+           updated_at=CURRENT_TIMESTAMP, updated_by=?5
+    WHERE id=?6 AND (x IS NOT ?1 OR y IS NOT ?2)
+      AND (?7 IS NULL OR change_version = ?7)
+"""
+
+
+@_timed
+def update_positions(
+    positions: Iterable[Mapping],
+    user: str = "user",
+    conflicts: list | None = None,
+) -> int:
+    """Persist many positions in a single transaction.
+
+    ``positions`` is an iterable of mappings with ``id``, ``x`` and ``y``
+    keys. Rows whose coordinates are unchanged are skipped by the ``WHERE``
+    clause so they are neither rewritten nor stamped with a new
+    ``updated_at``. A mapping may also carry the ``change_version`` the
+    row was read at; the move is then only applied if the row is still at
+    that version. Rejected moves are reported in ``conflicts``, when given, as
+    ``{"id", "x", "y", "change_version"}`` of the current row, or
+    ``{"id", "deleted": True}``. Returns the number of rows actually updated.
+    """
+    params = []
+    for pos in positions:
+        x, y = float(pos["x"]), float(pos["y"])
+        value, effort = _value_effort(x, y)
+        version = pos.get("change_version")
+        params.append((x, y, value, effort, user, int(pos["id"]), None if version is None else int(version)))
+    if not params:
+        return 0
+    with _write("move", user) as conn:
+        if all(p[6] is None for p in params):
+            return conn.executemany(_MOVE_SQL, params).rowcount
+        changed = 0
+        for p in params:
+            count = conn.execute(_MOVE_SQL, p).rowcount
+            changed += count
+            if count or p[6] is None:
+                continue
+            # Nothing updated: either the move was a no-op or the row moved on.
+            current = _current_row(conn, p[5])
+            if current is None:
+                stale = {"id": p[5], "deleted": True}
+            elif current["change_version"] != p[6]:
+                stale = {key: current[key] for key in ("id", "x", "y", "change_version")}
+            else:
+                continue
+            if conflicts is not None:
+                conflicts.append(stale)
+    return changed
+
+
+# Seconds between write-behind flushes of moves sent to queue_positions;
+# 0 disables the buffer and writes every move immediately.
+WRITE_BEHIND_INTERVAL = float(os.getenv("LUMEN_WRITE_BEHIND_INTERVAL", "0"))
+# Flush early once this many initiatives have pending moves.
+WRITE_BEHIND_BATCH = int(os.getenv("LUMEN_WRITE_BEHIND_BATCH", "500"))
+
+
+def _flush_positions(batch: dict[tuple, tuple]) -> None:
+    # Keys are (database path, initiative id); write each file per user.
+    groups: dict[tuple, list[dict]] = {}
+    for (path, initiative_id), (x, y, user, version) in batch.items():
+        groups.setdefault((path, user), []).append(
+            {"id": initiative_id, "x": x, "y": y, "change_version": version}
+        )
+    conflicts: list[dict] = []
+    failed: dict[tuple, tuple] = {}
+    error = None
+    for (path, user), positions in groups.items():
+        # Each group commits on its own; a failing one must not send the
+        # groups already written back to the buffer.
+        try:
+            with use_path(path):
+                update_positions(positions, user, conflicts)
+        except Exception as exc:
+            error = error or exc
+            failed.update({(path, pos["id"]): batch[path, pos["id"]] for pos in positions})
+    if conflicts:
+        logger.warning("Dropped %d buffered moves of rows changed since they were read", len(conflicts))
+    if failed:
+        raise PartialFlushError(failed) from error
 
+
+def _pending_moves(path: str | None = None) -> dict[int, tuple]:
+    """Return the buffered moves for ``path`` (default: the current database), by initiative id."""
+    pending = _position_buffer.pending()
+    if not pending:
+        return {}
+    path = path or current_path()
+    return {key[1]: move for key, move in pending.items() if key[0] == path}
+
+
+_position_buffer = WriteBehindBuffer(_flush_positions, WRITE_BEHIND_INTERVAL or 0.5, WRITE_BEHIND_BATCH)
+# Registered after the audit writer, so it runs first at exit and the
+# audit entries of the final flush are still written.
+atexit.register(_position_buffer.close)
+# Moves received per database file, for the ``buffered`` tag of
+# get_board_state. The random epoch keeps the tags of other processes, and
+# of this one before a restart, from ever matching ours.
+_BUFFER_EPOCH = os.urandom(4).hex()
+_buffered_counts: dict[str, int] = {}
+_buffered_lock = threading.Lock()
+
+
+@_timed
+def queue_positions(
+    positions: Iterable[Mapping],
+    user: str = "user",
+    conflicts: list | None = None,
+) -> int:
+    """Save positions through the write-behind buffer when it is enabled.
+
+    Moves are coalesced per initiative, last one winning, and written by
+    :func:`update_positions` in the background; reads in this process see
+    them straight away. Version conflicts found when the buffer is flushed
+    are logged, not reported in ``conflicts``. Without a buffer
+    (``WRITE_BEHIND_INTERVAL`` is 0) this is :func:`update_positions`.
+    Returns the number of moves accepted or, when writing directly, the
+    number of rows updated. Raises ``KeyError``, ``TypeError`` or
+    ``ValueError`` for a malformed entry, in which case nothing is queued.
+    """
+    if WRITE_BEHIND_INTERVAL <= 0:
+        return update_positions(positions, user, conflicts)
+    # Convert every move before queueing any, so a bad entry rejects the
+    # whole request instead of leaving the moves before it to be written.
+    path = current_path()
+    moves = []
+    for pos in positions:
+        version = pos.get("change_version")
+        moves.append(
+            (
+                (path, int(pos["id"])),
+                (float(pos["x"]), float(pos["y"]), user, None if version is None else int(version)),
+            )
+        )
+    for key, move in moves:
+        _position_buffer.put(key, move)
+    # Counted after the moves are visible: a reader seeing the new count
+    # then also sees the moves, so an old tag never fits the new content.
+    with _buffered_lock:
+        _buffered_counts[path] = _buffered_counts.get(path, 0) + len(moves)
+    return len(moves)
+
+
+@_timed
+def flush_positions() -> int:
+    """Write buffered moves now; return the number of initiatives flushed."""
+    return _position_buffer.flush()
+
+
+def write_behind_stats() -> dict:
+    """Return write-behind counters, including the coalescing ratio."""
+    return _position_buffer.stats()
+
+
+@_timed
 def add_initiative(title: str, details: str, color: str, category: str, x: float, y: float, user: str = "user") -> None:
     value, effort = _value_effort(x, y)
-    with _connect() as conn:
+    with _write("create", user) as conn:
         c = conn.cursor()
         c.execute(
             """
@@ -137,9 +1548,9 @@ def add_initiative(title: str, details: str, color: str, category: str, x: float
             """,
             (title, details, color, category, x, y, value, effort, user, user),
         )
-        conn.commit()
 
 
+@_timed
 def upsert_initiative(
     initiative_id: int | None,
     title: str,
@@ -149,21 +1560,32 @@ def upsert_initiative(
     x: float,
     y: float,
     user: str = "user",
+    expected_version: int | None = None,
 ) -> int:
-    """Add a new initiative or update an existing one and return its id."""
+    """Add a new initiative or update an existing one and return its id.
+
+    With ``expected_version`` an update only applies if the row's
+    ``change_version`` still equals it; otherwise nothing is written and
+    :class:`VersionConflict` is raised carrying the current row. The check
+    is part of the ``UPDATE`` itself, so no lock is held across a read.
+    """
+    # Write buffered moves first so a later flush cannot undo this change.
+    flush_positions()
     value, effort = _value_effort(x, y)
-    with _connect() as conn:
+    with _write("update" if initiative_id else "create", user) as conn:
         c = conn.cursor()
         if initiative_id:
             c.execute(
                 """
                 UPDATE initiatives
-                SET title=?, details=?, color=?, category=?, x=?, y=?,
-                    value=?, effort=?, updated_at=CURRENT_TIMESTAMP, updated_by=?
-                WHERE id=?
+                SET title=?1, details=?2, color=?3, category=?4, x=?5, y=?6,
+                    value=?7, effort=?8, updated_at=CURRENT_TIMESTAMP, updated_by=?9
+                WHERE id=?10 AND (?11 IS NULL OR change_version = ?11)
                 """,
-                (title, details, color, category, x, y, value, effort, user, initiative_id),
+                (title, details, color, category, x, y, value, effort, user, initiative_id, expected_version),
             )
+            if c.rowcount == 0 and expected_version is not None:
+                raise VersionConflict(initiative_id, _current_row(conn, initiative_id))
             new_id = initiative_id
         else:
             c.execute(
@@ -174,24 +1596,280 @@ def upsert_initiative(
                 (title, details, color, category, x, y, value, effort, user, user),
             )
             new_id = c.lastrowid
-        conn.commit()
     return new_id
 
 
+@_timed
 def delete_initiative(initiative_id: int, user: str = "user") -> None:
-    with _connect() as conn:
+    flush_positions()
+    with _write("delete", user) as conn:
         c = conn.cursor()
         c.execute(
             "UPDATE initiatives SET is_deleted=1, updated_at=CURRENT_TIMESTAMP, updated_by=? WHERE id=?",
             (user, initiative_id),
         )
-        conn.commit()
 
 
-def get_last_updated() -> str | None:
-    """Return the most recent updated_at timestamp from initiatives."""
+# Rows per executemany batch (and transaction) when importing.
+IMPORT_CHUNK_SIZE = 5000
+# At most this many row errors are reported back from an import.
+MAX_IMPORT_ERRORS = 100
+
+_IMPORT_SQL = """
+    INSERT INTO initiatives (
+        id, title, details, color, category, x, y, value, effort, created_by, updated_by, created_at, updated_at
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
+    ON CONFLICT (id) DO UPDATE SET
+        title=excluded.title, details=excluded.details, color=excluded.color,
+        category=excluded.category, x=excluded.x, y=excluded.y,
+        value=excluded.value, effort=excluded.effort,
+        updated_at=excluded.updated_at, updated_by=excluded.updated_by, is_deleted=0
+"""
+
+
+def _read_records(source: Iterable[str], fmt: str) -> Iterator[dict | str]:
+    if fmt == "csv":
+        yield from csv.DictReader(source)
+    elif fmt == "ndjson":
+        # Lines are parsed by the caller, so a malformed one is skipped
+        # like any other invalid record.
+        yield from (line for line in source if line.strip())
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _parse_record(record: Mapping, user: str, keep_timestamps: bool = False) -> tuple:
+    """Validate one imported record into an insert tuple (without buckets)."""
+    title = (record.get("title") or "").strip()
+    if not title:
+        raise ValueError("title is required")
+    raw_id = record.get("id")
+    row_id = int(raw_id) if raw_id not in (None, "") else None
+    coords = []
+    for axis in ("x", "y"):
+        raw = record.get(axis)
+        coord = 50.0 if raw in (None, "") else float(raw)
+        if not 0 <= coord <= 100:
+            raise ValueError(f"{axis} must be between 0 and 100")
+        coords.append(coord)
+    return (
+        row_id,
+        title,
+        record.get("details") or "",
+        record.get("color") or "",
+        record.get("category") or "",
+        *coords,
+        record.get("created_by") or user,
+        record.get("updated_by") or user,
+        *(
+            _normalize_timestamp(record[key]) if keep_timestamps and record.get(key) else None
+            for key in ("created_at", "updated_at")
+        ),
+    )
+
+
+@_timed
+def import_initiatives(
+    source: Iterable[str] | TextIO,
+    fmt: str = "csv",
+    user: str = "import",
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Callable[[dict], None] | None = None,
+    keep_timestamps: bool = False,
+) -> dict:
+    """Stream initiatives from CSV or NDJSON text into the database.
+
+    Records are read lazily and written ``chunk_size`` at a time with one
+    ``executemany`` and one commit per chunk, so memory use is bounded by
+    the chunk. Records carrying an ``id`` update that initiative (and
+    revive it if deleted); others are inserted. Value/effort buckets are
+    always computed from x/y for each chunk with
+    :func:`classify_value_effort`, so any ``value``/``effort`` in the
+    records is ignored and the buckets agree with :data:`THRESHOLDS`.
+    Imported rows are stamped with the current time unless
+    ``keep_timestamps`` is true, in which case the records' ``created_at``
+    and ``updated_at`` are kept where present; seeding uses this. Invalid
+    records, including NDJSON lines that are not valid JSON, are skipped
+    and reported; ``progress`` is called after every chunk with the
+    running totals. Text that cannot be decoded raises
+    ``UnicodeDecodeError``, leaving the chunks before it imported.
+    """
+    flush_positions()
+    totals = {"rows": 0, "imported": 0, "skipped": 0, "errors": []}
+
+    def flush(batch: list[tuple]) -> None:
+        if batch:
+            values, efforts = classify_value_effort([r[5] for r in batch], [r[6] for r in batch])
+            params = [
+                (*row[:7], value, effort, *row[7:])
+                for row, value, effort in zip(batch, values.tolist(), efforts.tolist())
+            ]
+            with _write("import", user) as conn:
+                conn.executemany(_IMPORT_SQL, params)
+            totals["imported"] += len(batch)
+        if progress is not None:
+            progress({key: totals[key] for key in ("rows", "imported", "skipped")})
+
+    batch: list[tuple] = []
+    for line, record in enumerate(_read_records(source, fmt), start=1):
+        totals["rows"] += 1
+        try:
+            if isinstance(record, str):
+                record = json.loads(record)
+            batch.append(_parse_record(record, user, keep_timestamps))
+        except (TypeError, ValueError, AttributeError) as exc:
+            totals["skipped"] += 1
+            if len(totals["errors"]) < MAX_IMPORT_ERRORS:
+                totals["errors"].append({"record": line, "error": str(exc)})
+        if len(batch) >= chunk_size:
+            flush(batch)
+            batch = []
+    flush(batch)
+    return totals
+
+
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def iter_export(fmt: str = "csv", include_deleted: bool = False, batch_size: int = 1000) -> Iterator[str]:
+    """Yield every initiative as CSV or NDJSON text, straight from the cursor.
+
+    Rows are fetched ``batch_size`` at a time and each batch is yielded as
+    one chunk, so exports of any size use constant memory. The database is
+    fixed when this is called, so the iterator may be consumed later, e.g.
+    by a streaming response outside :func:`use_board`.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    return _iter_export(current_path(), fmt, include_deleted, batch_size)
+
+
+def _iter_export(path: str, fmt: str, include_deleted: bool, batch_size: int) -> Iterator[str]:
+    # Buffered moves are overlaid rather than flushed: an export is a read.
+    pending = _pending_moves(path)
+    fields = INITIATIVE_FIELDS + (("is_deleted",) if include_deleted else ())
+    where = "" if include_deleted else "WHERE is_deleted = 0 "
+    with _connect(path) as conn:
+        cursor = conn.execute(f"SELECT {', '.join(fields)} FROM initiatives {where}ORDER BY id")
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(fields)
+        keys = [_encode(field) + ":" for field in fields]
+        while rows := cursor.fetchmany(batch_size):
+            count_rows(len(rows))
+            if pending:
+                rows = _overlay_moves(rows, fields, pending)
+            if fmt == "csv":
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                yield "".join(
+                    "{" + ",".join(key + _encode(value) for key, value in zip(keys, row)) + "}\n"
+                    for row in rows
+                )
+        if fmt == "csv" and buffer.tell():
+            yield buffer.getvalue()
+
+
+# Hot-path queries and the index each one is expected to use.
+_INDEXED_QUERIES = {
+    "live initiatives": (_LIVE_QUERY, "idx_initiatives_live"),
+    "changes since version": (_CHANGES_QUERY, "idx_initiatives_change_version"),
+    "initiatives since version": (_SINCE_VERSION_QUERY, "idx_initiatives_change_version"),
+    "initiatives since timestamp": (_SINCE_TIMESTAMP_QUERY, "idx_initiatives_updated_at"),
+    "audit by initiative": (
+        "SELECT id FROM audit_log WHERE initiative_id = ? ORDER BY id DESC LIMIT ?",
+        "idx_audit_log_initiative_id",
+    ),
+    "audit by user": (
+        "SELECT id FROM audit_log WHERE user = ? ORDER BY id DESC LIMIT ?",
+        "idx_audit_log_user",
+    ),
+    "history deltas": (_HISTORY_DELTAS_QUERY, "idx_audit_log_board_version"),
+    "page by category": (
+        _build_query({"category": ""}, INITIATIVE_FIELDS, 0, 1)[0],
+        "idx_initiatives_live_category",
+    ),
+    "page by value/effort": (
+        _build_query({"value": "", "effort": ""}, INITIATIVE_FIELDS, 0, 1)[0],
+        "idx_initiatives_live_value_effort",
+    ),
+    "page by updater": (
+        _build_query({"updated_by": ""}, INITIATIVE_FIELDS, 0, 1)[0],
+        "idx_initiatives_live_updated_by",
+    ),
+    "page by creator": (
+        _build_query({"created_by": ""}, INITIATIVE_FIELDS, 0, 1)[0],
+        "idx_initiatives_live_created_by",
+    ),
+}
+
+
+def check_query_plans() -> dict[str, str]:
+    """Return the hot-path queries that do not use their intended index.
+
+    Maps each offending query's name to its ``EXPLAIN QUERY PLAN`` output;
+    an empty dict means every query is served by its index.
+    """
+    problems = {}
     with _connect() as conn:
-        c = conn.cursor()
-        c.execute("SELECT MAX(updated_at) FROM initiatives")
-        result = c.fetchone()[0]
-    return result
+        for name, (query, index) in _INDEXED_QUERIES.items():
+            params = (0,) * query.count("?")
+            plan = "; ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+            if index not in plan:
+                problems[name] = plan
+    return problems
+
+
+@_timed
+def get_board_state(flush: bool = True) -> dict:
+    """Return the board's change ``version`` and ``last_updated`` timestamp.
+
+    ``version`` increases by at least one with every insert, update and
+    soft delete, so it distinguishes edits made within the same second.
+    Buffered moves are written first unless ``flush`` is false, so the
+    version covers everything a reader can see. Read paths pass
+    ``flush=False`` and overlay the buffered moves instead, so that polling
+    does not defeat write-behind coalescing. The version does not change
+    with those moves, so while the board has any, ``buffered`` is added:
+    a tag that changes with every move this board receives and is unique
+    to this process.
+    """
+    if flush:
+        flush_positions()
+        return _board_state()
+    # Read before the moves are overlaid, so a move arriving in between
+    # changes the counter the next reader sees rather than going unnoticed.
+    path = current_path()
+    buffered = _buffered_counts.get(path, 0)
+    state = _board_state()
+    if _pending_moves(path):
+        state["buffered"] = f"{_BUFFER_EPOCH}.{buffered}"
+    return state
+
+
+def _board_state() -> dict:
+    with _connect() as conn:
+        row = conn.execute("SELECT version, updated_at FROM board_state WHERE id = 1").fetchone()
+    if row is None:
+        return {"version": 0, "last_updated": None}
+    return {"version": row[0], "last_updated": row[1]}
+
+
+@_timed
+def get_board_version() -> int:
+    """Return the monotonic board change version.
+
+    Unlike :func:`get_board_state` this does not flush buffered moves, so
+    polling it does not defeat write-behind coalescing.
+    """
+    return _board_state()["version"]
+
+
+def get_last_updated() -> str | None:
+    """Return the time of the most recent change to initiatives."""
+    return get_board_state()["last_updated"]
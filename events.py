@@ -0,0 +1,150 @@
+"""In-process fan-out of board change events for streaming clients.
+
+Each database file, i.e. each board, has its own :class:`ChangeNotifier`,
+obtained with :func:`notifier_for`.
+"""
+
+import queue
+import threading
+from typing import Callable
+
+import db
+
+
+class Subscription:
+    """A single client's bounded queue of pending change events.
+
+    When the queue overflows because the client is not keeping up, pending
+    events are discarded and the next :meth:`get` returns a ``resync``
+    event telling the client to reload the board instead. ``wake``, if
+    given, is called from the publishing thread after every event, so a
+    consumer can wait for one without polling.
+    """
+
+    def __init__(self, maxsize: int, wake: Callable[[], None] | None = None) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._overflowed = False
+        self._version = 0
+        self._wake = wake
+
+    def put(self, event: dict) -> None:
+        self._version = max(self._version, event["version"])
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._overflowed = True
+        if self._wake is not None:
+            self._wake()
+
+    def get(self, timeout: float | None = None) -> dict | None:
+        """Return the next event, or ``None`` if none arrived in ``timeout``."""
+        if self._overflowed:
+            self._overflowed = False
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            return {"version": self._version, "resync": True}
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class ChangeNotifier:
+    """Fan a single stream of change events out to many subscribers.
+
+    Writes made through :mod:`db` in this process are published as soon as
+    they commit. Writes from other processes sharing the database file are
+    picked up by one watcher thread polling the board version every
+    ``poll_interval`` seconds while anyone is subscribed.
+    """
+
+    def __init__(self, queue_size: int = 100, poll_interval: float = 1.0, path: str | None = None) -> None:
+        self.path = path or db.DB_PATH
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self._subscribers: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._version = 0
+        self._watcher: threading.Thread | None = None
+
+    def subscribe(self, wake: Callable[[], None] | None = None) -> Subscription:
+        """Return a new :class:`Subscription`; see there for ``wake``."""
+        subscription = Subscription(self.queue_size, wake)
+        with self._lock:
+            if not self._subscribers:
+                with db.use_path(self.path):
+                    self._version = db.get_board_version()
+            self._subscribers.add(subscription)
+            if self._watcher is None or not self._watcher.is_alive():
+                self._watcher = threading.Thread(target=self._watch, name="lumen-change-watcher", daemon=True)
+                self._watcher.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event: dict) -> None:
+        """Send ``event`` to every subscriber unless it is already announced.
+
+        An event from :mod:`db` carries ``since``, the version it starts
+        from. If that is ahead of the last version announced, another
+        process wrote in between and the watcher has not polled it yet,
+        so the changes of the whole gap are read and published instead.
+        """
+        since = event.get("since")
+        event = {key: value for key, value in event.items() if key != "since"}
+        with self._lock:
+            if event["version"] <= self._version:
+                return
+            start = self._version
+        if since is not None and since > start:
+            with db.use_path(self.path):
+                event = db.get_changes(start)
+        with self._lock:
+            if event["version"] <= self._version:
+                return
+            self._version = event["version"]
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def _watch(self) -> None:
+        stop = threading.Event()
+        while not stop.wait(self.poll_interval):
+            with self._lock:
+                if not self._subscribers:
+                    self._watcher = None
+                    return
+                since = self._version
+            with db.use_path(self.path):
+                if db.get_board_version() > since:
+                    self.publish(db.get_changes(since))
+
+
+_notifiers: dict[str, ChangeNotifier] = {}
+_notifiers_lock = threading.Lock()
+
+
+def notifier_for(path: str | None = None) -> ChangeNotifier:
+    """Return the notifier for ``path``, by default the current database."""
+    path = path or db.current_path()
+    with _notifiers_lock:
+        notifier = _notifiers.get(path)
+        if notifier is None:
+            notifier = _notifiers[path] = ChangeNotifier(path=path)
+    return notifier
+
+
+def _publish(path: str, event: dict) -> None:
+    notifier = _notifiers.get(path)
+    if notifier is not None:
+        notifier.publish(event)
+
+
+# The default board's notifier.
+notifier = notifier_for(db.DB_PATH)
+db.add_change_listener(_publish)
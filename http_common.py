@@ -0,0 +1,201 @@
+"""Request parsing and response helpers shared by both HTTP servers.
+
+:mod:`api` (Flask, WSGI) and :mod:`asgi` (Starlette) serve the same routes
+with the same JSON bodies; everything here is independent of the framework
+so that the two cannot drift apart.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import Mapping
+
+from werkzeug.datastructures import ETags, MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from db import JSON_LAYOUTS, select_fields
+from metrics import SIZE_BUCKETS, Counter, Histogram
+
+# Seconds between keep-alive comments on idle change streams.
+STREAM_HEARTBEAT = 15.0
+# Response bodies at least this large are gzip-compressed for clients that
+# accept it, at GZIP_LEVEL (1 fastest to 9 smallest).
+GZIP_MIN_BYTES = int(os.getenv("LUMEN_GZIP_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("LUMEN_GZIP_LEVEL", "6"))
+# Media type requesting the columnar layout of /api/initiatives.
+COLUMNS_MEDIA_TYPE = "application/vnd.lumen.columns+json"
+
+# Appended to the ETag of a gzip-compressed body.
+GZIP_ETAG_SUFFIX = "-gz"
+
+FILTER_PARAMS = ("category", "value", "effort", "updated_by", "created_by", "x_min", "x_max", "y_min", "y_max")
+# Any of these switches /api/initiatives to filtered, paged results.
+# ``fields`` and ``omit`` are not among them: they apply in every mode.
+PAGE_PARAMS = (*FILTER_PARAMS, "cursor", "limit")
+
+_request_seconds = Histogram(
+    "lumen_http_request_seconds", "Request latency by endpoint.", ("endpoint", "method", "status")
+)
+_response_bytes = Histogram(
+    "lumen_http_response_bytes", "Response body size by endpoint.", ("endpoint",), SIZE_BUCKETS
+)
+_response_rows = Counter("lumen_http_response_rows_total", "Initiative rows returned by endpoint.", ("endpoint",))
+
+
+def record_request(endpoint: str, method: str, status: int, seconds: float, rows: int, size: int) -> None:
+    """Record one finished request in the HTTP metrics."""
+    _request_seconds.observe(seconds, endpoint=endpoint, method=method, status=status)
+    _response_bytes.observe(size, endpoint=endpoint)
+    if rows:
+        _response_rows.inc(rows, endpoint=endpoint)
+
+
+def last_modified(state: dict) -> datetime | None:
+    """Parse the board's ``last_updated`` (UTC, SQLite format) for headers.
+
+    ``None`` while buffered moves are overlaid: ``last_updated`` does not
+    cover them, so it must not answer ``If-Modified-Since``.
+    """
+    if "buffered" in state:
+        return None
+    try:
+        return datetime.strptime(state["last_updated"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def entity_tag(state: dict, layout: str = "records", gzipped: bool = False) -> str:
+    """Return the unquoted ETag of one representation of the board.
+
+    The board version identifies the content, together with the
+    ``buffered`` counter while moves are overlaid on it. The layout and the
+    encoding are negotiated on the same URL, so each gets its own tag, e.g.
+    ``12-cols-gz``.
+    """
+    tag = str(state["version"])
+    if "buffered" in state:
+        tag += f"-b{state['buffered']}"
+    if layout != "records":
+        tag += "-cols"
+    return tag + GZIP_ETAG_SUFFIX if gzipped else tag
+
+
+def matching_tag(if_none_match: ETags, state: dict, layout: str = "records") -> str | None:
+    """Return the current tag listed in ``If-None-Match``, if there is one.
+
+    A tag of either encoding matches: both bodies are equally current.
+    """
+    for gzipped in (False, True):
+        tag = entity_tag(state, layout, gzipped)
+        if if_none_match.contains_weak(tag):
+            return tag
+    return None
+
+
+def initiatives_format(args: Mapping[str, str], accept: str | None) -> tuple[tuple[str, ...], str]:
+    """Return the fields and JSON layout requested for ``/api/initiatives``.
+
+    The columnar layout is chosen with ``?format=columns`` or by accepting
+    :data:`COLUMNS_MEDIA_TYPE`. ``?fields=`` lists the fields to send and
+    ``?omit=`` leaves fields out, e.g. ``omit=details,created_by``.
+    """
+    layout = args.get("format")
+    if layout is None:
+        best = parse_accept_header(accept, MIMEAccept).best_match(["application/json", COLUMNS_MEDIA_TYPE])
+        layout = "columns" if best == COLUMNS_MEDIA_TYPE else "records"
+    elif layout not in JSON_LAYOUTS:
+        raise ValueError(f"Unsupported format: {layout}")
+    fields, omit = args.get("fields"), args.get("omit")
+    return select_fields(fields.split(",") if fields else None, omit.split(",") if omit else ()), layout
+
+
+def page_cursor(args: Mapping[str, str]) -> int | None:
+    """Return the ``?cursor=`` of a paged request; ``ValueError`` if malformed."""
+    cursor = args.get("cursor")
+    if cursor is None:
+        return None
+    if not cursor.isdigit():
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return int(cursor)
+
+
+# Coordinates are on the board's 0-100 scale.
+COORDINATE_RANGE = (0.0, 100.0)
+
+
+def _integer(value: object) -> int:
+    """Return ``value`` as an int; ``TypeError``/``ValueError`` unless it is integral."""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"Not an integer: {value!r}")
+    return int(value)
+
+
+def _coordinate(value: object) -> float:
+    """Return ``value`` as a float on the board; ``TypeError``/``ValueError`` otherwise."""
+    if isinstance(value, bool):
+        raise ValueError(f"Not a number: {value!r}")
+    number = float(value)
+    low, high = COORDINATE_RANGE
+    if not low <= number <= high:
+        raise ValueError(f"Off the board: {number}")
+    return number
+
+
+def parse_positions(data: Mapping) -> list[dict]:
+    """Return the ``positions`` of a save request as validated moves.
+
+    Each entry needs an integer ``id`` and numeric ``x`` and ``y`` within
+    :data:`COORDINATE_RANGE`; ``change_version`` is optional. Raises
+    ``ValueError`` naming the first malformed entry, so a bad request
+    saves nothing.
+    """
+    positions = data.get("positions", [])
+    if not isinstance(positions, list):
+        raise ValueError("positions must be a list")
+    moves = []
+    for index, pos in enumerate(positions):
+        try:
+            version = pos.get("change_version")
+            moves.append(
+                {
+                    "id": _integer(pos["id"]),
+                    "x": _coordinate(pos["x"]),
+                    "y": _coordinate(pos["y"]),
+                    "change_version": None if version is None else _integer(version),
+                }
+            )
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise ValueError(
+                f"positions[{index}] must have an integer id, x and y between "
+                f"{COORDINATE_RANGE[0]:g} and {COORDINATE_RANGE[1]:g} and an optional integer change_version"
+            ) from None
+    return moves
+
+
+def parse_initiative(data: Mapping) -> dict:
+    """Return the ``id``, ``x``, ``y`` and ``change_version`` of an upsert request.
+
+    Validated as in :func:`parse_positions`; ``id`` and ``change_version``
+    may be omitted and ``x`` and ``y`` default to the centre of the board.
+    Raises ``ValueError`` naming the first malformed field.
+    """
+    fields = {}
+    for name in ("id", "change_version"):
+        value = data.get(name)
+        try:
+            fields[name] = None if value is None else _integer(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be an integer") from None
+    for name in ("x", "y"):
+        try:
+            fields[name] = _coordinate(data.get(name, 50))
+        except (TypeError, ValueError):
+            raise ValueError(
+                f"{name} must be a number between {COORDINATE_RANGE[0]:g} and {COORDINATE_RANGE[1]:g}"
+            ) from None
+    return fields
+
+
+def sse(event: dict) -> str:
+    """Format a change event as a Server-Sent Events message."""
+    return f"id: {event['version']}\nevent: change\ndata: {json.dumps(event)}\n\n"
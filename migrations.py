@@ -0,0 +1,266 @@
+"""Versioned schema migrations for the Lumen database.
+
+Each migration is a function registered with :func:`migration` under an
+increasing version number. :func:`migrate` applies the pending ones in
+order, each in its own ``BEGIN IMMEDIATE`` transaction, and records them in
+the ``schema_version`` table. Migrations must tolerate database files that
+were created before this table existed, hence the ``IF NOT EXISTS`` guards.
+"""
+
+import sqlite3
+from typing import Callable
+
+_MIGRATIONS: dict[int, tuple[str, Callable[[sqlite3.Connection], None]]] = {}
+
+
+def migration(version: int, description: str):
+    """Register the decorated function as migration ``version``."""
+
+    def register(func: Callable[[sqlite3.Connection], None]):
+        if version in _MIGRATIONS:
+            raise ValueError(f"Duplicate migration version {version}")
+        _MIGRATIONS[version] = (description, func)
+        return func
+
+    return register
+
+
+def latest_version() -> int:
+    return max(_MIGRATIONS, default=0)
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Return the highest migration applied to ``conn``'s database."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, target: int | None = None) -> list[int]:
+    """Apply pending migrations up to ``target`` and return their versions."""
+    target = latest_version() if target is None else target
+    applied = []
+    for version in sorted(_MIGRATIONS):
+        if version > target or version <= current_version(conn):
+            continue
+        description, func = _MIGRATIONS[version]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock.
+            if version > current_version(conn):
+                func(conn)
+                conn.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description),
+                )
+                applied.append(version)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return applied
+
+
+@migration(1, "Base initiatives and audit_log tables")
+def _base_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS initiatives (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            details TEXT,
+            color TEXT,
+            category TEXT,
+            x REAL,
+            y REAL,
+            value TEXT,
+            effort TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by TEXT,
+            updated_by TEXT,
+            is_deleted BOOLEAN DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS audit_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action TEXT,
+            initiative_id INTEGER,
+            initiative_title TEXT,
+            user TEXT,
+            details TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+@migration(2, "Board change version and per-row change_version")
+def _change_tracking(conn: sqlite3.Connection) -> None:
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(initiatives)")}
+    if "change_version" not in columns:
+        conn.execute("ALTER TABLE initiatives ADD COLUMN change_version INTEGER NOT NULL DEFAULT 0")
+    # Single-row change counter maintained by triggers, so every writer
+    # (including other processes sharing the file) bumps it and reading it
+    # is O(1) instead of scanning initiatives for MAX(updated_at).
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS board_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP
+        )
+        """
+    )
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO board_state (id, version, updated_at)
+        SELECT 1, 0, MAX(updated_at) FROM initiatives
+        """
+    )
+    # Each changed row is also stamped with the version it produced so
+    # clients can ask for everything changed since a known version. The
+    # WHEN guard keeps the stamping UPDATE from re-firing the trigger.
+    for event, guard in (
+        ("INSERT", ""),
+        ("UPDATE", "WHEN NEW.change_version IS OLD.change_version"),
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS initiatives_version_{event.lower()}")
+        conn.execute(
+            f"""
+            CREATE TRIGGER initiatives_version_{event.lower()}
+            AFTER {event} ON initiatives {guard}
+            BEGIN
+                UPDATE board_state
+                SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id = 1;
+                UPDATE initiatives
+                SET change_version = (SELECT version FROM board_state WHERE id = 1)
+                WHERE id = NEW.id;
+            END
+            """
+        )
+
+
+@migration(3, "Indexes for live-row, change, timestamp and audit lookups")
+def _hot_path_indexes(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_initiatives_live ON initiatives (id) WHERE is_deleted = 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_initiatives_change_version ON initiatives (change_version)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_initiatives_updated_at ON initiatives (updated_at)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_audit_log_initiative ON audit_log (initiative_id, timestamp)"
+    )
+
+
+@migration(4, "Partial indexes for filtered, keyset-paginated queries")
+def _filter_indexes(conn: sqlite3.Connection) -> None:
+    # Each index ends in id so a filtered page is read in keyset order.
+    for name, columns in (
+        ("category", "category, id"),
+        ("value_effort", "value, effort, id"),
+        ("updated_by", "updated_by, id"),
+        ("created_by", "created_by, id"),
+    ):
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_initiatives_live_{name} "
+            f"ON initiatives ({columns}) WHERE is_deleted = 0"
+        )
+
+
+@migration(5, "Full-text search index over live initiatives")
+def _search_index(conn: sqlite3.Connection) -> None:
+    # External-content FTS5 table: only the index is stored, the text is
+    # read back from initiatives. Triggers keep it to live rows and skip
+    # updates that do not touch the indexed columns, such as moves.
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS initiatives_fts USING fts5(
+            title, details, category,
+            content='initiatives', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    conn.execute("INSERT INTO initiatives_fts (initiatives_fts) VALUES ('delete-all')")
+    conn.execute(
+        """
+        INSERT INTO initiatives_fts (rowid, title, details, category)
+        SELECT id, title, details, category FROM initiatives WHERE IFNULL(is_deleted, 0) = 0
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS initiatives_fts_insert
+        AFTER INSERT ON initiatives WHEN IFNULL(NEW.is_deleted, 0) = 0
+        BEGIN
+            INSERT INTO initiatives_fts (rowid, title, details, category)
+            VALUES (NEW.id, NEW.title, NEW.details, NEW.category);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS initiatives_fts_update
+        AFTER UPDATE OF title, details, category, is_deleted ON initiatives
+        BEGIN
+            INSERT INTO initiatives_fts (initiatives_fts, rowid, title, details, category)
+            SELECT 'delete', OLD.id, OLD.title, OLD.details, OLD.category
+            WHERE IFNULL(OLD.is_deleted, 0) = 0;
+            INSERT INTO initiatives_fts (rowid, title, details, category)
+            SELECT NEW.id, NEW.title, NEW.details, NEW.category
+            WHERE IFNULL(NEW.is_deleted, 0) = 0;
+        END
+        """
+    )
+
+
+@migration(6, "Indexes for paging audit history by initiative or user")
+def _audit_history_indexes(conn: sqlite3.Connection) -> None:
+    # SQLite appends the rowid to every index entry, so these serve
+    # "WHERE initiative_id = ? ORDER BY id DESC" without a sort.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_initiative_id ON audit_log (initiative_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_user ON audit_log (user)")
+
+
+@migration(7, "Board snapshots and versioned audit entries for history")
+def _history(conn: sqlite3.Connection) -> None:
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(audit_log)")}
+    if "board_version" not in columns:
+        conn.execute("ALTER TABLE audit_log ADD COLUMN board_version INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_board_version ON audit_log (board_version)")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS board_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            version INTEGER NOT NULL,
+            taken_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            data BLOB NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_board_snapshots_taken_at ON board_snapshots (taken_at)")
+
+
+@migration(8, "Drop the audit index superseded by idx_audit_log_initiative_id")
+def _drop_redundant_audit_index(conn: sqlite3.Connection) -> None:
+    # (initiative_id, timestamp) from migration 3 is never chosen over
+    # (initiative_id), which also returns rows in id order without a sort,
+    # and only slowed down every audit insert.
+    conn.execute("DROP INDEX IF EXISTS idx_audit_log_initiative")
+
+
+@migration(9, "Record the thresholds the stored value/effort buckets were derived with")
+def _bucket_thresholds(conn: sqlite3.Connection) -> None:
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(board_state)")}
+    if "thresholds" not in columns:
+        conn.execute("ALTER TABLE board_state ADD COLUMN thresholds TEXT")
@@ -0,0 +1,22 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+
+@pytest.fixture(autouse=True)
+def _isolated_db(tmp_path, monkeypatch):
+    """Give every test its own database file instead of the repo's default.
+
+    ``db.DB_PATH`` and ``db.BOARDS_DIR`` are read when ``db`` is first
+    imported, so setting ``LUMEN_DB`` inside a test has no effect; the
+    attributes are patched instead.
+    """
+    import db
+
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "lumen_dashboard.db"))
+    monkeypatch.setattr(db, "BOARDS_DIR", str(tmp_path / "boards"))
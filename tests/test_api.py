@@ -9,17 +9,15 @@ if str(ROOT) not in sys.path:
 from flask.testing import FlaskClient
 
 
-def _get_client(tmp_path, monkeypatch) -> FlaskClient:
-    """Return a Flask test client backed by a temporary database."""
-    db_path = tmp_path / "api_test.db"
-    monkeypatch.setenv("LUMEN_DB", str(db_path))
+def _get_client() -> FlaskClient:
+    """Return a Flask test client for the test's database."""
     import api
     importlib.reload(api)
     return api.app.test_client()
 
 
-def test_api_upsert_and_fetch(tmp_path, monkeypatch):
-    client = _get_client(tmp_path, monkeypatch)
+def test_api_upsert_and_fetch():
+    client = _get_client()
     payload = {
         "title": "API Test",
         "details": "details",
@@ -38,3 +36,366 @@ def test_api_upsert_and_fetch(tmp_path, monkeypatch):
     data = res.get_json()["initiatives"]
     titles = [i["title"] for i in data]
     assert payload["title"] in titles
+
+
+def test_api_reports_board_version():
+    client = _get_client()
+    before = client.get("/api/last_updated").get_json()["version"]
+    res = client.post("/api/initiative", json={"title": "Bump", "x": 5, "y": 5})
+    assert res.get_json()["version"] > before
+
+
+def test_api_rejects_malformed_positions():
+    client = _get_client()
+    new_id = client.post("/api/initiative", json={"title": "Malformed", "x": 5, "y": 5}).get_json()["id"]
+    for positions in (
+        [{"id": new_id, "x": 70, "y": 70}, {"id": new_id, "x": 80}],
+        [{"id": new_id, "x": "abc", "y": 70}],
+        [{"id": new_id, "x": 70, "y": 70, "change_version": "zz"}],
+        [{"id": new_id, "x": 170, "y": 70}],
+        [7],
+        {"id": new_id, "x": 70, "y": 70},
+    ):
+        res = client.post("/api/positions", json={"positions": positions})
+        assert res.status_code == 400 and "error" in res.get_json()
+    rows = client.get("/api/initiatives").get_json()["initiatives"]
+    assert next(r for r in rows if r["id"] == new_id)["x"] == 5
+
+
+def test_api_rejects_malformed_upserts():
+    client = _get_client()
+    new_id = client.post("/api/initiative", json={"title": "Validated", "x": 5, "y": 5}).get_json()["id"]
+    for payload in (
+        {"id": new_id, "title": "Validated", "change_version": "zz"},
+        {"id": new_id, "title": "Validated", "change_version": 1.5},
+        {"id": "abc", "title": "Validated"},
+        {"title": "Validated", "x": "abc"},
+        {"title": "Validated", "y": 250},
+        {"title": "Validated", "x": None},
+    ):
+        res = client.post("/api/initiative", json=payload)
+        assert res.status_code == 400 and "error" in res.get_json()
+    rows = client.get("/api/initiatives").get_json()["initiatives"]
+    assert [r["x"] for r in rows if r["title"] == "Validated"] == [5]
+
+
+def test_api_delta_sync_returns_changes_and_tombstones():
+    client = _get_client()
+    kept = client.post("/api/initiative", json={"title": "Kept", "x": 5, "y": 5}).get_json()["id"]
+    gone = client.post("/api/initiative", json={"title": "Gone", "x": 5, "y": 5}).get_json()["id"]
+    since = client.get("/api/last_updated").get_json()["version"]
+
+    client.post("/api/positions", json={"positions": [{"id": kept, "x": 70, "y": 70}]})
+    client.delete(f"/api/initiative/{gone}")
+
+    data = client.get(f"/api/initiatives?since={since}").get_json()
+    assert [row["id"] for row in data["initiatives"]] == [kept]
+    assert data["deleted"] == [gone]
+
+    data = client.get(f"/api/initiatives?since={data['version']}").get_json()
+    assert data["initiatives"] == [] and data["deleted"] == []
+
+
+def test_api_delta_sync_accepts_iso_timestamps():
+    client = _get_client()
+    new_id = client.post("/api/initiative", json={"title": "Stamped", "x": 5, "y": 5}).get_json()["id"]
+    data = client.get("/api/initiatives?since=2000-01-01T09:00:00Z").get_json()
+    assert new_id in [row["id"] for row in data["initiatives"]]
+    assert client.get("/api/initiatives?since=2999-01-01T09:00:00").get_json()["initiatives"] == []
+    assert client.get("/api/initiatives?since=garbage").status_code == 400
+    # Chaining from last_updated must not drop rows written in that same second.
+    stamp = client.get("/api/last_updated").get_json()["last_updated"].replace(" ", "T")
+    data = client.get(f"/api/initiatives?since={stamp}").get_json()
+    assert new_id in [row["id"] for row in data["initiatives"]]
+
+
+def test_api_stream_subscribes_only_once_streaming():
+    import json
+
+    import api
+    from events import notifier_for
+
+    client = _get_client()
+    new_id = client.post("/api/initiative", json={"title": "Streamed", "x": 5, "y": 5}).get_json()["id"]
+    notifier = notifier_for()
+    # A client that disconnects before the first chunk never starts the body.
+    with api.app.test_request_context("/api/stream"):
+        api.api_stream().close()
+    assert not notifier._subscribers
+
+    res = client.get("/api/stream", headers={"Last-Event-ID": "0"}, buffered=False)
+    chunks = iter(res.response)
+    assert len(notifier._subscribers) == 1
+    catch_up = next(chunk for chunk in chunks if b"data: " in chunk)
+    assert new_id in json.loads(catch_up.decode().split("data: ")[1])["changed"]
+    res.close()
+    assert not notifier._subscribers
+
+
+def test_api_conditional_get():
+    client = _get_client()
+    res = client.get("/api/initiatives")
+    etag = res.headers["ETag"]
+    assert res.status_code == 200
+
+    res = client.get("/api/initiatives", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.data == b""
+
+    client.post("/api/initiative", json={"title": "Changed", "x": 5, "y": 5})
+    res = client.get("/api/initiatives", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+
+def test_api_filtered_pages():
+    client = _get_client()
+    ids = [
+        client.post("/api/initiative", json={"title": f"Paged {n}", "category": "Paged", "x": 5, "y": 5}).get_json()["id"]
+        for n in range(3)
+    ]
+    res = client.get("/api/initiatives?category=Paged&limit=2&fields=title")
+    page = res.get_json()
+    assert [row["id"] for row in page["initiatives"]] == ids[:2]
+    assert set(page["initiatives"][0]) == {"id", "title"}
+
+    page = client.get(f"/api/initiatives?category=Paged&limit=2&cursor={page['next_cursor']}").get_json()
+    assert [row["id"] for row in page["initiatives"]] == ids[2:]
+    assert page["next_cursor"] is None
+
+    assert client.get("/api/initiatives?fields=password").status_code == 400
+    assert client.get("/api/initiatives?category=Paged&cursor=abc").status_code == 400
+
+
+def test_api_search_ranks_and_excludes_deleted():
+    client = _get_client()
+    in_title = client.post("/api/initiative", json={"title": "Zebrafish rollout", "details": "plan"}).get_json()["id"]
+    in_details = client.post("/api/initiative", json={"title": "Other", "details": "mentions zebrafish once"}).get_json()["id"]
+    deleted = client.post("/api/initiative", json={"title": "Zebrafish archive"}).get_json()["id"]
+    client.delete(f"/api/initiative/{deleted}")
+
+    results = client.get("/api/search?q=zebra").get_json()["results"]
+    assert [r["id"] for r in results] == [in_title, in_details]
+    assert "<mark>Zebrafish</mark>" in results[0]["title_highlight"]
+
+    client.post("/api/initiative", json={"id": in_title, "title": "Renamed", "details": "plan"})
+    results = client.get("/api/search?q=zebrafish").get_json()["results"]
+    assert [r["id"] for r in results] == [in_details]
+
+    hyphenated = client.post("/api/initiative", json={"title": "E-commerce value/effort review"}).get_json()["id"]
+    for query in ("e-commerce", "value/effort", "commerce review"):
+        assert [r["id"] for r in client.get(f"/api/search?q={query}").get_json()["results"]] == [hyphenated]
+
+
+def test_api_search_escapes_highlighted_text():
+    client = _get_client()
+    client.post("/api/initiative", json={"title": "<img src=x onerror=alert(1)> Quokka", "details": "a <b>quokka</b>"})
+    result = client.get("/api/search?q=quokka").get_json()["results"][0]
+    assert result["title_highlight"] == "&lt;img src=x onerror=alert(1)&gt; <mark>Quokka</mark>"
+    assert result["snippet"] == "a &lt;b&gt;<mark>quokka</mark>&lt;/b&gt;"
+
+
+def test_api_import_export_round_trip():
+    client = _get_client()
+    body = "\n".join(
+        [
+            '{"title": "Imported A", "category": "Imported", "x": 80, "y": 10}',
+            '{"title": "", "category": "Imported"}',
+            '{"title": "Imported B", "category": "Imported", "x": 20, "y": 90}',
+        ]
+    )
+    res = client.post("/api/import?format=ndjson", data=body)
+    result = res.get_json()
+    assert (result["rows"], result["imported"], result["skipped"]) == (3, 2, 1)
+
+    exported = client.get("/api/export?format=csv").get_data(as_text=True)
+    rows = [line for line in exported.splitlines() if "Imported" in line]
+    assert len(rows) == 2
+    assert "Imported A" in rows[0] and ",Low,High," in rows[0]
+
+
+def test_api_import_skips_malformed_lines_and_rejects_bad_encoding():
+    client = _get_client()
+    body = '{"title": "Good"}\n{"title": "Broken"\n[1, 2]\n{"title": "Also good"}\n'
+    result = client.post("/api/import?format=ndjson", data=body).get_json()
+    assert (result["rows"], result["imported"], result["skipped"]) == (4, 2, 2)
+    assert [error["record"] for error in result["errors"]] == [2, 3]
+
+    res = client.post("/api/import?format=csv", data=b"title,x,y\nCaf\xe9,10,10\n")
+    assert res.status_code == 400
+    assert "UTF-8" in res.get_json()["error"]
+
+
+def test_api_audit_history():
+    client = _get_client()
+    user = "auditor"
+    new_id = client.post("/api/initiative", json={"title": "Audited", "x": 10, "y": 10, "user": user}).get_json()["id"]
+    client.post("/api/positions", json={"user": user, "positions": [{"id": new_id, "x": 70, "y": 80}]})
+    client.delete(f"/api/initiative/{new_id}?user={user}")
+
+    page = client.get(f"/api/audit?user={user}&limit=2").get_json()
+    assert [e["action"] for e in page["entries"]] == ["delete", "move"]
+    assert page["entries"][1]["details"]["x"] == 70
+    rest = client.get(f"/api/audit?initiative_id={new_id}&before={page['next_cursor']}").get_json()
+    assert [e["action"] for e in rest["entries"]] == ["create"]
+
+
+def test_api_as_of_reconstructs_past_positions():
+    import db
+
+    client = _get_client()
+    new_id = client.post("/api/initiative", json={"title": "Historic", "x": 10, "y": 10}).get_json()["id"]
+    db.flush_audit_log()
+    # Date the history so far in the past so the later move is after it.
+    with db._connect() as conn:
+        conn.execute("UPDATE audit_log SET timestamp = '2001-01-01 00:00:00'")
+        conn.execute("UPDATE board_snapshots SET taken_at = '2001-01-01 00:00:00'")
+        conn.commit()
+    client.post("/api/positions", json={"positions": [{"id": new_id, "x": 90, "y": 90}]})
+    db.take_snapshot()
+
+    past = client.get("/api/initiatives?as_of=2001-01-01T12:00:00Z").get_json()
+    row = next(r for r in past["initiatives"] if r["id"] == new_id)
+    assert (row["x"], row["y"]) == (10, 10)
+    assert past["read_only"] is True
+
+    now = client.get("/api/initiatives?as_of=2999-01-01T00:00:00").get_json()
+    row = next(r for r in now["initiatives"] if r["id"] == new_id)
+    assert (row["x"], row["y"]) == (90, 90)
+
+    assert client.get("/api/initiatives?as_of=yesterday").status_code == 400
+
+
+def test_api_rejects_stale_row_versions():
+    client = _get_client()
+    new_id = client.post("/api/initiative", json={"title": "Shared", "x": 10, "y": 10}).get_json()["id"]
+    rows = client.get("/api/initiatives").get_json()["initiatives"]
+    read_at = next(r for r in rows if r["id"] == new_id)["change_version"]
+    edit = {"id": new_id, "title": "Shared", "x": 20, "y": 20, "change_version": read_at}
+    assert client.post("/api/initiative", json=edit).status_code == 200
+
+    res = client.post("/api/initiative", json={**edit, "title": "Stale"})
+    assert res.status_code == 409
+    assert res.get_json()["current"]["title"] == "Shared"
+    res = client.post(
+        "/api/positions", json={"positions": [{"id": new_id, "x": 70, "y": 70, "change_version": read_at}]}
+    )
+    assert res.status_code == 409
+    assert res.get_json()["conflicts"][0]["x"] == 20
+
+
+def test_api_boards_are_isolated():
+    client = _get_client()
+    assert client.get("/api/boards/ops/initiatives").status_code == 404
+    assert client.post("/api/boards", json={"board": "../etc"}).status_code == 400
+    assert client.post("/api/boards", json={"board": "ops"}).status_code == 201
+    assert client.post("/api/boards", json={"board": "sales"}).status_code == 201
+    assert client.get("/api/boards").get_json()["boards"] == ["ops", "sales"]
+
+    res = client.post("/api/boards/ops/initiative", json={"title": "Ops only", "x": 5, "y": 5})
+    new_id = res.get_json()["id"]
+    ops = client.get("/api/boards/ops/initiatives").get_json()
+    assert [row["title"] for row in ops["initiatives"]] == ["Ops only"]
+    assert client.get("/api/boards/sales/initiatives").get_json()["initiatives"] == []
+    client.post("/api/boards/ops/positions", json={"positions": [{"id": new_id, "x": 60, "y": 60}]})
+    export = client.get("/api/boards/ops/export?format=ndjson").get_data(as_text=True)
+    assert '"x":60.0' in export
+
+
+def test_api_metrics_report_latency_rows_and_bytes():
+    import http_common
+
+    for metric in (http_common._request_seconds, http_common._response_bytes, http_common._response_rows):
+        metric.clear()
+    client = _get_client()
+    rows = client.get("/api/initiatives").get_json()["initiatives"]
+    client.get("/api/export?format=ndjson").get_data()
+
+    text = client.get("/api/metrics").get_data(as_text=True)
+    assert "# TYPE lumen_http_request_seconds histogram" in text
+    assert 'lumen_http_request_seconds_count{endpoint="api_get_initiatives",method="GET",status="200"} 1' in text
+    assert f'lumen_http_response_rows_total{{endpoint="api_get_initiatives"}} {len(rows)}' in text
+    assert 'lumen_http_response_bytes_count{endpoint="api_export"} 1' in text
+    assert 'lumen_db_call_seconds_bucket{function="get_initiatives_json",le="+Inf"}' in text
+    assert 'lumen_db_stage_seconds_count{stage="connect"}' in text
+
+
+def test_api_columnar_compressed_and_trimmed_initiatives():
+    import gzip
+    import json
+
+    client = _get_client()
+    records = client.get("/api/initiatives").get_json()["initiatives"]
+
+    res = client.get("/api/initiatives", headers={"Accept": "application/vnd.lumen.columns+json"})
+    assert res.mimetype == "application/vnd.lumen.columns+json"
+    table = res.get_json()["initiatives"]
+    assert [dict(zip(table["columns"], values)) for values in zip(*table["values"])] == records
+
+    res = client.get("/api/initiatives?format=columns&omit=details,created_at,updated_at,created_by,updated_by")
+    columns = res.get_json()["initiatives"]["columns"]
+    assert columns == ["id", "title", "color", "category", "x", "y", "value", "effort", "change_version"]
+    assert client.get("/api/initiatives?omit=nope").status_code == 400
+    since = client.get("/api/initiatives?since=0&omit=details").get_json()["initiatives"]
+    assert since and all("details" not in row for row in since)
+
+    for i in range(30):
+        client.post("/api/initiative", json={"title": f"Padding {i}", "details": "x" * 50, "x": 5, "y": 5})
+    plain = client.get("/api/initiatives")
+    assert "Content-Encoding" not in plain.headers
+    for _ in range(2):
+        res = client.get("/api/initiatives", headers={"Accept-Encoding": "gzip"})
+        assert res.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in res.headers["Vary"]
+        assert json.loads(gzip.decompress(res.get_data())) == plain.get_json()
+
+    version = plain.get_json()["version"]
+    assert plain.headers["ETag"] == f'"{version}"'
+    assert res.headers["ETag"] == f'"{version}-gz"'
+    columns = client.get("/api/initiatives?format=columns", headers={"Accept-Encoding": "gzip"})
+    assert columns.headers["ETag"] == f'"{version}-cols-gz"'
+    for res in (plain, columns):
+        assert {"Accept", "Accept-Encoding"} <= set(res.vary)
+    cached = client.get(
+        "/api/initiatives?format=columns", headers={"If-None-Match": columns.headers["ETag"], "Accept-Encoding": "gzip"}
+    )
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == columns.headers["ETag"]
+    assert {"Accept", "Accept-Encoding"} <= set(cached.vary)
+    assert client.get("/api/initiatives", headers={"If-None-Match": columns.headers["ETag"]}).status_code == 200
+
+    delta = client.get("/api/initiatives?since=0", headers={"Accept-Encoding": "gzip"})
+    assert delta.headers["Content-Encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(delta.get_data()))["initiatives"]) == len(plain.get_json()["initiatives"])
+    trimmed = client.get("/api/initiatives?fields=id,title").get_json()
+    assert "next_cursor" not in trimmed and len(trimmed["initiatives"]) == len(plain.get_json()["initiatives"])
+    assert set(trimmed["initiatives"][0]) == {"id", "title"}
+
+
+def test_api_reads_overlay_queued_moves_without_flushing(monkeypatch):
+    import db
+
+    client = _get_client()
+    monkeypatch.setattr(db, "WRITE_BEHIND_INTERVAL", 60.0)
+    monkeypatch.setattr(db._position_buffer, "interval", 60.0)
+    new_id = client.post("/api/initiative", json={"title": "Dragged", "x": 10, "y": 10}).get_json()["id"]
+    since = client.get("/api/last_updated").get_json()["version"]
+    for step in (20, 40, 90):
+        client.post("/api/positions", json={"positions": [{"id": new_id, "x": step, "y": step}]})
+
+    res = client.get("/api/initiatives")
+    assert next(r for r in res.get_json()["initiatives"] if r["id"] == new_id)["x"] == 90
+    client.post("/api/positions", json={"positions": [{"id": new_id, "x": 80, "y": 80}]})
+    moved = client.get("/api/initiatives", headers={"If-None-Match": res.headers["ETag"]})
+    assert moved.status_code == 200 and moved.headers["ETag"] != res.headers["ETag"]
+    assert next(r for r in moved.get_json()["initiatives"] if r["id"] == new_id)["x"] == 80
+    assert client.get("/api/initiatives", headers={"If-None-Match": moved.headers["ETag"]}).status_code == 304
+    delta = client.get(f"/api/initiatives?since={since}").get_json()
+    assert [(r["id"], r["x"]) for r in delta["initiatives"]] == [(new_id, 80)]
+    cells = client.get("/api/summary").get_json()["summary"]["cells"]
+    assert new_id in next(c for c in cells if (c["value"], c["effort"]) == ("High", "High"))["ids"]
+    assert client.get("/api/last_updated").get_json()["version"] == since
+    assert db.write_behind_stats()["pending"] == 1
+
+    assert db.flush_positions() == 1
+    assert client.get("/api/last_updated").get_json()["version"] == since + 1
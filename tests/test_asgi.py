@@ -0,0 +1,221 @@
+import sys
+from pathlib import Path
+import gzip
+import importlib
+import json
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import anyio
+
+
+def _get_app():
+    """Return the ASGI app for the test's database."""
+    import asgi
+    importlib.reload(asgi)
+    return asgi.app
+
+
+def _request(app, method: str, path: str, body=None, headers: dict | None = None) -> tuple[int, dict, bytes]:
+    """Drive one request through ``app``; return status, headers and body."""
+    if isinstance(body, bytes):
+        payload = body
+    else:
+        payload = json.dumps(body).encode() if body is not None else b""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+    response = {"body": b""}
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await anyio.sleep_forever()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode(): v.decode() for k, v in message["headers"]}
+        else:
+            response["body"] += message.get("body", b"")
+
+    anyio.run(app, scope, receive, send)
+    return response["status"], response["headers"], response["body"]
+
+
+def test_asgi_matches_flask_contract():
+    app = _get_app()
+    import api
+
+    status, _, body = _request(app, "POST", "/api/initiative", {"title": "Async", "x": 10, "y": 20})
+    assert status == 200
+    new_id = json.loads(body)["id"]
+
+    status, headers, body = _request(app, "GET", "/api/initiatives")
+    flask = api.app.test_client().get("/api/initiatives")
+    assert status == 200
+    assert json.loads(body) == flask.get_json()
+    assert headers["etag"] == flask.headers["ETag"]
+    assert _request(app, "GET", "/api/initiatives", headers={"If-None-Match": headers["etag"]})[0] == 304
+
+    status, _, body = _request(app, "GET", "/api/initiatives?category=nope&limit=5")
+    assert json.loads(body)["initiatives"] == []
+    assert _request(app, "GET", "/api/audit?limit=0")[0] == 400
+    assert _request(app, "GET", "/api/initiatives?since=garbage")[0] == 400
+    assert _request(app, "GET", "/api/initiatives?limit=5&cursor=abc")[0] == 400
+    assert _request(app, "GET", "/api/export?format=ndjson")[2].count(b"\n") == len(json.loads(flask.data)["initiatives"])
+    assert _request(app, "GET", "/api/boards/missing/initiatives")[0] == 404
+    for path in ("/api/positions", "/api/initiative", "/api/boards"):
+        for payload in (b"{not json", b"[1, 2]"):
+            flask_status = api.app.test_client().post(path, data=payload).status_code
+            assert _request(app, "POST", path, payload)[0] == flask_status == 400
+    for positions in ([{"id": 1, "x": 70}], [{"id": 1, "x": "abc", "y": 70}], {"id": 1, "x": 70, "y": 70}):
+        payload = json.dumps({"positions": positions}).encode()
+        flask_status = api.app.test_client().post("/api/positions", data=payload).status_code
+        assert _request(app, "POST", "/api/positions", payload)[0] == flask_status == 400
+    for payload in ({"title": "Bad", "change_version": "zz"}, {"title": "Bad", "x": "abc"}, {"title": "Bad", "y": -1}):
+        flask_status = api.app.test_client().post("/api/initiative", json=payload).status_code
+        assert _request(app, "POST", "/api/initiative", payload)[0] == flask_status == 400
+    ndjson = b'{"title": "Spooled"}\n{"title": "Spooled"}\n'
+    status, _, body = _request(app, "POST", "/api/import?format=ndjson", ndjson)
+    assert status == 200 and json.loads(body)["imported"] == 2
+
+    import db
+
+    # Enough rows for the body to pass the compression threshold.
+    db.import_initiatives((json.dumps({"title": f"Bulk {n}", "details": "padding " * 8}) for n in range(40)), "ndjson")
+    accept = {"Accept": "application/vnd.lumen.columns+json", "Accept-Encoding": "gzip"}
+    status, headers, body = _request(app, "GET", "/api/initiatives?omit=details", headers=accept)
+    columns = api.app.test_client().get("/api/initiatives?omit=details", headers=accept)
+    assert headers["content-type"] == "application/vnd.lumen.columns+json"
+    assert headers["content-encoding"] == columns.headers["Content-Encoding"] == "gzip"
+    board = json.loads(gzip.decompress(body))
+    assert board == json.loads(gzip.decompress(columns.data))
+    assert headers["etag"] == columns.headers["ETag"] == f'"{board["version"]}-cols-gz"'
+    assert headers["vary"].startswith("Accept, Accept-Encoding")
+    cached = {**accept, "If-None-Match": headers["etag"]}
+    status, headers, _ = _request(app, "GET", "/api/initiatives?omit=details", headers=cached)
+    assert status == 304 and headers["vary"].startswith("Accept, Accept-Encoding")
+
+    assert _request(app, "DELETE", f"/api/initiative/{new_id}")[0] == 200
+    ids = [row["id"] for row in json.loads(_request(app, "GET", "/api/initiatives")[2])["initiatives"]]
+    assert new_id not in ids
+
+
+def test_asgi_positions_and_conflicts():
+    app = _get_app()
+    new_id = json.loads(_request(app, "POST", "/api/initiative", {"title": "Shared", "x": 10, "y": 10})[2])["id"]
+    rows = json.loads(_request(app, "GET", "/api/initiatives")[2])["initiatives"]
+    read_at = next(r for r in rows if r["id"] == new_id)["change_version"]
+
+    move = {"id": new_id, "x": 40, "y": 40, "change_version": read_at}
+    status, _, body = _request(app, "POST", "/api/positions", {"positions": [move]})
+    assert status == 200 and json.loads(body)["updated"] == 1
+
+    status, _, body = _request(app, "POST", "/api/positions", {"positions": [{**move, "x": 90}]})
+    assert status == 409
+    assert json.loads(body)["conflicts"][0]["x"] == 40
+
+
+def test_asgi_sheds_load_when_queue_is_full(monkeypatch):
+    app = _get_app()
+    import asgi
+
+    monkeypatch.setattr(asgi, "MAX_QUEUE", 0)
+    status, headers, body = _request(app, "GET", "/api/summary")
+    assert status == 503
+    assert headers["retry-after"] == "1"
+    assert "error" in json.loads(body)
+    text = _request(app, "GET", "/api/metrics")[2].decode()
+    assert 'lumen_http_request_seconds_count{endpoint="api_summary",method="GET",status="503"} 1' in text
+
+
+def test_asgi_reads_do_not_flush_queued_moves(monkeypatch):
+    app = _get_app()
+    import db
+
+    monkeypatch.setattr(db, "WRITE_BEHIND_INTERVAL", 60.0)
+    monkeypatch.setattr(db._position_buffer, "interval", 60.0)
+    new_id = json.loads(_request(app, "POST", "/api/initiative", {"title": "Queued", "x": 10, "y": 10})[2])["id"]
+    _request(app, "POST", "/api/positions", {"positions": [{"id": new_id, "x": 80, "y": 80}]})
+    for path in (
+        "/api/initiatives",
+        "/api/initiatives?limit=5",
+        "/api/summary",
+        "/api/last_updated",
+        "/api/search?q=queued",
+        "/api/export",
+        "/api/audit",
+    ):
+        assert _request(app, "GET", path)[0] == 200
+    etag = _request(app, "GET", "/api/initiatives")[1]["etag"]
+    _request(app, "POST", "/api/positions", {"positions": [{"id": new_id, "x": 20, "y": 20}]})
+    status, headers, body = _request(app, "GET", "/api/initiatives", headers={"If-None-Match": etag})
+    assert status == 200 and headers["etag"] != etag
+    assert next(r for r in json.loads(body)["initiatives"] if r["id"] == new_id)["x"] == 20
+    assert db.write_behind_stats()["pending"] == 1
+    db.flush_positions()
+
+
+def test_asgi_stream_wakes_on_change_without_polling():
+    app = _get_app()
+    import db
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/stream",
+        "raw_path": b"/api/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    chunks: list[bytes] = []
+
+    async def receive():
+        await anyio.sleep_forever()
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    async def main() -> int:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(app, scope, receive, send)
+            with anyio.fail_after(5):
+                while not chunks:
+                    await anyio.sleep(0.01)
+                new_id = await anyio.to_thread.run_sync(
+                    db.upsert_initiative, None, "Woken", "", "blue", "", 10, 10, "tester"
+                )
+                while not any(b"data: " in chunk for chunk in chunks):
+                    await anyio.sleep(0.01)
+            tg.cancel_scope.cancel()
+        return new_id
+
+    new_id = anyio.run(main)
+    event = next(chunk for chunk in chunks if b"data: " in chunk)
+    assert json.loads(event.decode().split("data: ")[1])["changed"] == [new_id]
+    from events import notifier_for
+
+    assert not notifier_for(db.DB_PATH)._subscribers
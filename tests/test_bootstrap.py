@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import bootstrap
+import db
+
+
+def test_ensure_db_runs_init_once_per_path(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "boot.db"))
+    monkeypatch.setattr(db, "init_db", lambda: calls.append(1) or False)
+    first = bootstrap.ensure_db()
+    assert bootstrap.ensure_db() is first
+    assert calls == [1]
+    assert "init_db" in bootstrap.startup_report()
+
+
+def test_version_falls_back_to_stamp_file(tmp_path, monkeypatch):
+    stamp = tmp_path / "version.txt"
+    stamp.write_text("42-abc1234\n")
+    monkeypatch.setattr(bootstrap, "VERSION_FILE", str(stamp))
+    monkeypatch.setattr(bootstrap, "_git_version", lambda: None)
+    monkeypatch.setattr(bootstrap, "_version", None)
+    assert bootstrap.get_version() == "42-abc1234"
+    stamp.write_text("changed")
+    assert bootstrap.get_version() == "42-abc1234"
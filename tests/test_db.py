@@ -9,10 +9,433 @@ if str(ROOT) not in sys.path:
 from db import init_db, add_initiative, get_initiatives
 
 
-def test_add_and_retrieve(tmp_path, monkeypatch):
-    test_db = tmp_path / "test.db"
-    monkeypatch.setenv("LUMEN_DB", str(test_db))
+def test_add_and_retrieve():
     init_db()
     add_initiative("Test", "Details", "blue", "Cat", 10, 20, "tester")
     df = get_initiatives()
     assert "Test" in df["title"].values
+
+
+def test_update_positions_skips_unmoved():
+    from db import upsert_initiative, update_positions, get_initiative
+
+    init_db()
+    moved = upsert_initiative(None, "Moved", "", "blue", "", 10, 10, "tester")
+    still = upsert_initiative(None, "Still", "", "blue", "", 40, 40, "tester")
+    changed = update_positions(
+        [{"id": moved, "x": 80, "y": 90}, {"id": still, "x": 40, "y": 40}],
+        "tester",
+    )
+    assert changed == 1
+    row = get_initiative(moved)
+    assert (row["x"], row["y"]) == (80, 90)
+
+
+def test_connections_are_pooled_and_use_wal():
+    import db
+
+    init_db()
+    with db._connect() as conn:
+        first = conn
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    with db._connect() as conn:
+        assert conn is first
+    assert mode.lower() == "wal"
+
+
+def test_board_version_bumps_on_every_write():
+    from db import get_board_version, upsert_initiative, delete_initiative
+
+    init_db()
+    start = get_board_version()
+    new_id = upsert_initiative(None, "Versioned", "", "blue", "", 10, 10, "tester")
+    after_insert = get_board_version()
+    upsert_initiative(new_id, "Versioned", "edited", "blue", "", 10, 10, "tester")
+    after_update = get_board_version()
+    delete_initiative(new_id, "tester")
+    assert start < after_insert < after_update < get_board_version()
+
+
+def test_initiatives_cache_hits_until_next_write():
+    from db import cache_stats, upsert_initiative
+
+    init_db()
+    get_initiatives()
+    before = cache_stats()
+    get_initiatives()
+    assert cache_stats()["hits"] == before["hits"] + 1
+
+    upsert_initiative(None, "Invalidate", "", "blue", "", 10, 10, "tester")
+    df = get_initiatives()
+    assert cache_stats()["misses"] == before["misses"] + 1
+    assert "Invalidate" in df["title"].values
+
+
+def test_rows_serialize_to_json_without_pandas():
+    import json
+
+    from db import get_initiative_rows, iter_records_json, upsert_initiative
+
+    init_db()
+    new_id = upsert_initiative(None, "Rowed", "", "blue", "", 10, 20, "tester")
+    rows = get_initiative_rows()
+    records = json.loads("".join(iter_records_json(rows)))
+    assert len(records) == len(rows)
+    record = next(r for r in records if r["id"] == new_id)
+    assert (record["title"], record["x"], record["y"]) == ("Rowed", 10, 20)
+    assert json.loads("".join(iter_records_json([]))) == []
+
+
+def test_seed_keeps_csv_timestamps_and_derives_buckets():
+    import csv
+
+    import db
+
+    assert init_db() is True
+    with open(ROOT / "lumen_initiatives.csv", newline="", encoding="utf-8") as fh:
+        seed = {int(record["id"]): record for record in csv.DictReader(fh)}
+    rows = {row.id: row for row in db.get_initiative_rows()}
+    for row_id, record in seed.items():
+        row = rows[row_id]
+        assert (row.created_at, row.updated_at) == (record["created_at"], record["updated_at"])
+        assert (row.value, row.effort) == db._value_effort(float(record["x"]), float(record["y"]))
+
+
+def test_import_upserts_by_id_in_chunks():
+    import io
+
+    from db import get_initiative, import_initiatives, upsert_initiative
+
+    init_db()
+    existing = upsert_initiative(None, "Before", "", "blue", "", 10, 10, "tester")
+    source = io.StringIO(f"id,title,x,y\n{existing},After,90,90\n,Fresh,5,5\n")
+    calls = []
+    result = import_initiatives(source, chunk_size=1, progress=calls.append)
+    assert result["imported"] == 2
+    assert len(calls) == 3
+    assert get_initiative(existing)["title"] == "After"
+
+
+def test_audit_compaction_keeps_last_move_per_day():
+    import db
+    from audit import apply_retention
+
+    init_db()
+    with db._connect() as conn:
+        conn.executemany(
+            "INSERT INTO audit_log (action, initiative_id, user, timestamp) VALUES (?, ?, ?, ?)",
+            [
+                ("move", -99, "compactor", "2000-01-01 10:00:00"),
+                ("move", -99, "compactor", "2000-01-01 11:00:00"),
+                ("update", -99, "compactor", "2000-01-01 12:00:00"),
+            ],
+        )
+        conn.commit()
+        apply_retention(conn, retention_days=0, compact_after_days=30)
+        kept = conn.execute(
+            "SELECT action, timestamp FROM audit_log WHERE initiative_id = -99 ORDER BY id"
+        ).fetchall()
+    assert kept == [("move", "2000-01-01 11:00:00"), ("update", "2000-01-01 12:00:00")]
+
+
+def test_retention_keeps_entries_newer_than_the_covering_snapshot():
+    import time
+
+    import db
+    from audit import apply_retention
+
+    init_db()
+    new_id = db.upsert_initiative(None, "Retained", "", "blue", "", 10, 10, "tester")
+    db.update_positions([{"id": new_id, "x": 80, "y": 80}], "tester")
+    db.flush_audit_log()
+    with db._connect() as conn:
+        conn.execute("UPDATE board_snapshots SET taken_at = '2000-01-01 00:00:00'")
+        conn.execute("UPDATE audit_log SET timestamp = '2000-01-02 00:00:00' WHERE initiative_id = ?", (new_id,))
+        conn.execute(
+            "INSERT INTO audit_log (action, initiative_id, user, timestamp, board_version) "
+            "VALUES ('move', -98, 'expired', '1999-12-31 00:00:00', 0)"
+        )
+        conn.commit()
+        apply_retention(conn, retention_days=30, compact_after_days=0)
+        users = {row[0] for row in conn.execute("SELECT user FROM audit_log")}
+    assert "expired" not in users
+    now = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+    row = next(r for r in db.get_initiatives_as_of(now) if r["id"] == new_id)
+    assert (row["x"], row["y"]) == (80, 80)
+
+
+def test_audit_writer_survives_errors_and_restarts():
+    import sqlite3
+    from contextlib import contextmanager
+
+    from audit import _STOP, AuditWriter
+
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE audit_log (action, initiative_id, initiative_title, user, details, timestamp, board_version)"
+    )
+    calls = []
+
+    @contextmanager
+    def connect(path):
+        calls.append(path)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        yield conn
+
+    writer = AuditWriter(connect, flush_interval=0.01)
+    writer.record("board", [("move", 1, "A", "u", None, "2000-01-01 00:00:00", 1)])
+    assert writer.flush(timeout=2)
+    writer.record("board", [("move", 1, "A", "u", None, "2000-01-01 00:00:01", 2)])
+    assert writer.flush(timeout=2)
+    assert conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 1
+
+    # A writer thread that ended anyway is replaced on the next call.
+    writer._queue.put(_STOP)
+    writer._thread.join(timeout=2)
+    assert not writer._thread.is_alive()
+    writer.record("board", [("move", 1, "A", "u", None, "2000-01-01 00:00:02", 3)])
+    assert writer.flush(timeout=2)
+    assert conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 2
+    writer.close()
+
+
+def test_audit_log_rejects_bad_limit_before_flushing_moves(monkeypatch):
+    import pytest
+
+    import db
+
+    init_db()
+    flushed = []
+    monkeypatch.setattr(db._position_buffer, "flush", lambda: flushed.append(1) or 0)
+    with pytest.raises(ValueError):
+        db.get_audit_log(limit=0)
+    with pytest.raises(ValueError):
+        db.search_initiatives("anything", limit=0)
+    assert flushed == []
+
+
+def test_queued_moves_coalesce_and_are_read_back(monkeypatch):
+    import db
+
+    init_db()
+    monkeypatch.setattr(db, "WRITE_BEHIND_INTERVAL", 60.0)
+    monkeypatch.setattr(db._position_buffer, "interval", 60.0)
+    new_id = db.upsert_initiative(None, "Dragged", "", "blue", "", 10, 10, "tester")
+    version = db.get_board_version()
+    before = db.write_behind_stats()
+    for step in range(1, 6):
+        db.queue_positions([{"id": new_id, "x": 10 + step, "y": 20 + step}], "tester")
+    assert db.get_board_version() == version
+    assert db.get_initiative(new_id)["x"] == 15
+    row = next(r for r in db.get_initiative_rows() if r.id == new_id)
+    assert (row.x, row.y, row.effort) == (15, 25, "Low")
+    assert db.flush_positions() == 1
+    assert db.get_board_version() == version + 1
+    stats = db.write_behind_stats()
+    assert stats["received"] - before["received"] == 5
+    assert stats["written"] - before["written"] == 1
+    assert stats["pending"] == 0
+
+
+def test_queued_reads_overlay_moves_and_bad_batches_queue_nothing(monkeypatch):
+    import pytest
+
+    import db
+
+    init_db()
+    monkeypatch.setattr(db, "WRITE_BEHIND_INTERVAL", 60.0)
+    monkeypatch.setattr(db._position_buffer, "interval", 60.0)
+    new_id = db.upsert_initiative(None, "Quokka", "", "blue", "Queued", 10, 10, "tester")
+    with pytest.raises(KeyError):
+        db.queue_positions([{"id": new_id, "x": 77, "y": 77}, {"id": new_id}], "tester")
+    assert db.write_behind_stats()["pending"] == 0
+
+    db.queue_positions([{"id": new_id, "x": 90, "y": 90}], "tester")
+    rows, fields, _ = db.query_initiatives({"category": "Queued", "value": "High"}, ["x", "value"], limit=5)
+    assert rows == [(new_id, 90, "High")] and fields == ("id", "x", "value")
+    assert db.query_initiatives({"category": "Queued", "x_max": 50}, limit=5)[0] == []
+    assert db.search_initiatives("quokka")[0]["x"] == 90
+    assert ",90.0,90.0,High,High," in "".join(db.iter_export("csv"))
+    db.get_audit_log()
+    assert db.write_behind_stats()["pending"] == 1
+    db.flush_positions()
+
+
+def test_board_frame_is_shared_until_the_board_or_its_moves_change(monkeypatch):
+    import db
+
+    init_db()
+    monkeypatch.setattr(db, "WRITE_BEHIND_INTERVAL", 60.0)
+    monkeypatch.setattr(db._position_buffer, "interval", 60.0)
+    new_id = db.upsert_initiative(None, "Framed", "", "blue", "", 10, 10, "tester")
+    frame = db.get_initiatives_frame()
+    assert db.get_initiatives_frame() is frame
+    db.queue_positions([{"id": new_id, "x": 60, "y": 60}], "tester")
+    moved = db.get_initiatives_frame()
+    assert moved is not frame and db.get_initiatives_frame() is moved
+    assert moved.loc[moved["id"] == new_id, "x"].item() == 60
+    db.flush_positions()
+
+
+def test_write_behind_retries_failed_flush():
+    from writebehind import WriteBehindBuffer
+
+    written, failures = [], [RuntimeError("locked")]
+
+    def flush(batch):
+        if failures:
+            raise failures.pop()
+        written.append(batch)
+
+    buffer = WriteBehindBuffer(flush, interval=60)
+    buffer.put(1, "a")
+    try:
+        buffer.flush()
+    except RuntimeError:
+        pass
+    buffer.put(2, "b")
+    assert buffer.pending() == {1: "a", 2: "b"}
+    buffer.close()
+    assert written == [{1: "a", 2: "b"}]
+
+
+def test_partial_flush_requeues_only_unwritten_updates():
+    import pytest
+    from writebehind import PartialFlushError, WriteBehindBuffer
+
+    written = []
+
+    def flush(batch):
+        if not written:
+            written.append({1: batch[1]})
+            raise PartialFlushError({2: batch[2]})
+        written.append(batch)
+
+    buffer = WriteBehindBuffer(flush, interval=60)
+    buffer.put(1, "a")
+    buffer.put(2, "b")
+    with pytest.raises(PartialFlushError):
+        buffer.flush()
+    assert buffer.pending() == {2: "b"}
+    assert buffer.stats()["written"] == 1
+    buffer.close()
+    assert written == [{1: "a"}, {2: "b"}]
+
+
+def test_buffered_moves_only_retag_their_own_board(monkeypatch):
+    import pytest
+
+    import db
+
+    init_db()
+    monkeypatch.setattr(db, "WRITE_BEHIND_INTERVAL", 60.0)
+    monkeypatch.setattr(db._position_buffer, "interval", 60.0)
+    db.create_board("other")
+    with db.use_board("other"):
+        other_id = db.upsert_initiative(None, "Elsewhere", "", "blue", "", 10, 10, "tester")
+    new_id = db.upsert_initiative(None, "Here", "", "blue", "", 10, 10, "tester")
+    db.queue_positions([{"id": new_id, "x": 20, "y": 20}], "tester")
+    state = db.get_board_state(flush=False)
+    with db.use_board("other"):
+        other = db.get_board_state(flush=False)
+        db.queue_positions([{"id": other_id, "x": 30, "y": 30}], "tester")
+        assert db.get_board_state(flush=False) != other
+    assert db.get_board_state(flush=False) == state
+    db.queue_positions([{"id": new_id, "x": 21, "y": 21}], "tester")
+    assert db.get_board_state(flush=False) != state
+
+    update_positions = db.update_positions
+
+    def fail_other(positions, user, conflicts=None):
+        if db.current_path() == db.board_path("other"):
+            raise db.sqlite3.OperationalError("database is locked")
+        return update_positions(positions, user, conflicts)
+
+    monkeypatch.setattr(db, "update_positions", fail_other)
+    with pytest.raises(db.PartialFlushError):
+        db.flush_positions()
+    assert list(db._position_buffer.pending()) == [(db.board_path("other"), other_id)]
+    assert db.get_initiative(new_id)["x"] == 21
+    monkeypatch.setattr(db, "update_positions", update_positions)
+    db.flush_positions()
+
+
+def test_stale_row_version_is_rejected_with_current_row():
+    import pytest
+    from db import VersionConflict, get_initiative, update_positions, upsert_initiative
+
+    init_db()
+    new_id = upsert_initiative(None, "Contended", "", "blue", "", 10, 10, "alice")
+    read_at = get_initiative(new_id)["change_version"]
+    upsert_initiative(new_id, "Contended", "by bob", "blue", "", 20, 20, "bob", read_at)
+    with pytest.raises(VersionConflict) as conflict:
+        upsert_initiative(new_id, "Contended", "by alice", "blue", "", 30, 30, "alice", read_at)
+    assert conflict.value.current["details"] == "by bob"
+    conflicts = []
+    moved = update_positions([{"id": new_id, "x": 90, "y": 90, "change_version": read_at}], "alice", conflicts)
+    current = get_initiative(new_id)
+    assert moved == 0
+    assert conflicts == [{"id": new_id, "x": 20, "y": 20, "change_version": current["change_version"]}]
+    assert update_positions([{"id": new_id, "x": 90, "y": 90, "change_version": current["change_version"]}]) == 1
+
+
+def test_board_databases_are_evicted_least_recently_used_first(monkeypatch):
+    import db
+
+    monkeypatch.setattr(db, "MAX_OPEN_DATABASES", 2)
+    for board in ("a", "b", "c"):
+        db.create_board(board)
+        with db.use_board(board):
+            db.upsert_initiative(None, f"On {board}", "", "blue", "", 10, 10, "tester")
+    # The audit writer connects to each board in the background.
+    db.flush_audit_log()
+    open_paths = db.open_databases()
+    assert db.board_path("a") not in open_paths
+    assert open_paths[-1] == db.board_path("c")
+    with db.use_board("a"):
+        assert [row.title for row in db.get_initiative_rows()] == ["On a"]
+    assert db.current_path() == db.DB_PATH
+
+
+def test_slow_calls_are_logged_and_all_calls_timed(monkeypatch, caplog):
+    import db
+
+    init_db()
+    calls = db._call_seconds.count(function="get_quadrant_summary")
+    db.get_quadrant_summary()
+    assert db._call_seconds.count(function="get_quadrant_summary") == calls + 1
+    assert not [r for r in caplog.records if r.getMessage().startswith("Slow")]
+
+    monkeypatch.setattr(db, "SLOW_QUERY_MS", 1e-6)
+    with caplog.at_level("WARNING", logger="db"):
+        db.search_initiatives("sample", limit=5)
+    assert any(r.getMessage().startswith("Slow search_initiatives took") for r in caplog.records)
+
+
+def test_retention_keeps_the_moves_as_of_replays():
+    import db
+    from audit import apply_retention
+
+    init_db()
+    new_id = db.upsert_initiative(None, "Replayed", "", "blue", "", 10, 10, "tester")
+    db.update_positions([{"id": new_id, "x": 20, "y": 20}], "tester")
+    db.update_positions([{"id": new_id, "x": 30, "y": 30}], "tester")
+    db.flush_audit_log()
+    with db._connect() as conn:
+        conn.execute("UPDATE board_snapshots SET taken_at = '2000-01-01 00:00:00'")
+        entries = conn.execute("SELECT id FROM audit_log WHERE initiative_id = ? ORDER BY id", (new_id,)).fetchall()
+        for (entry_id,), hour in zip(entries, ("09", "11", "15")):
+            conn.execute("UPDATE audit_log SET timestamp = ? WHERE id = ?", (f"2000-01-01 {hour}:00:00", entry_id))
+        conn.commit()
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {db._HISTORY_DELTAS_QUERY}", (0, 0, "")).fetchall()
+    assert "board_version>? AND board_version<?" in plan[0][3]
+
+    def position_at_noon():
+        row = next(r for r in db.get_initiatives_as_of("2000-01-01T12:00:00") if r["id"] == new_id)
+        return row["x"], row["y"]
+
+    assert position_at_noon() == (20, 20)
+    with db._connect() as conn:
+        apply_retention(conn)
+    assert position_at_noon() == (20, 20)
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from db import init_db, upsert_initiative, delete_initiative
+from events import ChangeNotifier, notifier_for
+
+
+def test_writes_are_published_to_subscribers():
+    init_db()
+    notifier = notifier_for()
+    subscription = notifier.subscribe()
+    try:
+        new_id = upsert_initiative(None, "Streamed", "", "blue", "", 10, 10, "tester")
+        event = subscription.get(timeout=1)
+        assert event["changed"] == [new_id]
+        delete_initiative(new_id, "tester")
+        event = subscription.get(timeout=1)
+        assert event["deleted"] == [new_id]
+    finally:
+        notifier.unsubscribe(subscription)
+
+
+def test_slow_subscriber_gets_resync_without_blocking_others():
+    init_db()
+    local = ChangeNotifier(queue_size=1, poll_interval=60)
+    slow = local.subscribe()
+    fast = local.subscribe()
+    base = local._version
+    for offset in (1, 2):
+        local.publish({"version": base + offset, "changed": [offset], "deleted": []})
+        assert fast.get(timeout=1)["version"] == base + offset
+    assert slow.get(timeout=1) == {"version": base + 2, "resync": True}
+
+
+def test_local_write_after_an_unpolled_external_write_announces_both():
+    import sqlite3
+
+    import db
+
+    init_db()
+    notifier = notifier_for()
+    notifier.poll_interval = 60
+    subscription = notifier.subscribe()
+    try:
+        other = sqlite3.connect(db.current_path())
+        other.execute("INSERT INTO initiatives (title, x, y) VALUES ('External', 10, 10)")
+        other.commit()
+        external = other.execute("SELECT MAX(id) FROM initiatives").fetchone()[0]
+        other.close()
+        local = upsert_initiative(None, "Local", "", "blue", "", 10, 10, "tester")
+        event = subscription.get(timeout=1)
+        assert {external, local} <= set(event["changed"]) and "since" not in event
+        assert event["version"] == db.get_board_version()
+    finally:
+        notifier.unsubscribe(subscription)
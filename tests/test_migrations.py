@@ -0,0 +1,44 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import migrations
+from db import check_query_plans, init_db
+
+
+def test_migrate_upgrades_unversioned_database(tmp_path):
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    # Schema as created before migrations existed.
+    conn.execute(
+        """
+        CREATE TABLE initiatives (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, details TEXT,
+            color TEXT, category TEXT, x REAL, y REAL, value TEXT, effort TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by TEXT, updated_by TEXT, is_deleted BOOLEAN DEFAULT 0
+        )
+        """
+    )
+    conn.execute("INSERT INTO initiatives (title, x, y) VALUES ('Legacy', 1, 2)")
+    conn.commit()
+
+    assert migrations.migrate(conn) == sorted(migrations._MIGRATIONS)
+    assert migrations.current_version(conn) == migrations.latest_version()
+    assert migrations.migrate(conn) == []
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_audit_log_initiative_id" in indexes and "idx_audit_log_initiative" not in indexes
+
+    conn.execute("UPDATE initiatives SET x = 5 WHERE title = 'Legacy'")
+    version = conn.execute("SELECT version FROM board_state").fetchone()[0]
+    assert conn.execute("SELECT change_version FROM initiatives").fetchone()[0] == version
+    conn.close()
+
+
+def test_hot_queries_use_indexes():
+    init_db()
+    assert check_query_plans() == {}
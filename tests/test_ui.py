@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from collections import namedtuple
+
+from ui import FULL_VIEW, _apply_remote, _note_item, _sync_notes, plan_viewport
+
+
+def _board(n: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"id": range(1, n + 1), "x": [(i * 37) % 100 for i in range(n)], "y": [(i * 61) % 100 for i in range(n)]}
+    )
+
+
+def test_small_board_renders_every_note():
+    notes, clusters = plan_viewport(_board(20), FULL_VIEW, budget=50)
+    assert len(notes) == 20
+    assert clusters == []
+
+
+def test_large_board_is_clustered_within_budget():
+    df = pd.concat([_board(500), pd.DataFrame({"id": range(1000, 1300), "x": 90.0, "y": 90.0})])
+    notes, clusters = plan_viewport(df, FULL_VIEW, budget=100, grid=8)
+    assert len(notes) <= 100
+    assert len(clusters) <= 64
+    assert len(notes) + sum(c["count"] for c in clusters) == len(df)
+    dense = max(clusters, key=lambda c: c["count"])
+    x0, x1, y0, y1 = dense["bounds"]
+    assert x0 <= 90 <= x1 and y0 <= 90 <= y1
+
+
+def test_zooming_into_a_cluster_limits_rows_to_the_viewport():
+    df = _board(1000)
+    notes, clusters = plan_viewport(df, (0.0, 10.0, 0.0, 10.0), budget=100)
+    assert ((notes["x"] <= 10) & (notes["y"] <= 10)).all()
+    assert len(notes) <= 100
+
+
+def test_clusters_match_the_rows_they_stand_for():
+    df = _board(400)
+    notes, clusters = plan_viewport(df, FULL_VIEW, budget=50, grid=4)
+    assert set(notes["id"]) <= set(df["id"]) and len(notes) <= 50
+    for cluster in clusters:
+        x0, x1, y0, y1 = cluster["bounds"]
+        assert x0 <= cluster["x"] <= x1 and y0 <= cluster["y"] <= y1
+
+
+def test_stacked_notes_stay_within_budget():
+    df = pd.DataFrame({"id": range(1, 501), "x": 50.0, "y": 50.0})
+    notes, clusters = plan_viewport(df, (49.0, 51.0, 49.0, 51.0), budget=100)
+    assert len(notes) == 100
+    assert clusters == []
+
+
+def test_remote_changes_patch_the_layout_in_place():
+    layout = [_note_item("1", 10, 10), _note_item("2", 20, 20), _note_item("3", 30, 30)]
+    untouched = layout[0]
+    tracked = {item["i"]: (1, item["x"], item["y"]) for item in layout}
+    layout[2]["x"] = 35  # an unsaved local drag
+    Row = namedtuple("Row", "id x y change_version")
+    _apply_remote(layout, tracked, [Row(2, 55, 45, 7), Row(3, 30, 30, 8)], FULL_VIEW)
+    assert layout[0] is untouched
+    assert [(item["x"], item["y"]) for item in layout] == [(10, 10), (55, 45), (35, 30)]
+    assert tracked == {"1": (1, 10, 10), "2": (7, 55, 45), "3": (8, 30, 30)}
+
+    notes = pd.DataFrame({"id": [1, 2, 4], "x": [10, 55, 70], "y": [10, 45, 70], "change_version": [1, 7, 9]})
+    _sync_notes(layout, tracked, notes, [], FULL_VIEW)
+    assert layout[0] is untouched
+    assert [item["i"] for item in layout] == ["1", "2", "4"]
+    assert tracked["4"] == (9, 70, 70) and "3" not in tracked
@@ -17,14 +17,12 @@ from db import (
 )
 
 
-def _prepare_db(tmp_path, monkeypatch):
-    db_path = tmp_path / "valeff.db"
-    monkeypatch.setenv("LUMEN_DB", str(db_path))
+def _prepare_db():
     init_db()
 
 
-def test_value_effort_high(tmp_path, monkeypatch):
-    _prepare_db(tmp_path, monkeypatch)
+def test_value_effort_high():
+    _prepare_db()
     new_id = upsert_initiative(None, "ValEffHigh", "", "red", "", 80, 90, "tester")
     df = get_initiatives()
     row = df[df["id"] == new_id].iloc[0]
@@ -32,19 +30,85 @@ def test_value_effort_high(tmp_path, monkeypatch):
     assert row["effort"] == "High"
 
 
-def test_value_effort_low_medium(tmp_path, monkeypatch):
-    _prepare_db(tmp_path, monkeypatch)
+def test_value_effort_low_medium():
+    _prepare_db()
     new_id = upsert_initiative(None, "ValEffLowMed", "", "red", "", 50, 10, "tester")
     df = get_initiatives()
     row = df[df["id"] == new_id].iloc[0]
     assert row["value"] == "Low"
     assert row["effort"] == "Medium"
 
-def test_get_initiative_and_move(tmp_path, monkeypatch):
-    _prepare_db(tmp_path, monkeypatch)
+def test_get_initiative_and_move():
+    _prepare_db()
     new_id = upsert_initiative(None, "MoveMe", "", "yellow", "", 10, 10, "tester")
     update_position(new_id, 20, 30, "tester")
     row = get_initiative(new_id)
     assert row is not None
     assert row["x"] == 20
     assert row["y"] == 30
+
+
+def test_batch_classifier_matches_scalar():
+    from db import _value_effort, classify_value_effort
+
+    coords = [(0, 0), (33, 34), (66, 67), (100, 50), (50, 10)]
+    values, efforts = classify_value_effort([x for x, _ in coords], [y for _, y in coords])
+    assert list(zip(values, efforts)) == [_value_effort(x, y) for x, y in coords]
+    values, _ = classify_value_effort([0], [30], thresholds=(25, 75))
+    assert values[0] == "Medium"
+
+
+def test_quadrant_summary_counts_cells():
+    from db import get_quadrant_summary
+
+    _prepare_db()
+    category_name = "Summary"
+    new_id = upsert_initiative(None, "Summarised", "", "red", category_name, 90, 90, "tester")
+    summary = get_quadrant_summary()
+    cell = next(c for c in summary["cells"] if (c["value"], c["effort"]) == ("High", "High"))
+    assert new_id in cell["ids"]
+    category = next(c for c in summary["categories"] if c["category"] == category_name)
+    assert category == {"category": category_name, "count": 1, "cells": {"High/High": 1}}
+
+
+def test_malformed_thresholds_fall_back_to_defaults():
+    from db import DEFAULT_THRESHOLDS, _parse_thresholds
+
+    assert _parse_thresholds("25,75") == (25.0, 75.0)
+    for raw in ("abc", "10", "10,20,30", "70,30", ""):
+        assert _parse_thresholds(raw) == DEFAULT_THRESHOLDS
+
+
+def test_changed_thresholds_rebucket_stored_rows(monkeypatch):
+    import db
+
+    _prepare_db()
+    new_id = upsert_initiative(None, "Rebucketed", "", "red", "Thresholds", 50, 50, "tester")
+    assert db.query_initiatives({"category": "Thresholds", "value": "Medium", "effort": "Medium"})[0]
+    monkeypatch.setattr(db, "THRESHOLDS", (25.0, 45.0))
+    init_db()
+    rows = db.query_initiatives({"category": "Thresholds", "value": "High", "effort": "High"})[0]
+    assert [row[0] for row in rows] == [new_id]
+    cell = next(c for c in db.get_quadrant_summary()["cells"] if (c["value"], c["effort"]) == ("High", "High"))
+    assert new_id in cell["ids"]
+    version = db.get_board_version()
+    init_db()
+    assert db.get_board_version() == version
+
+
+def test_quadrant_counts_match_summary_and_are_cached(monkeypatch):
+    import db
+
+    _prepare_db()
+    monkeypatch.setattr(db, "WRITE_BEHIND_INTERVAL", 60.0)
+    monkeypatch.setattr(db._position_buffer, "interval", 60.0)
+    new_id = upsert_initiative(None, "Counted", "", "red", "", 10, 10, "tester")
+    db.queue_positions([{"id": new_id, "x": 90, "y": 90}], "tester")
+
+    def counts(cells):
+        return {(c["value"], c["effort"]): c["count"] for c in cells}
+
+    assert counts(db.get_quadrant_counts()) == counts(db.get_quadrant_summary()["cells"])
+    assert counts(db.get_quadrant_counts())[("High", "High")] >= 1
+    db.flush_positions()
+    assert db._board_snapshot().cells is db._board_snapshot().cells
@@ -1,11 +1,26 @@
 import streamlit as st
-import json
+import numpy as np
 import pandas as pd
+from collections import Counter
+from types import SimpleNamespace
+from typing import Iterable
 
 from streamlit_elements import elements, dashboard, html, mui, sync
 from streamlit_elements.core.callback import ElementsCallback
 
-from db import get_initiatives, update_position, get_last_updated
+from db import (
+    BUCKETS,
+    INITIATIVE_FIELDS,
+    THRESHOLDS,
+    classify_value_effort,
+    current_path,
+    get_board_version,
+    get_initiatives_as_of,
+    get_initiatives_frame,
+    get_initiatives_since,
+    get_quadrant_counts,
+    queue_positions,
+)
 
 def load_css() -> None:
     """Inject base CSS for fonts and sidebar controls.
@@ -60,11 +75,228 @@ def load_css() -> None:
     )
 
 
-def create_draggable_matrix(username: str) -> None:
-    """Render initiatives as draggable notes over a visible 3×3 grid."""
+# At most this many notes are rendered individually per rerun. When more
+# fall inside the viewport, the densest regions are drawn as cluster badges
+# that zoom in when clicked.
+NOTE_BUDGET = 150
+# Clustering splits the viewport into CLUSTER_GRID x CLUSTER_GRID bins.
+CLUSTER_GRID = 8
+# Viewport as (x_min, x_max, y_min, y_max) in board coordinates.
+FULL_VIEW = (0.0, 100.0, 0.0, 100.0)
 
-    df = get_initiatives()
-    if df.empty:
+
+def plan_viewport(
+    df: pd.DataFrame,
+    viewport: tuple = FULL_VIEW,
+    budget: int = NOTE_BUDGET,
+    grid: int = CLUSTER_GRID,
+) -> tuple[pd.DataFrame, list[dict]]:
+    """Choose which rows inside ``viewport`` to draw as notes or clusters.
+
+    Rows are binned on a ``grid`` x ``grid`` lattice over the viewport.
+    Bins are expanded into individual notes from the sparsest upwards while
+    the total stays within ``budget``; every remaining bin becomes a
+    cluster dict with its ``count``, centroid ``x``/``y`` and ``bounds``
+    (a viewport to zoom into). At most ``budget`` notes and ``grid ** 2``
+    clusters are returned, whatever the size of ``df``.
+    """
+    x0, x1, y0, y1 = viewport
+    # Work on the coordinate arrays and take only the rows that are drawn,
+    # so a large board is never copied, only scanned.
+    xs, ys = df["x"].to_numpy(dtype=float), df["y"].to_numpy(dtype=float)
+    inside = np.flatnonzero((xs >= x0) & (xs <= x1) & (ys >= y0) & (ys <= y1))
+    if len(inside) <= budget:
+        return df.iloc[inside], []
+    width, height = (x1 - x0) / grid, (y1 - y0) / grid
+    if width < 0.5 or height < 0.5:
+        # Zoomed in on stacked notes that cannot be separated any further.
+        return df.iloc[inside[:budget]], []
+    xs, ys = xs[inside], ys[inside]
+    bx = np.clip(((xs - x0) / width).astype(int), 0, grid - 1)
+    by = np.clip(((ys - y0) / height).astype(int), 0, grid - 1)
+    bins = bx * grid + by
+    counts = np.bincount(bins, minlength=grid * grid)
+    occupied = [cell for cell in np.argsort(counts, kind="stable") if counts[cell]]
+    expanded = np.zeros(grid * grid, dtype=bool)
+    expanded[[cell for cell, total in zip(occupied, np.cumsum(counts[occupied])) if total <= budget]] = True
+    notes = df.iloc[inside[expanded[bins]]]
+    sum_x = np.bincount(bins, weights=xs, minlength=grid * grid)
+    sum_y = np.bincount(bins, weights=ys, minlength=grid * grid)
+    clusters = []
+    for cell in occupied:
+        if expanded[cell]:
+            continue
+        count = int(counts[cell])
+        i, j = divmod(int(cell), grid)
+        clusters.append(
+            {
+                "count": count,
+                "x": float(sum_x[cell] / count),
+                "y": float(sum_y[cell] / count),
+                "bounds": (x0 + i * width, x0 + (i + 1) * width, y0 + j * height, y0 + (j + 1) * height),
+            }
+        )
+    return notes, clusters
+
+
+def _to_grid(value: float, low: float, high: float) -> int:
+    return int(round((value - low) * 100 / (high - low)))
+
+
+def _from_grid(cell: float, low: float, high: float) -> float:
+    return low + cell * (high - low) / 100
+
+
+def _cells_from_frame(df: pd.DataFrame) -> list[dict]:
+    values, efforts = classify_value_effort(df["x"], df["y"])
+    counts = Counter(zip(values.tolist(), efforts.tolist()))
+    return [
+        {"value": value, "effort": effort, "count": counts[(value, effort)]}
+        for value in BUCKETS
+        for effort in BUCKETS
+    ]
+
+
+def _note_item(key: str, x: int, y: int, draggable: bool = True) -> dashboard.Item:
+    return dashboard.Item(key, x=x, y=y, w=10, h=6, isDraggable=draggable)
+
+
+def _cluster_items(clusters: list[dict], viewport: tuple) -> list:
+    x0, x1, y0, y1 = viewport
+    return [
+        dashboard.Item(f"cluster-{n}", x=_to_grid(c["x"], x0, x1), y=_to_grid(c["y"], y0, y1), w=6, h=4, static=True)
+        for n, c in enumerate(clusters)
+    ]
+
+
+def _row_version(value) -> int | None:
+    return None if pd.isna(value) else int(value)
+
+
+def _apply_remote(layout: list, tracked: dict, changed: Iterable, viewport: tuple) -> None:
+    """Bring ``tracked`` up to date with rows changed in the database.
+
+    ``tracked`` maps note ids to the ``(change_version, x, y)`` last known
+    to be stored. A row stored at a different position was moved by
+    someone else, so its note is moved there in place, discarding any
+    unsaved local drag. Otherwise only the version is refreshed and a local
+    drag is still saved, against the current version. The work is bounded
+    by the number of changes, not by the board size.
+    """
+    x0, x1, y0, y1 = viewport
+    items = None
+    for row in changed:
+        key = str(row.id)
+        known = tracked.get(key)
+        if known is None:
+            continue
+        position = (_to_grid(row.x, x0, x1), _to_grid(row.y, y0, y1))
+        if position != known[1:]:
+            if items is None:
+                items = {item["i"]: item for item in layout}
+            if key in items:
+                items[key]["x"], items[key]["y"] = position
+        tracked[key] = (_row_version(row.change_version), *position)
+
+
+def _sync_notes(layout: list, tracked: dict, notes: pd.DataFrame, clusters: list[dict], viewport: tuple) -> None:
+    """Drop notes no longer shown and add newly shown ones, in place.
+
+    Existing items are kept as they are. Cluster badges are replaced
+    wholesale; there are at most ``CLUSTER_GRID ** 2`` of them.
+    """
+    x0, x1, y0, y1 = viewport
+    shown = set(notes["id"].astype(str))
+    kept = []
+    for item in layout:
+        if item["i"] in shown:
+            kept.append(item)
+        else:
+            tracked.pop(item["i"], None)
+    for row in notes.itertuples():
+        key = str(row.id)
+        if key not in tracked:
+            item = _note_item(key, _to_grid(row.x, x0, x1), _to_grid(row.y, y0, y1))
+            tracked[key] = (_row_version(row.change_version), item["x"], item["y"])
+            kept.append(item)
+    layout[:] = kept + _cluster_items(clusters, viewport)
+
+
+def _save_moves(layout: list, tracked: dict, viewport: tuple, username: str) -> list[dict]:
+    """Persist the notes whose grid position differs from ``tracked``.
+
+    Each move is checked against the row version it was made from; the
+    rows that changed in the meantime are returned as conflicts.
+    """
+    x0, x1, y0, y1 = viewport
+    moved = []
+    for item in layout:
+        known = tracked.get(item["i"])
+        if known is not None and known[1:] != (item["x"], item["y"]):
+            tracked[item["i"]] = (known[0], item["x"], item["y"])
+            moved.append(item)
+    conflicts: list[dict] = []
+    queue_positions(
+        (
+            {
+                "id": int(item["i"]),
+                "x": _from_grid(item["x"], x0, x1),
+                "y": _from_grid(item["y"], y0, y1),
+                "change_version": tracked[item["i"]][0],
+            }
+            for item in moved
+            if int(item["i"]) > 0
+        ),
+        username,
+        conflicts,
+    )
+    return conflicts
+
+
+def create_draggable_matrix(username: str, as_of: str | None = None) -> None:
+    """Render initiatives as draggable notes over a visible 3×3 grid.
+
+    With ``as_of`` the board is reconstructed at that UTC timestamp and
+    shown read-only: notes cannot be dragged or edited.
+    """
+
+    read_only = as_of is not None
+    state = st.session_state.get("_layout_state")
+    if state is not None and state["path"] != current_path():
+        # Another board was selected; its layout is built from scratch.
+        state = None
+    refreshed = False
+    if not read_only:
+        version = get_board_version()
+        if state is not None and "layout" in st.session_state:
+            # Catch up with other writers, then persist the user's drags
+            # against the viewport the layout was built for.
+            layout = st.session_state["layout"]
+            if state["version"] != version:
+                changed, _ = get_initiatives_since(state["version"])
+                _apply_remote(layout, state["items"], changed, state["viewport"])
+                state["version"] = version
+                refreshed = True
+            conflicts = _save_moves(layout, state["items"], state["viewport"], username)
+            if conflicts:
+                st.warning(
+                    f"{len(conflicts)} note(s) were changed by someone else meanwhile; "
+                    "showing their current position."
+                )
+                _apply_remote(
+                    layout,
+                    state["items"],
+                    [SimpleNamespace(**row) for row in conflicts if not row.get("deleted")],
+                    state["viewport"],
+                )
+
+    if read_only:
+        df = pd.DataFrame(get_initiatives_as_of(as_of), columns=INITIATIVE_FIELDS)
+        st.info(f"Read-only view of the board as of {as_of} UTC")
+    else:
+        # The snapshot's own frame, not a copy; it is only read below.
+        df = get_initiatives_frame()
+    if df.empty and not read_only:
         # Show a few example items so the board always has content.
         df = pd.DataFrame(
             [
@@ -72,17 +304,46 @@ def create_draggable_matrix(username: str) -> None:
                 {"id": -2, "title": "Example Initiative 2", "color": "#7DFBFF", "x": 50, "y": 50},
                 {"id": -3, "title": "Example Initiative 3", "color": "#B3FF7D", "x": 75, "y": 25},
             ]
-        )
+        ).assign(change_version=None)
+
+    viewport = st.session_state.get("viewport", FULL_VIEW)
+    x0, x1, y0, y1 = viewport
+    zoomed = viewport != FULL_VIEW
+    notes, clusters = plan_viewport(df, viewport)
+    if zoomed and st.button("Zoom out to the full board"):
+        st.session_state["viewport"] = FULL_VIEW
+        st.rerun()
+    if zoomed or clusters:
+        st.caption(f"Showing {len(notes)} notes and {len(clusters)} clusters of {len(df)} initiatives")
 
-    last_updated = get_last_updated()
-    if "layout" not in st.session_state or st.session_state.get("layout_ts") != last_updated:
-        st.session_state["layout"] = [
-            dashboard.Item(str(row.id), x=int(row.x), y=int(row.y), w=10, h=6)
-            for row in df.itertuples()
+    def build_layout() -> list:
+        items = [
+            _note_item(str(row.id), _to_grid(row.x, x0, x1), _to_grid(row.y, y0, y1), not read_only)
+            for row in notes.itertuples()
         ]
-        st.session_state["layout_ts"] = last_updated
+        return items + _cluster_items(clusters, viewport)
 
-    layout = st.session_state.get("layout", [])
+    if read_only:
+        layout = build_layout()
+        cells = _cells_from_frame(df)
+    else:
+        if "layout" not in st.session_state or state is None or state["viewport"] != viewport:
+            st.session_state["layout"] = build_layout()
+            versions = dict(zip(notes["id"].astype(str), notes["change_version"]))
+            st.session_state["_layout_state"] = {
+                "path": current_path(),
+                "viewport": viewport,
+                "version": version,
+                "items": {
+                    item["i"]: (_row_version(versions[item["i"]]), item["x"], item["y"])
+                    for item in st.session_state["layout"]
+                    if not item["i"].startswith("cluster-")
+                },
+            }
+        elif refreshed:
+            _sync_notes(st.session_state["layout"], state["items"], notes, clusters, viewport)
+        layout = st.session_state["layout"]
+        cells = get_quadrant_counts()
 
     with elements("board"):
         board_style = {
@@ -96,10 +357,10 @@ def create_draggable_matrix(username: str) -> None:
         with html.div(style=board_style):
             with dashboard.Grid(
                 layout,
-                onLayoutChange=sync("layout"),
+                onLayoutChange=None if read_only else sync("layout"),
                 cols=100,
                 rowHeight=8,
-                isDraggable=True,
+                isDraggable=not read_only,
                 isResizable=False,
                 style={
                     "position": "absolute",
@@ -111,7 +372,28 @@ def create_draggable_matrix(username: str) -> None:
                     "zIndex": 0,
                 },
             ):
-                for row in df.itertuples():
+                for n, cluster in enumerate(clusters):
+                    zoom_callback = ElementsCallback(
+                        lambda bounds=cluster["bounds"]: st.session_state.update(zoom=bounds)
+                    )
+                    with html.div(
+                        key=f"cluster-{n}",
+                        style={
+                            "backgroundColor": "rgba(102, 126, 234, 0.85)",
+                            "color": "white",
+                            "width": "100%",
+                            "height": "100%",
+                            "borderRadius": "999px",
+                            "display": "flex",
+                            "alignItems": "center",
+                            "justifyContent": "center",
+                            "cursor": "zoom-in",
+                            "zIndex": 2,
+                        },
+                        onClick=zoom_callback,
+                    ):
+                        mui.Typography(f"{cluster['count']} notes", variant="body2")
+                for row in notes.itertuples():
                     edit_callback = ElementsCallback(
                         lambda r_id=row.id: st.session_state.update(edit=r_id)
                     )
@@ -125,38 +407,55 @@ def create_draggable_matrix(username: str) -> None:
                             "border": "1px solid #e0e0e0",
                             "borderRadius": "4px",
                             "boxShadow": "0 2px 4px rgba(0,0,0,0.2)",
-                            "cursor": "move",
+                            "cursor": "default" if read_only else "move",
                             "userSelect": "none",
                             "zIndex": 2,
                         },
-                        onDoubleClick=edit_callback,
+                        onDoubleClick=None if read_only else edit_callback,
                     ):
                         mui.Typography(row.title, variant="body2")
 
-            for pos in (33.33, 66.66):
-                html.div(
-                    style={
-                        "position": "absolute",
-                        "top": 0,
-                        "left": f"{pos}%",
-                        "width": "2px",
-                        "height": "100%",
-                        "backgroundColor": "#666",
-                        "zIndex": 1,
-                        "pointerEvents": "none",
-                    }
-                )
+            for pos in THRESHOLDS:
+                if x0 < pos < x1:
+                    html.div(
+                        style={
+                            "position": "absolute",
+                            "top": 0,
+                            "left": f"{(pos - x0) * 100 / (x1 - x0)}%",
+                            "width": "2px",
+                            "height": "100%",
+                            "backgroundColor": "#666",
+                            "zIndex": 1,
+                            "pointerEvents": "none",
+                        }
+                    )
+                if y0 < pos < y1:
+                    html.div(
+                        style={
+                            "position": "absolute",
+                            "left": 0,
+                            "top": f"{(pos - y0) * 100 / (y1 - y0)}%",
+                            "width": "100%",
+                            "height": "2px",
+                            "backgroundColor": "#666",
+                            "zIndex": 1,
+                            "pointerEvents": "none",
+                        }
+                    )
+            # Live per-cell counts come from SQL rather than the rendered rows.
+            starts = {"Low": 0, "Medium": THRESHOLDS[0], "High": THRESHOLDS[1]}
+            for cell in cells if not zoomed else []:
                 html.div(
+                    str(cell["count"]),
                     style={
                         "position": "absolute",
-                        "left": 0,
-                        "top": f"{pos}%",
-                        "width": "100%",
-                        "height": "2px",
-                        "backgroundColor": "#666",
+                        "left": f"calc({starts[cell['effort']]}% + 6px)",
+                        "top": f"calc({starts[cell['value']]}% + 4px)",
+                        "fontSize": "0.75rem",
+                        "color": "#999",
                         "zIndex": 1,
                         "pointerEvents": "none",
-                    }
+                    },
                 )
             html.div(
                 "Effort",
@@ -183,14 +482,12 @@ def create_draggable_matrix(username: str) -> None:
                 },
             )
 
-    if "layout" in st.session_state:
-        layout_json = json.dumps(st.session_state["layout"])
-        if layout_json != st.session_state.get("_layout_snapshot"):
-            st.session_state["_layout_snapshot"] = layout_json
-            for item in st.session_state["layout"]:
-                item_id = int(item["i"])
-                if item_id > 0:
-                    update_position(item_id, float(item["x"]), float(item["y"]), username)
+    if "zoom" in st.session_state:
+        st.session_state["viewport"] = tuple(st.session_state.pop("zoom"))
+        st.rerun()
+
+    if read_only:
+        return
 
     if "edit" in st.session_state:
         st.session_state["edit_initiative_id"] = int(st.session_state.pop("edit"))
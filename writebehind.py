@@ -0,0 +1,136 @@
+"""Write-behind buffer that coalesces rapid updates to the same key.
+
+Dragging a note produces a stream of intermediate positions of which only
+the last one matters. :class:`WriteBehindBuffer` keeps the latest value per
+key and hands everything pending to a flush callback in one call, either
+every ``interval`` seconds from a worker thread, as soon as ``batch_size``
+keys are pending, or on demand. Values stay visible through
+:meth:`WriteBehindBuffer.pending` until their flush has completed, so
+readers can overlay them and see their own writes.
+"""
+
+import logging
+import threading
+from typing import Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class PartialFlushError(Exception):
+    """Raised by a flush callback that wrote only part of its batch.
+
+    ``remaining`` maps the keys that were not written to their values;
+    only those are put back, since the rest is already stored.
+    """
+
+    def __init__(self, remaining: dict) -> None:
+        super().__init__(f"{len(remaining)} buffered updates were not written")
+        self.remaining = remaining
+
+
+class WriteBehindBuffer:
+    """Coalesce values per key and flush them in batches.
+
+    ``flush`` receives a dict of the latest value for every pending key.
+    If it raises, the values are put back unless a newer one arrived in the
+    meantime, and are retried on the next flush; a :class:`PartialFlushError`
+    puts back only its ``remaining`` values.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[dict], object],
+        interval: float = 0.5,
+        batch_size: int = 500,
+    ) -> None:
+        self._flush = flush
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending: dict = {}
+        self._inflight: dict = {}
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self.received = 0
+        self.written = 0
+        self.flushes = 0
+
+    def put(self, key: Hashable, value: object) -> None:
+        """Record ``value`` as the latest for ``key``."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("write-behind buffer is closed")
+            self._pending[key] = value
+            self.received += 1
+            full = len(self._pending) >= self.batch_size
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="lumen-write-behind", daemon=True)
+                self._thread.start()
+        if full:
+            self._wakeup.set()
+
+    def pending(self) -> dict:
+        """Return the values not yet known to be written, newest winning."""
+        with self._lock:
+            if not self._pending and not self._inflight:
+                return {}
+            return {**self._inflight, **self._pending}
+
+    def flush(self) -> int:
+        """Write everything pending now; return the number of keys written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+            if not batch:
+                return 0
+            try:
+                self._flush(batch)
+            except BaseException as exc:
+                remaining = exc.remaining if isinstance(exc, PartialFlushError) else batch
+                with self._lock:
+                    self._pending = {**remaining, **self._pending}
+                    self._inflight = {}
+                    self.written += len(batch) - len(remaining)
+                raise
+            with self._lock:
+                self._inflight = {}
+                self.written += len(batch)
+                self.flushes += 1
+            return len(batch)
+
+    def close(self) -> None:
+        """Stop the worker thread and write whatever is still pending."""
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._wakeup.set()
+            thread.join()
+        self.flush()
+
+    def stats(self) -> dict:
+        """Return counters; ``coalescing_ratio`` is updates received per row written."""
+        with self._lock:
+            return {
+                "received": self.received,
+                "written": self.written,
+                "flushes": self.flushes,
+                "pending": len(self._pending) + len(self._inflight),
+                "coalescing_ratio": self.received / self.written if self.written else None,
+            }
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            with self._lock:
+                closed = self._closed
+            if closed:
+                return
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Write-behind flush failed; will retry")